@@ -1,14 +1,22 @@
 
 import pandas as pd
-import time
 import os
+import sys
 from nba_api.stats.endpoints import leaguedashptdefend, leaguehustlestatsplayer
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+from nba_fetch import fetch_frames
+from backfill import run_backfill
+from data_lake import write_dataset
+
 # --- Configuration ---
 START_YEAR = 2015
 END_YEAR = 2024
 OUTPUT_DIR = 'Defensive'
 OUTPUT_FILE = os.path.join(OUTPUT_DIR, 'nba_historical_defensive_stats_2015_2025.csv')
+# Hustle stats not reliably available before 2016-17 (those seasons get zeroed hustle columns)
+HUSTLE_START_YEAR = 2016
+HUSTLE_COLS = ['CONTESTED_SHOTS', 'CONTESTED_SHOTS_2PT', 'CONTESTED_SHOTS_3PT', 'CHARGES_DRAWN']
 
 def get_season_string(start_year):
     end_part = (start_year + 1) % 100
@@ -30,32 +38,32 @@ def standardize_columns(df, preferred_id='PLAYER_ID'):
 def fetch_defense_dashboard(season):
     print(f"  Fetching Defense Dashboard (Overall) for {season}...")
     try:
-        df = leaguedashptdefend.LeagueDashPtDefend(
+        df = fetch_frames(
+            leaguedashptdefend.LeagueDashPtDefend,
             season=season,
             defense_category='Overall',
             per_mode_simple='PerGame',
             timeout=100
-        ).get_data_frames()[0]
+        )[0]
         
         df = standardize_columns(df)
         return df
     except Exception as e:
         print(f"    Error fetching Defense Dashboard: {e}")
-        return pd.DataFrame()
+        raise
 
 def fetch_hustle_stats(season):
-    start_year_int = int(season[:4])
-    if start_year_int < 2016:
-        # Hustle stats not reliably available before 2016-17
+    if int(season[:4]) < HUSTLE_START_YEAR:
         return pd.DataFrame()
         
     print(f"  Fetching Hustle Stats for {season}...")
     try:
-        df = leaguehustlestatsplayer.LeagueHustleStatsPlayer(
+        df = fetch_frames(
+            leaguehustlestatsplayer.LeagueHustleStatsPlayer,
             season=season,
             per_mode_time='PerGame',
             timeout=100
-        ).get_data_frames()[0]
+        )[0]
         
         df = standardize_columns(df)
         # Select key columns if they exist
@@ -65,46 +73,44 @@ def fetch_hustle_stats(season):
         return df[existing_cols]
     except Exception as e:
         print(f"    Error fetching Hustle Stats: {e}")
-        return pd.DataFrame()
+        raise
 
-def fetch_all_seasons():
-    all_data = []
+def fetch_season(season_str):
+    print(f"Processing Season {season_str}...")
     
-    for year in range(START_YEAR, END_YEAR + 1):
-        season_str = get_season_string(year)
-        print(f"Processing Season {season_str}...")
-        
-        # 1. Dashboard
-        dash_df = fetch_defense_dashboard(season_str)
+    # 1. Dashboard
+    dash_df = fetch_defense_dashboard(season_str)
+    
+    if dash_df.empty:
+        raise ValueError("missing Dashboard data")
         
-        if dash_df.empty:
-            print("    Skipping season due to missing Dashboard data.")
-            continue
-            
-        if 'PLAYER_ID' not in dash_df.columns:
-            print("    Critical: PLAYER_ID missing from Dashboard columns. Skipping.")
-            print(f"    Cols: {dash_df.columns.tolist()}")
-            continue
+    if 'PLAYER_ID' not in dash_df.columns:
+        raise ValueError(f"PLAYER_ID missing from Dashboard columns: {dash_df.columns.tolist()}")
 
-        # 2. Hustle
-        hustle_df = fetch_hustle_stats(season_str)
-        
-        # Merge
-        merged_df = dash_df
-        if not hustle_df.empty and 'PLAYER_ID' in hustle_df.columns:
-            merged_df = pd.merge(dash_df, hustle_df, on='PLAYER_ID', how='left')
-        else:
-            # Add dummy hustle cols
-            hustle_cols = ['CONTESTED_SHOTS', 'CONTESTED_SHOTS_2PT', 'CONTESTED_SHOTS_3PT', 'CHARGES_DRAWN']
-            for c in hustle_cols:
-                merged_df[c] = 0
-        
-        merged_df['SEASON'] = season_str
-        all_data.append(merged_df)
-        
-        time.sleep(0.6)
-            
-    return pd.concat(all_data, ignore_index=True) if all_data else pd.DataFrame()
+    # 2. Hustle
+    hustle_df = fetch_hustle_stats(season_str)
+    
+    # Merge
+    merged_df = dash_df
+    if not hustle_df.empty and 'PLAYER_ID' in hustle_df.columns:
+        merged_df = pd.merge(dash_df, hustle_df, on='PLAYER_ID', how='left')
+    elif int(season_str[:4]) >= HUSTLE_START_YEAR:
+        # A failed pull must not be saved as zeros: run_backfill records the season as failed
+        raise ValueError("missing Hustle data")
+    else:
+        # Add dummy hustle cols
+        for c in HUSTLE_COLS:
+            merged_df[c] = 0
+    
+    merged_df['SEASON'] = season_str
+    return merged_df
+
+def fetch_all_seasons():
+    seasons = [get_season_string(year) for year in range(START_YEAR, END_YEAR + 1)]
+    df, failed = run_backfill('defensive', seasons, fetch_season, OUTPUT_DIR)
+    if failed:
+        print(f"Warning: {len(failed)} seasons missing from output: {', '.join(failed)}")
+    return df
 
 def main():
     if not os.path.exists(OUTPUT_DIR):
@@ -116,7 +122,7 @@ def main():
     if not df.empty:
         df = df.fillna(0) 
         print(f"Saving {len(df)} rows to {OUTPUT_FILE}...")
-        df.to_csv(OUTPUT_FILE, index=False)
+        write_dataset(df, 'historical_defensive', csv_path=OUTPUT_FILE)
         print("Done.")
     else:
         print("No data fetched.")
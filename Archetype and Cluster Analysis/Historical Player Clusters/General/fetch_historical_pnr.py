@@ -1,105 +1,51 @@
-import pandas as pd
-import time
 import os
-from nba_api.stats.endpoints import synergyplaytypes
+import sys
 
-def fetch_pnr_data():
-    seasons = [
-        '2015-16', '2016-17', '2017-18', '2018-19', '2019-20',
-        '2020-21', '2021-22', '2022-23', '2023-24', '2024-25'
-    ]
-    
-    # Potential keys to try
-    handler_keys = ['PRBallHandler', 'PickAndRollBallHandler', 'P&RBallHandler']
-    rollman_keys = ['PRRollMan', 'PickAndRollRollMan', 'P&RRollMan']
-    
-    all_data = []
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+from synergy_fetch import fetch_playtype_frames, missing_playtypes
+from backfill import run_backfill
+from data_lake import write_dataset
 
-    for season in seasons:
-        print(f"Fetching P&R Data for {season}...")
-        
-        # --- Fetch Handler ---
-        df_handler = pd.DataFrame()
-        for key in handler_keys:
-            try:
-                print(f"  Trying Handler key: '{key}'...")
-                df_handler = synergyplaytypes.SynergyPlayTypes(
-                    season=season,
-                    play_type_nullable=key,
-                    type_grouping_nullable='offensive',
-                    player_or_team_abbreviation='P',
-                    per_mode_simple='PerGame',
-                    timeout=60
-                ).get_data_frames()[0]
-                
-                if not df_handler.empty:
-                    print(f"    Success with '{key}'! ({len(df_handler)} rows)")
-                    # Rename columns immediately
-                    df_handler = df_handler.rename(columns={'POSS_PCT': 'PRBallHandler_FREQ', 'PPP': 'PRBallHandler_PPP'})
-                    break
-            except Exception:
-                pass
-            time.sleep(1)
-            
-        # --- Fetch Roll Man ---
-        df_roll = pd.DataFrame()
-        for key in rollman_keys:
-            try:
-                print(f"  Trying RollMan key: '{key}'...")
-                df_roll = synergyplaytypes.SynergyPlayTypes(
-                    season=season,
-                    play_type_nullable=key,
-                    type_grouping_nullable='offensive',
-                    player_or_team_abbreviation='P',
-                    per_mode_simple='PerGame',
-                    timeout=60
-                ).get_data_frames()[0]
-                
-                if not df_roll.empty:
-                    print(f"    Success with '{key}'! ({len(df_roll)} rows)")
-                    df_roll = df_roll.rename(columns={'POSS_PCT': 'PRRollMan_FREQ', 'PPP': 'PRRollMan_PPP'})
-                    break
-            except Exception:
-                pass
-            time.sleep(1)
+SEASONS = [
+    '2015-16', '2016-17', '2017-18', '2018-19', '2019-20',
+    '2020-21', '2021-22', '2022-23', '2023-24', '2024-25'
+]
+OUTPUT_DIR = '/Users/ryanstrain/Desktop/COI V2/Archetype and Cluster Analysis/Historical Player Clusters/Offensive'
 
-        # Merge for the Season
-        # We need a base DF. Use Handler as base, merge Roll. Or concat IDs.
-        # Ideally, we want one row per PLAYER_ID per Season.
-        
-        # Build base from unique IDs in both
-        ids_handler = df_handler['PLAYER_ID'].unique() if not df_handler.empty else []
-        ids_roll = df_roll['PLAYER_ID'].unique() if not df_roll.empty else []
-        all_ids = set(ids_handler) | set(ids_roll)
-        
-        if not all_ids:
-            print(f"  No P&R data found for {season}.")
-            continue
-            
-        season_df = pd.DataFrame({'PLAYER_ID': list(all_ids)})
-        season_df['SEASON'] = season
-        
-        # Merge Handler
-        if not df_handler.empty:
-            cols = ['PLAYER_ID', 'PRBallHandler_FREQ', 'PRBallHandler_PPP']
-            season_df = pd.merge(season_df, df_handler[cols], on='PLAYER_ID', how='left')
-            
-        # Merge Roll Man
-        if not df_roll.empty:
-            cols = ['PLAYER_ID', 'PRRollMan_FREQ', 'PRRollMan_PPP']
-            season_df = pd.merge(season_df, df_roll[cols], on='PLAYER_ID', how='left')
-            
-        all_data.append(season_df)
+PLAYTYPES = ['PRBallHandler', 'PRRollMan']
+
+def fetch_season(season):
+    # synergy_fetch tries the alternate spellings (P&RBallHandler, PickAndRollBallHandler, ...)
+    season_df = fetch_playtype_frames(
+        [season], PLAYTYPES,
+        type_grouping_nullable='offensive',
+        per_mode_simple='PerGame',
+        timeout=60
+    )[season]
+    # Raise rather than save half a season: run_backfill records it as failed and retries it
+    missing = missing_playtypes(season_df, PLAYTYPES)
+    if missing:
+        raise ValueError(f"no rows for playtypes: {', '.join(missing)}")
+    
+    # One row per PLAYER_ID per Season
+    pnr_cols = [c for c in season_df.columns if c.startswith('PR')]
+    season_df = season_df[['PLAYER_ID'] + pnr_cols].copy()
+    season_df.insert(1, 'SEASON', season)
+    return season_df
+
+def fetch_pnr_data():
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    print(f"Fetching P&R Data for {len(SEASONS)} seasons...")
+    final_df, failed = run_backfill('pnr', SEASONS, fetch_season, OUTPUT_DIR)
+    if failed:
+        print(f"Warning: {len(failed)} seasons missing from output: {', '.join(failed)}")
 
     # Concat all seasons
-    if all_data:
-        final_df = pd.concat(all_data, ignore_index=True)
+    if not final_df.empty:
         final_df = final_df.fillna(0) # Logic: if not found in playtype list, freq/ppp is 0
         
-        output_dir = '/Users/ryanstrain/Desktop/COI V2/Archetype and Cluster Analysis/Historical Player Clusters/Offensive'
-        os.makedirs(output_dir, exist_ok=True)
-        output_path = f"{output_dir}/nba_historical_pnr_2015_2025.csv"
-        final_df.to_csv(output_path, index=False)
+        output_path = f"{OUTPUT_DIR}/nba_historical_pnr_2015_2025.csv"
+        write_dataset(final_df, 'historical_pnr', csv_path=output_path)
         print(f"Saved P&R Data to {output_path}")
     else:
         print("No P&R data fetched for any season.")
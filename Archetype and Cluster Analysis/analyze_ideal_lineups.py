@@ -1,9 +1,14 @@
 
 import pandas as pd
-import time
+import os
+import sys
 from nba_api.stats.endpoints import leaguedashlineups
 import numpy as np
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from nba_fetch import fetch_frames
+from lineup_encoding import parse_group_ids, encode_archetypes, composition_counts, first_appearance, ideal_compositions
+
 # --- Configuration ---
 SEASON = '2024-25'
 MIN_MINUTES = 80
@@ -14,6 +19,10 @@ FILE_PLAYER_OFF = 'nba_player_clusters_offensive.csv'
 FILE_PLAYER_DEF = 'nba_defensive_clusters.csv'
 FILE_TEAM = 'nba_team_clusters.csv'
 
+N_SLOTS = 5
+UNKNOWN_ARCHETYPE = "Replacement/Unknown"
+OPEN_SLOT = "Any/Versatile"
+
 def load_reference_data():
     print("Loading reference data...")
     try:
@@ -34,12 +43,13 @@ def fetch_successful_lineups():
     print(f"Fetching Lineups (> {MIN_MINUTES} mins, Postive Net Rating)...")
     try:
         # Using Base Plus_Minus as proxy for Net Rating > 0 check
-        lineups = leaguedashlineups.LeagueDashLineups(
+        lineups = fetch_frames(
+            leaguedashlineups.LeagueDashLineups,
             season=SEASON,
             group_quantity=5,
             measure_type_detailed_defense='Base',
             timeout=100
-        ).get_data_frames()[0]
+        )[0]
         
         filtered = lineups[
             (lineups['MIN'] >= MIN_MINUTES) & 
@@ -52,92 +62,31 @@ def fetch_successful_lineups():
         print(f"Error: {e}")
         return pd.DataFrame()
 
-def get_ideal_composition_list(series_of_lists, n_slots=5):
-    """
-    Given a series of lists (one list of 5 archetypes per lineup),
-    calculate the aggregate 'Ideal 5'.
-    Method: Calculate mean frequency of each archetype, then fill 5 slots proportionally.
-    """
-    # Flatten to get raw counts across all lineups
-    all_items = []
-    for l in series_of_lists:
-        all_items.extend(l)
-        
-    if not all_items: return ["N/A"] * 5
-    
-    # Calculate average count per lineup
-    n_lineups = len(series_of_lists)
-    counts = pd.Series(all_items).value_counts()
-    avg_per_lineup = counts / n_lineups
-    
-    # We want to construct a list of 5 players that maximizes these averages
-    # Strategy: Round the averages to nearest whole number, then adjust to sum to 5?
-    # Or just iterate: Pick highest average, subtract 1, repeat 5 times?
-    
-    final_list = []
-    remaining_avgs = avg_per_lineup.copy()
-    
-    for _ in range(5):
-        if remaining_avgs.empty or remaining_avgs.max() <= 0:
-            final_list.append("Any/Versatile")
-            continue
-            
-        best = remaining_avgs.idxmax()
-        final_list.append(best)
-        remaining_avgs[best] -= 1 # "Use" one instance of this archetype
-        
-    return final_list
-
 def analyze_ideal_lineups(lineups_df, off_map, def_map, team_map):
     print("Analyzing compositions...")
     
-    # Storage
-    # Playstyle -> List of [List of 5 OFF Archetypes]
-    style_off_data = {}
-    style_def_data = {}
+    # Encode: GROUP_ID -> N x 5 PLAYER_IDs -> archetype codes -> N x K count matrices
+    playstyle = lineups_df['TEAM_ID'].map(team_map).fillna("Unknown").to_numpy()
+    ids, sizes = parse_group_ids(lineups_df['GROUP_ID'])
+    keep = (playstyle != "Unknown") & (sizes == N_SLOTS)
+    if not keep.any():
+        return pd.DataFrame()
+    ids = ids[keep][:, :N_SLOTS]
     
-    for _, row in lineups_df.iterrows():
-        team_id = row['TEAM_ID']
-        playstyle = team_map.get(team_id, "Unknown")
-        if playstyle == "Unknown": continue
-        
-        # Parse IDs
-        raw_ids = row['GROUP_ID'].strip('-').split('-')
-        pids = [int(p) for p in raw_ids if p]
-        
-        if len(pids) != 5: continue
-        
-        # Get Archetypes for this lineup
-        lineup_off = [off_map.get(p, "Replacement/Unknown") for p in pids]
-        lineup_def = [def_map.get(p, "Replacement/Unknown") for p in pids]
-        
-        if playstyle not in style_off_data:
-            style_off_data[playstyle] = []
-            style_def_data[playstyle] = []
-            
-        style_off_data[playstyle].append(lineup_off)
-        style_def_data[playstyle].append(lineup_def)
-        
-    # Build Result DataFrame
-    results = []
+    # Playstyles in order of first appearance, one group per playstyle
+    groups, styles = pd.factorize(playstyle[keep])
+    result = pd.DataFrame({'Playstyle': styles, 'Lineups_Analyzed': np.bincount(groups)})
     
-    for style in style_off_data.keys():
-        off_lineups = style_off_data[style]
-        def_lineups = style_def_data[style]
-        
-        # Calc Ideal 5
-        ideal_off = get_ideal_composition_list(off_lineups)
-        ideal_def = get_ideal_composition_list(def_lineups)
-        
-        row = {'Playstyle': style, 'Lineups_Analyzed': len(off_lineups)}
-        
-        for i in range(5):
-            row[f'OFF_Slot_{i+1}'] = ideal_off[i]
-            row[f'DEF_Slot_{i+1}'] = ideal_def[i]
-            
-        results.append(row)
+    for side, archetype_map in [('OFF', off_map), ('DEF', def_map)]:
+        codes, names = encode_archetypes(ids, pd.Series(archetype_map, dtype=object), UNKNOWN_ARCHETYPE)
+        counts = composition_counts(codes, len(names))
+        first = first_appearance(codes, groups, len(styles), len(names))
+        slots, _ = ideal_compositions(counts, groups, len(styles), first, N_SLOTS)
+        labels = np.append(np.asarray(names, dtype=object), OPEN_SLOT)[slots]
+        for i in range(N_SLOTS):
+            result[f'{side}_Slot_{i+1}'] = labels[:, i]
         
-    return pd.DataFrame(results)
+    return result
 
 def main():
     off_map, def_map, team_map = load_reference_data()
@@ -1,15 +1,21 @@
 
 import pandas as pd
 import numpy as np
+import os
+import sys
 from sklearn.preprocessing import StandardScaler
 from sklearn.cluster import KMeans
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cluster_sweep import sweep_k
+from archetype_models import align_to_previous_output, soft_memberships
+
 # --- Configuration ---
 INPUT_FILE = 'nba_player_archetypes_2025.csv'
 OUTPUT_FILE = 'nba_player_clusters.csv'
 MIN_GP = 10
 MIN_MPG = 10
-N_CLUSTERS = 8
+N_CLUSTERS = 8  # Run with --sweep to score other k values
 RANDOM_STATE = 42
 
 # Define features for clustering
@@ -70,7 +76,7 @@ def generate_persona_name(center_series):
         
     return ", ".join(traits)
 
-def main():
+def main(sweep=False):
     print(f"Loading data from {INPUT_FILE}...")
     try:
         df = pd.read_csv(INPUT_FILE)
@@ -91,6 +97,10 @@ def main():
         print(f"Error: Missing columns in CSV: {missing_cols}")
         return
 
+    if sweep:
+        sweep_k(df_filtered, FEATURES, 'player_archetypes')
+        return
+
     X = df_filtered[FEATURES].fillna(0)
 
     # Standardize
@@ -105,15 +115,20 @@ def main():
     kmeans = KMeans(n_clusters=N_CLUSTERS, random_state=RANDOM_STATE, n_init=10)
     clusters = kmeans.fit_predict(X_scaled_df)
     
-    df_filtered['Cluster'] = clusters
+    # Keep the previous run's cluster ids (KMeans numbers clusters arbitrarily on every refit)
+    cluster_ids = align_to_previous_output(scaler.inverse_transform(kmeans.cluster_centers_), FEATURES, scaler.scale_, OUTPUT_FILE)
+    df_filtered['Cluster'] = cluster_ids[clusters]
+    # Soft memberships (float32, one column per cluster id) for the lineup / FA recommenders
+    prob_cols = [f"P_Cluster_{cid}" for cid in cluster_ids]
+    df_filtered[prob_cols] = soft_memberships(X_scaled, kmeans.cluster_centers_)
 
     # 4. Generate Personas
     cluster_centers = pd.DataFrame(kmeans.cluster_centers_, columns=FEATURES)
     
     persona_map = {}
     print("\n--- Cluster Personas ---")
-    for cluster_id in range(N_CLUSTERS):
-        center = cluster_centers.iloc[cluster_id]
+    for row, cluster_id in enumerate(cluster_ids):
+        center = cluster_centers.iloc[row]
         persona_name = generate_persona_name(center)
         persona_map[cluster_id] = persona_name
         
@@ -129,9 +144,9 @@ def main():
 
     # 5. Save
     print(f"\nSaving results to {OUTPUT_FILE}...")
-    output_cols = ['PLAYER_ID', 'PLAYER_NAME', 'TEAM_ABBREVIATION', 'Archetype_Name', 'Cluster'] + FEATURES
+    output_cols = ['PLAYER_ID', 'PLAYER_NAME', 'TEAM_ABBREVIATION', 'Archetype_Name', 'Cluster'] + FEATURES + prob_cols
     df_filtered[output_cols].to_csv(OUTPUT_FILE, index=False)
     print("Done.")
 
 if __name__ == "__main__":
-    main()
+    main(sweep='--sweep' in sys.argv)
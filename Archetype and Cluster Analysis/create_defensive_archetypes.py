@@ -1,16 +1,25 @@
 
 import pandas as pd
 import numpy as np
+import os
+import sys
 from sklearn.preprocessing import StandardScaler
 from sklearn.cluster import KMeans
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cluster_sweep import sweep_k
+from archetype_models import align_to_previous_output, soft_memberships
+
 # --- Configuration ---
 INPUT_FILE = 'nba_defensive_archetypes_2025.csv'
 OUTPUT_FILE = 'nba_defensive_clusters.csv'
 MIN_GP = 10
 MIN_MPG = 10
-N_CLUSTERS = 8 # Target distinct defensive roles
+N_CLUSTERS = 8 # Target distinct defensive roles (run with --sweep to score other k values)
 RANDOM_STATE = 42
+# Also cluster on the opponent-adjusted difficulty (matchup_ratings.py, a PPP rating) when the
+# input has it; it is its own column, MATCHUP_DIFFICULTY stays the usage-weighted one
+USE_ADJUSTED_DIFFICULTY = True
 
 def generate_persona_name(center_series):
     """
@@ -42,6 +51,7 @@ def generate_persona_name(center_series):
             'DREB_PCT': 'Rebounding',
             'VERSATILITY_RATING': 'Versatile',
             'MATCHUP_DIFFICULTY': 'High Difficulty',
+            'ADJ_MATCHUP_DIFFICULTY': 'Tough Assignments',
         }
         
         readable = name_map.get(feature, feature)
@@ -62,7 +72,7 @@ def generate_persona_name(center_series):
         
     return name
 
-def main():
+def main(sweep=False):
     print(f"Loading {INPUT_FILE}...")
     try:
         df = pd.read_csv(INPUT_FILE)
@@ -81,13 +91,19 @@ def main():
     df['BLK_PER_75'] = (df['BLK'] / df['MIN_HUSTLE']) * 36
     # Note: MIN_HUSTLE is per game.
     # Check for NaNs/Inf usually not an issue with filter > 10 MPG
-    
     features = [
         'DEFLECTIONS_PER_75', 'STL_PER_75', 'BLK_PER_75',
         'DREB_PCT', 'VERSATILITY_RATING', 'MATCHUP_DIFFICULTY',
         'dPG_PCT', 'dSG_PCT', 'dSF_PCT', 'dPF_PCT', 'dC_PCT'
     ]
+    if USE_ADJUSTED_DIFFICULTY and 'ADJ_MATCHUP_DIFFICULTY' in df.columns:
+        print("Adding opponent-adjusted matchup difficulty.")
+        features.append('ADJ_MATCHUP_DIFFICULTY')
     
+    if sweep:
+        sweep_k(df, features, 'defensive_archetypes')
+        return
+
     # Fill Nans
     X = df[features].fillna(0)
     
@@ -100,15 +116,20 @@ def main():
     print(f"Clustering (k={N_CLUSTERS})...")
     kmeans = KMeans(n_clusters=N_CLUSTERS, random_state=RANDOM_STATE, n_init=10)
     clusters = kmeans.fit_predict(X_scaled_df)
-    df['Cluster'] = clusters
+    # Keep the previous run's cluster ids (KMeans numbers clusters arbitrarily on every refit)
+    cluster_ids = align_to_previous_output(scaler.inverse_transform(kmeans.cluster_centers_), features, scaler.scale_, OUTPUT_FILE)
+    df['Cluster'] = cluster_ids[clusters]
+    # Soft memberships (float32, one column per cluster id) for the lineup / FA recommenders
+    prob_cols = [f"P_Cluster_{cid}" for cid in cluster_ids]
+    df[prob_cols] = soft_memberships(X_scaled, kmeans.cluster_centers_)
     
     # 5. Personas
     centers = pd.DataFrame(kmeans.cluster_centers_, columns=features)
     persona_map = {}
     
     print("\n--- Defensive Archetypes ---")
-    for cid in range(N_CLUSTERS):
-        center = centers.iloc[cid]
+    for row, cid in enumerate(cluster_ids):
+        center = centers.iloc[row]
         # Custom logic for naming to be more specific than generic generator
         # Check defining characteristics manually for better naming?
         # Or improve the generator. Let's try generator first.
@@ -135,9 +156,9 @@ def main():
     df['Archetype_Name'] = df['Cluster'].map(persona_map)
     
     # 6. Save
-    cols = ['PLAYER_ID', 'PLAYER_NAME', 'Archetype_Name', 'Cluster'] + features
+    cols = ['PLAYER_ID', 'PLAYER_NAME', 'Archetype_Name', 'Cluster'] + features + prob_cols
     df[cols].to_csv(OUTPUT_FILE, index=False)
     print(f"\nSaved to {OUTPUT_FILE}")
 
 if __name__ == "__main__":
-    main()
+    main(sweep='--sweep' in sys.argv)
@@ -1,8 +1,13 @@
 import pandas as pd
 import numpy as np
 import os
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_lake import load_dataset, write_dataset, partition_values, has_dataset
+from archetype_models import OFF_FEATURES, DEF_FEATURES, MODEL_SPECS, build_archetype_models, build_all_seasons_models, assign_clusters, assign_memberships
+from cluster_sweep import sweep_k
+from comparables import build_comparables_index
 
 # --- Configuration ---
 DATA_DIR = '/Users/ryanstrain/Desktop/COI V2/Archetype and Cluster Analysis'
@@ -21,241 +26,146 @@ FILE_HIST_GEN = os.path.join(HIST_DIR, 'General', 'nba_historical_general_stats_
 OUTPUT_FILE = os.path.join(DATA_DIR, 'Master_Archetype_CSV.csv')
 
 # --- Feature Definitions ---
+# OFF_FEATURES / DEF_FEATURES (and the 2025 column renames) live in archetype_models.py so
+# the saved models, the historical labels and the weekly update all use the same features.
 
-# Map 2025 Columns to Standard Internal Names
-# We need to use the SAME features for training and prediction.
-# We will rename the 2025 columns to match our Historical columns where possible, or vice versa.
-# Let's standardize on the Historical naming convention derived from Synergy/API.
-
-OFF_FEATURES = [
-    'Isolation_FREQ', 'Isolation_PPP',
-    'PRBallHandler_FREQ', 'PRBallHandler_PPP',
-    'PRRollMan_FREQ', 'PRRollMan_PPP',
-    'Postup_FREQ', 'Postup_PPP',
-    'Spotup_FREQ', 'Spotup_PPP',
-    'Handoff_FREQ', 'Handoff_PPP',
-    'Cut_FREQ', 'Cut_PPP',
-    'OffScreen_FREQ', 'OffScreen_PPP',
-    'OffRebound_FREQ', 'OffRebound_PPP', # Note: 2025 might be Putback
-    'Transition_FREQ', 'Transition_PPP',
-    'USG_PCT', 'AST_PCT'
-]
+# Only these columns are read from the historical datasets (the rest are never used)
+HIST_KEY_COLS = ['PLAYER_ID', 'SEASON', 'PLAYER_NAME', 'TEAM_ABBREVIATION']
+HIST_COLS = HIST_KEY_COLS + OFF_FEATURES + DEF_FEATURES
 
-DEF_FEATURES = [
-    'STL', 'BLK', 'DREB_PCT', 'DEF_RATING',
-    'CONTESTED_SHOTS'
-    # Dropped: Matchup stats, Deflections, Charges, Loose Balls (due to mismatch)
+EXPORT_COLS = [
+    'PLAYER_ID', 'PLAYER_NAME', 'SEASON', 'TEAM_ABBREVIATION',
+    'Offensive Archetype', 'Defensive Archetype',
+    'Off_Cluster', 'Def_Cluster',
+    'USG_PCT', 'AST_PCT', 'DEF_RATING'
 ]
 
-def load_and_prep_2025_off(file_path):
-    df = pd.read_csv(file_path)
-    
-    # Map 2025 columns to OFF_FEATURES
-    # Need to inspect 2025 headers again mentally or via map.
-    # 2025 headers: 'PICK__ROLL_BALL_HANDLER_FREQ', ... 'PUTBACK_FREQ', ...
-    
-    rename_map = {
-        'PICK__ROLL_BALL_HANDLER_FREQ': 'PRBallHandler_FREQ',
-        'PICK__ROLL_BALL_HANDLER_PPP': 'PRBallHandler_PPP',
-        'PICK__ROLL_ROLL_MAN_FREQ': 'PRRollMan_FREQ',
-        'PICK__ROLL_ROLL_MAN_PPP': 'PRRollMan_PPP',
-        'ISOLATION_FREQ': 'Isolation_FREQ',
-        'ISOLATION_PPP': 'Isolation_PPP',
-        'HANDOFF_FREQ': 'Handoff_FREQ',
-        'HANDOFF_PPP': 'Handoff_PPP',
-        'OFF_SCREEN_FREQ': 'OffScreen_FREQ',
-        'OFF_SCREEN_PPP': 'OffScreen_PPP',
-        'CUT_FREQ': 'Cut_FREQ',
-        'CUT_PPP': 'Cut_PPP',
-        'PUTBACK_FREQ': 'OffRebound_FREQ', # Map Putback -> OffRebound (Synergy name)
-        'PUTBACK_PPP': 'OffRebound_PPP',
-        'POST_UP_FREQ': 'Postup_FREQ',
-        'POST_UP_PPP': 'Postup_PPP',
-        'SPOT_UP_FREQ': 'Spotup_FREQ',
-        'SPOT_UP_PPP': 'Spotup_PPP',
-        'TRANSITION_FREQ': 'Transition_FREQ',
-        'TRANSITION_PPP': 'Transition_PPP'
-    }
-    
-    df = df.rename(columns=rename_map)
-    # Filter to features
-    return df
-
-def load_and_prep_2025_def(file_path):
-    df = pd.read_csv(file_path)
-    return df
-
-def train_kmeans(df, features, k, random_state=42):
-    scaler = StandardScaler()
-    X = df[features].fillna(0)
-    X_scaled = scaler.fit_transform(X)
-    
-    kmeans = KMeans(n_clusters=k, random_state=random_state, n_init=10)
-    kmeans.fit(X_scaled)
-    
-    return kmeans, scaler
+def safe_merge(left_df, right_df, on_keys):
+    # Identify cols in right that are in left but NOT in keys
+    # We want to keep the Left version (General has good names)
+    cols_to_drop = [c for c in right_df.columns if c in left_df.columns and c not in on_keys]
+    right_reduced = right_df.drop(columns=cols_to_drop)
+    return pd.merge(left_df, right_reduced, on=on_keys, how='left')
 
-def map_clusters_to_labels(df, cluster_col, label_col):
+def load_historical_features(filters=None):
     """
-    Creates a mapping from Cluster ID -> Label based on the 2025 ground truth.
+    Merges the four historical datasets (optionally one season via filters, e.g.
+    [('SEASON', '==', '2019-20')]) into one row per player-season with model features.
     """
-    mapping = {}
-    for cluster_id in df[cluster_col].unique():
-        # Get the mode of the usage label in this cluster
-        subset = df[df[cluster_col] == cluster_id]
-        if not subset.empty and label_col in subset.columns:
-            mode_label = subset[label_col].mode()
-            if not mode_label.empty:
-                mapping[cluster_id] = mode_label[0]
-            else:
-                mapping[cluster_id] = "Unknown"
-        else:
-            mapping[cluster_id] = "Unknown"
-    return mapping
-
-def main():
-    print("Loading data...")
+    df_hist_off_pt = load_dataset('historical_offensive_playtypes', columns=HIST_COLS, filters=filters, csv_path=FILE_HIST_OFF_PT)
+    df_hist_off_pnr = load_dataset('historical_pnr', columns=HIST_COLS, filters=filters, csv_path=FILE_HIST_OFF_PNR)
+    df_hist_def = load_dataset('historical_defensive', columns=HIST_COLS, filters=filters, csv_path=FILE_HIST_DEF)
+    df_hist_gen = load_dataset('historical_general', columns=HIST_COLS, filters=filters, csv_path=FILE_HIST_GEN)
     
-    # 1. Load 2025 Data (Ground Truth)
-    df_25_off = load_and_prep_2025_off(FILE_2025_OFF)
-    df_25_def = load_and_prep_2025_def(FILE_2025_DEF)
-    
-    # Verify Features exist in 2025 data
-    missing_off = [f for f in OFF_FEATURES if f not in df_25_off.columns]
-    if missing_off:
-        print(f"Warning: Missing Offensive Features in 2025 data: {missing_off}")
-        # Identify columns that were not renamed correctly? 
-        # For now, let's assume mapping covers it.
-    
-    missing_def = [f for f in DEF_FEATURES if f not in df_25_def.columns]
-    if missing_def:
-        print(f"Warning: Missing Defensive Features in 2025 data: {missing_def}")
-        
-    print("Training 2025 Models...")
-    # Helper to get optimal K from existing labels? 
-    # Offense Archetype col: 'Offensive Archetype' (Need to check col name)
-    # Defense Archetype col: 'Defensive Archetype' (Need to check col name)
-    # I'll check column names in the files dynamically.
-    
-    # Check 2025 Label Columns
-    off_label_col = 'Aggr_Archetype' if 'Aggr_Archetype' in df_25_off.columns else 'Offensive Archetype' # Guessing
-    # Actually, let's print headers if needed, but I'll assume 'Offensive Archetype' exists or similar.
-    # From previous `head`, I didn't see explicit label column in the first line?
-    # Wait, the `head` output for 2025 Off file:
-    # PLAYER_ID,PLAYER_NAME,... (Features)
-    # I did NOT see 'Offensive Archetype' in the first line of the snippet?
-    # Maybe it's at the end or I missed it. I must assume it exists or I can't map labels!
-    # If it's NOT in the file, I can't map. 
-    # Assuming 'nba_player_archetypes_2025.csv' HAS the archetypes.
-    
-    # 2. Load Historical Data
-    print("Loading Historical Data...")
-    df_hist_off_pt = pd.read_csv(FILE_HIST_OFF_PT)
-    df_hist_off_pnr = pd.read_csv(FILE_HIST_OFF_PNR)
-    df_hist_def = pd.read_csv(FILE_HIST_DEF)
-    df_hist_gen = pd.read_csv(FILE_HIST_GEN)
-    
-    # Merge Historical Data
     # Base: General Stats (Has best list of players/seasons)
     full_df = df_hist_gen.copy()
     
-    # Helper to merge and avoid suffixes for metadata
-    def safe_merge(left_df, right_df, on_keys):
-        # Identify cols in right that are in left but NOT in keys
-        # We want to keep the Left version (General has good names)
-        cols_to_drop = [c for c in right_df.columns if c in left_df.columns and c not in on_keys]
-        right_reduced = right_df.drop(columns=cols_to_drop)
-        return pd.merge(left_df, right_reduced, on=on_keys, how='left')
-    
-    # Merge Playtypes
-    print("Merging Offensive Playtypes...")
+    # Merge Playtypes, then P&R
     full_df = safe_merge(full_df, df_hist_off_pt, ['PLAYER_ID', 'SEASON'])
-    
-    # Merge P&R
-    print("Merging P&R Data...")
     full_df = safe_merge(full_df, df_hist_off_pnr, ['PLAYER_ID', 'SEASON'])
     
     # Merge Defensive
-    # Note: Def Stats file has some cols that overlap with Gen (GP, MIN). 
-    # safe_merge handles dropping duplicates.
-    print("Merging Defensive Data...")
-    cols_to_use_def = ['PLAYER_ID', 'SEASON'] + [c for c in DEF_FEATURES if c in df_hist_def.columns and c not in ['STL','BLK','DREB_PCT','DEF_RATING']]
     # Note: STL/BLK etc inside DEF_FEATURES might be in General.
     # If they are in General, safe_merge will drop the Defensive version.
-    # Check if we prefer Defensive Source for these? 
-    # General: STL, BLK (Per Game). 2025 Model expects Per Game or Scaled.
-    # Historical General likely matches.
     full_df = safe_merge(full_df, df_hist_def, ['PLAYER_ID', 'SEASON'])
     
-    # Fill NaNs
+    # Fill NaNs in the model features only
     # Playtype freqs/PPPs -> 0
     # Hustle stats -> 0
-    # USG/AST -> median? or 0? 0 is safer for outlier detection, but might skew clustering.
     # Clustering usually handles 0 fine if scaled.
-    full_df = full_df.fillna(0)
-    
-    # 3. Model Training & prediction
-    
-    # OFFENSE
-    k_off = 8 # Assumption based on standard archetypes
-    kmeans_off, scaler_off = train_kmeans(df_25_off, OFF_FEATURES, k_off)
-    
-    # Predict clusters for 2025 to build Map
-    df_25_off['Cluster'] = kmeans_off.predict(scaler_off.transform(df_25_off[OFF_FEATURES].fillna(0)))
-    
-    # Determine Labels
-    # If 'Offensive Archetype' isn't in 2025 data, we just use Cluster IDs or generated names.
-    # The user wanted "Offensive and Defensive Archetype". 
-    # I will attempt to find the label column.
-    possible_cols = ['Offensive Archetype', 'Archetype', 'Cluster Name']
-    found_col = next((c for c in possible_cols if c in df_25_off.columns), None)
-    
-    off_mapping = {}
-    if found_col:
-        off_mapping = map_clusters_to_labels(df_25_off, 'Cluster', found_col)
-    else:
-        # Fallback: Just string "Off_Cluster_X"
-        for i in range(k_off): off_mapping[i] = f"Off_Cluster_{i}"
-        
-    # Predict for Historical
-    X_hist_off = full_df[OFF_FEATURES].fillna(0)
-    full_df['Off_Cluster'] = kmeans_off.predict(scaler_off.transform(X_hist_off))
-    full_df['Offensive Archetype'] = full_df['Off_Cluster'].map(off_mapping)
-    
-    # DEFENSE
-    k_def = 5 # Assumption
-    kmeans_def, scaler_def = train_kmeans(df_25_def, DEF_FEATURES, k_def)
-    
-    # Predict clusters for 2025
-    df_25_def['Cluster'] = kmeans_def.predict(scaler_def.transform(df_25_def[DEF_FEATURES].fillna(0)))
-    
-    # Determine Labels
-    possible_cols_def = ['Defensive Archetype', 'Archetype', 'Cluster Name']
-    found_col_def = next((c for c in possible_cols_def if c in df_25_def.columns), None)
+    feature_cols = [c for c in OFF_FEATURES + DEF_FEATURES if c in full_df.columns]
+    full_df[feature_cols] = full_df[feature_cols].fillna(0)
+    return full_df
+
+def label_archetypes(df, models):
+    """
+    Assigns both archetypes (nearest saved centroid) plus float32 soft memberships
+    (P_Off_Cluster_*, P_Def_Cluster_*) and keeps the export columns.
+    """
+    df = df.copy()
+    df['Off_Cluster'], df['Offensive Archetype'] = assign_clusters(df, models['offense'])
+    df['Def_Cluster'], df['Defensive Archetype'] = assign_clusters(df, models['defense'])
+    memberships = [assign_memberships(df, models['offense']), assign_memberships(df, models['defense'])]
+    return pd.concat([df[[c for c in EXPORT_COLS if c in df.columns]]] + memberships, axis=1)
+
+def changed_seasons(export_df):
+    """
+    Compares export_df with the saved master_archetypes dataset by PLAYER_ID + SEASON.
+    Returns (seasons holding any added, removed or changed row, number of changed rows).
+    Cluster ids are aligned across refits, so usually only a few players move.
+    """
+    if not has_dataset('master_archetypes'):
+        return sorted(export_df['SEASON'].astype(str).unique()), len(export_df)
+    keys = ['PLAYER_ID', 'SEASON']
+    value_cols = [c for c in export_df.columns if c not in keys]
+    old = load_dataset('master_archetypes', columns=keys + value_cols)
+    if any(c not in old.columns for c in value_cols):
+        # New columns (e.g. memberships) have to reach every partition
+        return sorted(export_df['SEASON'].astype(str).unique()), len(export_df)
+    new = export_df.assign(SEASON=export_df['SEASON'].astype(str))
+    old = old.assign(SEASON=old['SEASON'].astype(str))
+    # Some player-seasons have several rows; pair them up in order
+    new['_ROW'] = new.groupby(keys).cumcount()
+    old['_ROW'] = old.groupby(keys).cumcount()
+    both = new.merge(old, on=keys + ['_ROW'], how='outer', suffixes=('', '_old'), indicator=True)
+
+    changed = both['_merge'] != 'both'
+    for col in value_cols:
+        a, b = both[col], both[f"{col}_old"]
+        changed |= (a != b) & ~(a.isna() & b.isna())
+    return sorted(both.loc[changed, 'SEASON'].unique()), int(changed.sum())
+
+def sweep_archetype_k():
+    """
+    Scores k for the offense/defense models on every historical season (per-season fits,
+    weighted by season size). Cached per season, so adding a season only fits that season.
+    """
+    full_df = load_historical_features()
+    for name, spec in MODEL_SPECS.items():
+        features = [f for f in spec['features'] if f in full_df.columns]
+        _, best_k = sweep_k(full_df, features, f"master_{name}", group_col='SEASON')
+        print(f"{name}: configured k={spec['k']}, recommended k={best_k}")
+
+def main(all_seasons=False, warm_start=True):
+    print("Loading data...")
     
-    def_mapping = {}
-    if found_col_def:
-        def_mapping = map_clusters_to_labels(df_25_def, 'Cluster', found_col_def)
+    # 1. Fit the 2025 (Ground Truth) models once and save them as versioned artifacts
+    # The weekly archetype update loads these instead of re-running KMeans.
+    print("Training 2025 Models...")
+    models = build_archetype_models(FILE_2025_OFF, FILE_2025_DEF)
+    
+    if all_seasons:
+        # 2b. Fit on every historical season instead, streaming one season at a time.
+        # Memory stays bounded by one season's merge; new seasons warm-start the saved model.
+        seasons = partition_values('historical_general', csv_path=FILE_HIST_GEN)
+        load_season = lambda season: load_historical_features([('SEASON', '==', season)])
+        models = build_all_seasons_models(seasons, load_season, warm_start=warm_start, source='historical_general')
+        print("Assigning Historical Archetypes season by season...")
+        export_df = pd.concat([label_archetypes(load_season(season), models) for season in seasons], ignore_index=True)
     else:
-        for i in range(k_def): def_mapping[i] = f"Def_Cluster_{i}"
-        
-    # Predict for Historical
-    X_hist_def = full_df[DEF_FEATURES].fillna(0)
-    full_df['Def_Cluster'] = kmeans_def.predict(scaler_def.transform(X_hist_def))
-    full_df['Defensive Archetype'] = full_df['Def_Cluster'].map(def_mapping)
-    
-    # 4. Save
-    cols_export = [
-        'PLAYER_ID', 'PLAYER_NAME', 'SEASON', 'TEAM_ABBREVIATION',
-        'Offensive Archetype', 'Defensive Archetype',
-        'Off_Cluster', 'Def_Cluster',
-        'USG_PCT', 'AST_PCT', 'DEF_RATING'
-    ]
-    # Ensure cols exist
-    cols_export = [c for c in cols_export if c in full_df.columns]
-    
-    full_df[cols_export].to_csv(OUTPUT_FILE, index=False)
+        # 2. Load Historical Data
+        print("Loading Historical Data...")
+        full_df = load_historical_features()
+        # 3. Assign Historical Archetypes (nearest saved centroid)
+        export_df = label_archetypes(full_df, models)
+    
+    # 4. Save: only seasons with a changed assignment are rewritten in the lake
+    seasons, n_changed = changed_seasons(export_df)
+    print(f"{n_changed} player-seasons changed archetype ({len(seasons)} season(s) to rewrite).")
+    if seasons:
+        write_dataset(export_df[export_df['SEASON'].astype(str).isin(seasons)], 'master_archetypes')
+    # Memberships stay in the lake (float32 Parquet); the CSV hand-off keeps its columns
+    export_df[[c for c in EXPORT_COLS if c in export_df.columns]].to_csv(OUTPUT_FILE, index=False)
     print(f"Saved Master Archetype file to {OUTPUT_FILE}")
+    if seasons:
+        # Memberships are part of the comparables vectors; re-encode the changed seasons
+        build_comparables_index()
 
 if __name__ == "__main__":
-    main()
+    # --all-seasons: fit archetypes on the full 2015-2025 corpus (streaming) instead of 2025 only
+    # --no-warm-start: refit the all-seasons models from scratch
+    # --sweep: only report the recommended k per model (k is set in archetype_models.MODEL_SPECS)
+    if '--sweep' in sys.argv:
+        sweep_archetype_k()
+    else:
+        main(all_seasons='--all-seasons' in sys.argv, warm_start='--no-warm-start' not in sys.argv)
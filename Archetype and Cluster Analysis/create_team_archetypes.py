@@ -1,13 +1,18 @@
 
 import pandas as pd
 import numpy as np
+import os
+import sys
 from sklearn.preprocessing import StandardScaler
 from sklearn.cluster import KMeans
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cluster_sweep import sweep_k
+
 # --- Configuration ---
 INPUT_FILE = 'nba_team_archetypes_2025.csv'
 OUTPUT_FILE = 'nba_team_clusters.csv'
-N_CLUSTERS = 6
+N_CLUSTERS = 6  # Run with --sweep to score other k values
 RANDOM_STATE = 42
 
 FEATURES = [
@@ -65,7 +70,7 @@ def generate_persona_name(center_series):
         
     return " + ".join(traits[:3])
 
-def main():
+def main(sweep=False):
     print(f"Loading {INPUT_FILE}...")
     try:
         df = pd.read_csv(INPUT_FILE)
@@ -73,6 +78,10 @@ def main():
         print("File not found.")
         return
 
+    if sweep:
+        sweep_k(df, FEATURES, 'team_archetypes')
+        return
+
     # 1. Feature Prep
     X = df[FEATURES].fillna(0)
     
@@ -109,4 +118,4 @@ def main():
     print(f"\nSaved to {OUTPUT_FILE}")
 
 if __name__ == "__main__":
-    main()
+    main(sweep='--sweep' in sys.argv)
@@ -1,66 +1,53 @@
 
 import pandas as pd
-import time
-from nba_api.stats.endpoints import leaguedashplayerstats, synergyplaytypes
+import os
+import sys
+from nba_api.stats.endpoints import leaguedashplayerstats
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from nba_fetch import fetch_frames
+from synergy_fetch import fetch_playtype_frames
 
 # --- CONFIGURATION ---
 SEASON = '2024-25'
 OUTPUT_FILE = 'nba_player_archetypes_2025.csv'
 
-def get_synergy_stats(play_type):
-    """Fetches Synergy stats for a specific play type."""
-    print(f"Fetching Synergy: {play_type}...")
-    try:
-        # Note: 
-        # play_type_nullable values: 'Transition', 'Isolation', 'PRBallHandler', 'PRRollMan', 'Postup', 'Spotup', 'Handoff', 'Cut', 'OffScreen', 'OffRebound' (Putback)
-        # type_grouping_nullable: 'Offensive'
-        
-        # Mappings for user friendly names to API names if needed
-        api_play_type_map = {
-            'Pick & Roll Ball Handler': 'PRBallHandler',
-            'Pick & Roll Roll Man': 'PRRollMan',
-            'Putback': 'OffRebound',
-            'Post Up': 'Postup',
-            'Spot Up': 'Spotup',
-            'Off-Screen': 'OffScreen'
-        }
-        
-        query_play_type = api_play_type_map.get(play_type, play_type)
-        
-        synergy = synergyplaytypes.SynergyPlayTypes(
-            player_or_team_abbreviation='P',
-            play_type_nullable=query_play_type,
-            type_grouping_nullable='Offensive',
-            season=SEASON
-        )
-        df = synergy.get_data_frames()[0]
-        time.sleep(0.6) # Gentle rate limiting
-        
-        # Keep relevant columns and rename
-        # Common cols: PLAYER_ID, PLAYER_NAME, TEAM_ABBREVIATION, GP, POSS_PCT, PPP, etc.
-        # We want Frequency (POSS_PCT) and PPP.
-        
-        cols_to_keep = ['PLAYER_ID', 'POSS_PCT', 'PPP']
-        df_subset = df[cols_to_keep].copy()
-        
-        # Rename to include playtype prefix
-        prefix = play_type.replace(' ', '_').replace('&', '').replace('-', '_').upper()
-        df_subset.rename(columns={
-            'POSS_PCT': f'{prefix}_FREQ',
-            'PPP': f'{prefix}_PPP'
-        }, inplace=True)
-        
-        return df_subset
-    except Exception as e:
-        print(f"Error fetching {play_type}: {e}")
-        return pd.DataFrame()
+# Mappings for user friendly names to API names
+API_PLAY_TYPE_MAP = {
+    'Pick & Roll Ball Handler': 'PRBallHandler',
+    'Pick & Roll Roll Man': 'PRRollMan',
+    'Putback': 'OffRebound',
+    'Post Up': 'Postup',
+    'Spot Up': 'Spotup',
+    'Off-Screen': 'OffScreen'
+}
+
+def get_synergy_stats(play_types):
+    """Fetches Synergy Frequency (POSS_PCT) and PPP for every play type concurrently."""
+    print(f"Fetching Synergy: {len(play_types)} play types...")
+    api_types = [API_PLAY_TYPE_MAP.get(pt, pt) for pt in play_types]
+    
+    # Rename to include playtype prefix, e.g. PICK__ROLL_BALL_HANDLER_FREQ
+    prefixes = {
+        API_PLAY_TYPE_MAP.get(pt, pt): pt.replace(' ', '_').replace('&', '').replace('-', '_').upper()
+        for pt in play_types
+    }
+    
+    df = fetch_playtype_frames(
+        [SEASON], api_types, prefixes=prefixes, type_grouping_nullable='Offensive'
+    )[SEASON]
+    if df.empty:
+        return df
+    stat_cols = [c for c in df.columns if c.endswith('_FREQ') or c.endswith('_PPP')]
+    return df[['PLAYER_ID'] + stat_cols]
 
 def main():
     # 1. Fetch Advanced Stats
     print("Fetching Advanced Stats...")
-    adv = leaguedashplayerstats.LeagueDashPlayerStats(
+    adv = fetch_frames(
+        leaguedashplayerstats.LeagueDashPlayerStats,
         season=SEASON, measure_type_detailed_defense='Advanced'
-    ).get_data_frames()[0]
+    )[0]
     
     # Select cols: USG_PCT, AST_PCT, TS_PCT, OFF_RATING, DEF_RATING, PIE
     adv_cols = ['PLAYER_ID', 'PLAYER_NAME', 'TEAM_ABBREVIATION', 'MIN', 'GP', 
@@ -69,9 +56,10 @@ def main():
     
     # 2. Fetch Base Stats for 3PAr
     print("Fetching Base Stats (for 3PAr)...")
-    base = leaguedashplayerstats.LeagueDashPlayerStats(
+    base = fetch_frames(
+        leaguedashplayerstats.LeagueDashPlayerStats,
         season=SEASON, measure_type_detailed_defense='Base'
-    ).get_data_frames()[0]
+    )[0]
     
     # Calculate 3PAr = FG3A / FGA
     # Avoid division by zero
@@ -88,10 +76,9 @@ def main():
         'Spot Up', 'Transition'
     ]
     
-    for pt in play_types:
-        df_synergy = get_synergy_stats(pt)
-        if not df_synergy.empty:
-            df_final = pd.merge(df_final, df_synergy, on='PLAYER_ID', how='left')
+    df_synergy = get_synergy_stats(play_types)
+    if not df_synergy.empty:
+        df_final = pd.merge(df_final, df_synergy, on='PLAYER_ID', how='left')
     
     # 4. Fill NaNs
     # For Synergy stats, NaN usually means 0 frequency/possessions
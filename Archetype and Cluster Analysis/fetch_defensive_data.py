@@ -1,20 +1,33 @@
 
 import pandas as pd
 import numpy as np
-import time
+import os
+import sys
+from scipy import sparse
 from nba_api.stats.endpoints import leaguedashplayerstats, leaguehustlestatsplayer, leagueseasonmatchups, leaguedashplayerbiostats
 from nba_api.stats.static import teams
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from nba_fetch import fetch_frames
+from matchup_store import save_matchups
+from matchup_ratings import season_ratings
+
 # --- Configuration ---
 SEASON = '2024-25'
 OUTPUT_FILE = 'nba_defensive_archetypes_2025.csv'
 
+# Height (inches) cut-offs for the estimated position: < 76 PG, < 78 SG, < 80 SF, < 82 PF, else C
+POSITIONS = ['PG', 'SG', 'SF', 'PF', 'C']
+HEIGHT_CUTOFFS = [76, 78, 80, 82]
+PCT_COLS = [f'd{pos}_PCT' for pos in POSITIONS]
+
 def get_player_stats_and_positions():
     print("Fetching Player Bio/Stats (for positions and USG)...")
-    base = leaguedashplayerstats.LeagueDashPlayerStats(season=SEASON).get_data_frames()[0]
-    adv = leaguedashplayerstats.LeagueDashPlayerStats(
+    base = fetch_frames(leaguedashplayerstats.LeagueDashPlayerStats, season=SEASON)[0]
+    adv = fetch_frames(
+        leaguedashplayerstats.LeagueDashPlayerStats,
         season=SEASON, measure_type_detailed_defense='Advanced'
-    ).get_data_frames()[0]
+    )[0]
     
     cols_base = ['PLAYER_ID', 'PLAYER_NAME', 'TEAM_ID', 'GP', 'MIN', 'STL', 'BLK'] 
     
@@ -30,10 +43,10 @@ def get_player_stats_and_positions():
 
 def get_hustle_stats():
     print("Fetching Hustle Stats...")
-    hustle = leaguehustlestatsplayer.LeagueHustleStatsPlayer(season=SEASON, per_mode_time='PerGame').get_data_frames()[0]
+    hustle = fetch_frames(leaguehustlestatsplayer.LeagueHustleStatsPlayer, season=SEASON, per_mode_time='PerGame')[0]
     return hustle[['PLAYER_ID', 'DEFLECTIONS', 'CONTESTED_SHOTS', 'MIN']]
 
-def get_matchup_data(usg_map):
+def get_matchup_data():
     print("Fetching Matchup Data (Iterating Teams)...")
     all_matchups = []
     nba_teams = teams.get_teams()
@@ -42,110 +55,119 @@ def get_matchup_data(usg_map):
         tid = t['id']
         print(f"  Fetching vs {t['abbreviation']} ({i+1}/{30})...")
         try:
-            matchups = leagueseasonmatchups.LeagueSeasonMatchups(
+            df = fetch_frames(
+                leagueseasonmatchups.LeagueSeasonMatchups,
                 season=SEASON,
                 off_team_id_nullable=tid
-            )
-            df = matchups.get_data_frames()[0]
+            )[0]
             # Only keep columns we need to save memory
             df = df[['OFF_PLAYER_ID', 'DEF_PLAYER_ID', 'MATCHUP_TIME_SEC', 'PLAYER_PTS', 'PARTIAL_POSS']]
             all_matchups.append(df)
-            time.sleep(0.6)
         except Exception as e:
             print(f"  Error fetching {t['abbreviation']}: {e}")
             
     if not all_matchups:
-        return pd.DataFrame(), pd.DataFrame()
+        return pd.DataFrame()
         
-    full_matchups = pd.concat(all_matchups, ignore_index=True)
-    
-    # Difficulty
-    full_matchups['OPP_USG'] = full_matchups['OFF_PLAYER_ID'].map(usg_map)
-    full_matchups['USG_TIME'] = full_matchups['OPP_USG'] * full_matchups['MATCHUP_TIME_SEC']
-    
-    grouped = full_matchups.groupby('DEF_PLAYER_ID').agg({
-        'MATCHUP_TIME_SEC': 'sum',
-        'USG_TIME': 'sum'
-    }).reset_index()
-    
-    grouped['MATCHUP_DIFFICULTY'] = grouped['USG_TIME'] / grouped['MATCHUP_TIME_SEC']
-    
-    return grouped, full_matchups
+    return pd.concat(all_matchups, ignore_index=True)
+
+def parse_heights(heights):
+    """'6-8' -> 80 inches for a whole column; blanks and malformed values -> 0."""
+    parts = pd.Series(heights).astype('string').str.extract(r'^\s*(\d+)-(\d+)\s*$')
+    inches = pd.to_numeric(parts[0], errors='coerce') * 12 + pd.to_numeric(parts[1], errors='coerce')
+    return inches.fillna(0).astype('int64')
+
+def estimate_positions(height_inches):
+    """Position code per player (0-4 = POSITIONS, 5 = Unknown for a missing height)."""
+    h = np.asarray(height_inches)
+    return np.where(h > 0, np.searchsorted(HEIGHT_CUTOFFS, h, side='right'), len(POSITIONS))
 
 def get_positions_via_bio():
     print("Fetching Player Bio Stats...")
     # Corrected Endpoint Import
-    bio = leaguedashplayerbiostats.LeagueDashPlayerBioStats(season=SEASON).get_data_frames()[0]
-    
-    def parse_height(h_str):
-        try:
-            if isinstance(h_str, str) and '-' in h_str:
-                ft, inch = map(int, h_str.split('-'))
-                return ft * 12 + inch
-            return 0
-        except:
-            return 0
-            
-    bio['Height_Inches'] = bio['PLAYER_HEIGHT'].apply(parse_height)
-    
-    def estimate_pos(row):
-        h = row['Height_Inches']
-        if h == 0: return 'Unknown'
-        if h < 76: return 'PG'
-        if h < 78: return 'SG'
-        if h < 80: return 'SF'
-        if h < 82: return 'PF'
-        return 'C'
-        
-    bio['EST_POS'] = bio.apply(estimate_pos, axis=1)
-    return bio.set_index('PLAYER_ID')['EST_POS'].to_dict()
+    bio = fetch_frames(leaguedashplayerbiostats.LeagueDashPlayerBioStats, season=SEASON)[0]
+    codes = estimate_positions(parse_heights(bio['PLAYER_HEIGHT']))
+    return pd.Series(np.array(POSITIONS + ['Unknown'])[codes], index=bio['PLAYER_ID'])
+
+def aggregate_matchups(matchups, usg_map, pos_map):
+    """
+    Per-defender matchup summary: MATCHUP_DIFFICULTY (time-weighted opponent usage), share
+    of matchup time against each estimated position (dPG_PCT..dC_PCT) and VERSATILITY_RATING
+    (entropy of those shares). Defender x position time is one sparse matrix built with a
+    single COO sum, so the cost is linear in matchup rows. Rows are grouped per SEASON as
+    well when the frame has that column (multi-season pulls).
+    """
+    keys = [c for c in ['SEASON', 'DEF_PLAYER_ID'] if c in matchups.columns]
+    # Integer group code per row: (season code, defender code) packed into one int64
+    key_codes, key_uniques = zip(*(pd.factorize(matchups[k]) for k in keys))
+    packed = key_codes[0].astype(np.int64)
+    for kc, ku in zip(key_codes[1:], key_uniques[1:]):
+        packed = packed * len(ku) + kc
+    codes, group_packed = pd.factorize(packed, sort=True)
+    n = len(group_packed)
+    secs = matchups['MATCHUP_TIME_SEC'].to_numpy(dtype=np.float64)
+
+    # Opponent lookups run once per distinct offensive player, then broadcast to the rows
+    off_codes, off_ids = pd.factorize(matchups['OFF_PLAYER_ID'])
+    usg = pd.Series(usg_map, dtype='float64').reindex(off_ids).to_numpy()[off_codes]
+    pos_names = pd.Series(pos_map).reindex(off_ids).fillna('Unknown').to_numpy()
+    pos_codes = pd.Categorical(pos_names, categories=POSITIONS + ['Unknown']).codes[off_codes]
+
+    # Difficulty: sum(opponent USG * time) / sum(time); unknown opponents add time but no usage
+    total_time = np.bincount(codes, weights=secs, minlength=n)
+    usg_time = np.bincount(codes, weights=np.nan_to_num(usg * secs), minlength=n)
+
+    # Defender x position (last column = Unknown) time matrix
+    pos_time = sparse.coo_matrix((secs, (codes, pos_codes)), shape=(n, len(POSITIONS) + 1)).tocsr().toarray()
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        shares = pos_time[:, :len(POSITIONS)] / total_time[:, None]
+        difficulty = usg_time / total_time
+    shares = np.nan_to_num(shares)
+    logs = np.log(np.where(shares > 0, shares, 1.0))
+    versatility = -(shares * logs).sum(axis=1)
+
+    summary = pd.DataFrame(index=range(n))
+    for k, ku in reversed(list(zip(keys, key_uniques))):
+        summary[k] = ku[group_packed % len(ku)]
+        group_packed = group_packed // len(ku)
+    summary = summary[keys]
+    summary['MATCHUP_TIME_SEC'] = total_time
+    summary['MATCHUP_DIFFICULTY'] = difficulty
+    summary[PCT_COLS] = shares
+    summary['VERSATILITY_RATING'] = versatility
+    return summary
 
 def main():
     df_stats, usg_map = get_player_stats_and_positions()
     df_hustle = get_hustle_stats()
     df_hustle = df_hustle.rename(columns={'MIN': 'MIN_HUSTLE'})
     
-    df_matchup_grouped, full_matchups_df = get_matchup_data(usg_map)
+    full_matchups_df = get_matchup_data()
+    if not full_matchups_df.empty:
+        # Keep the raw pairs (sparse, per season) for matchup_store queries
+        save_matchups(full_matchups_df, SEASON)
+        # Opponent-adjusted ratings solved over the stored matchup graph
+        df_ratings = season_ratings(SEASON)[['PLAYER_ID', 'ADJ_MATCHUP_DIFFICULTY', 'DEF_MATCHUP_RATING']].dropna()
+    else:
+        df_ratings = pd.DataFrame()
     
-    # Positional
+    # Difficulty + Positional Distribution (vectorized over all matchup rows)
     if not full_matchups_df.empty:
         pos_map = get_positions_via_bio()
-        print("Calculating Positional Distribution...")
-        full_matchups_df['OPP_POS'] = full_matchups_df['OFF_PLAYER_ID'].map(pos_map).fillna('Unknown')
-        
-        pos_dist = full_matchups_df.pivot_table(
-            index='DEF_PLAYER_ID', columns='OPP_POS', values='MATCHUP_TIME_SEC', aggfunc='sum', fill_value=0
-        )
-        total_time = pos_dist.sum(axis=1)
-        
-        pct_cols = []
-        for pos in ['PG', 'SG', 'SF', 'PF', 'C']:
-            col_name = f'd{pos}_PCT'
-            pct_cols.append(col_name)
-            if pos in pos_dist.columns:
-                pos_dist[col_name] = pos_dist[pos] / total_time
-            else:
-                pos_dist[col_name] = 0.0
-                
-        def calc_entropy(row):
-            vals = row[pct_cols].values
-            vals = vals[vals > 0]
-            if len(vals) == 0: return 0
-            return -np.sum(vals * np.log(vals))
-            
-        pos_dist['VERSATILITY_RATING'] = pos_dist.apply(calc_entropy, axis=1)
+        print("Calculating Matchup Difficulty and Positional Distribution...")
+        df_matchups = aggregate_matchups(full_matchups_df, usg_map, pos_map)
     else:
-        pos_dist = pd.DataFrame()
-        pct_cols = []
+        df_matchups = pd.DataFrame()
 
     print("Merging...")
     final_df = pd.merge(df_stats, df_hustle, on='PLAYER_ID', how='left')
     
-    if not df_matchup_grouped.empty:
-        final_df = pd.merge(final_df, df_matchup_grouped[['DEF_PLAYER_ID', 'MATCHUP_DIFFICULTY']], left_on='PLAYER_ID', right_on='DEF_PLAYER_ID', how='left')
-        
-    if not pos_dist.empty:
-        final_df = pd.merge(final_df, pos_dist[pct_cols + ['VERSATILITY_RATING']], left_on='PLAYER_ID', right_index=True, how='left')
+    if not df_matchups.empty:
+        final_df = pd.merge(final_df, df_matchups[['DEF_PLAYER_ID', 'MATCHUP_DIFFICULTY'] + PCT_COLS + ['VERSATILITY_RATING']],
+                            left_on='PLAYER_ID', right_on='DEF_PLAYER_ID', how='left')
+    if not df_ratings.empty:
+        final_df = pd.merge(final_df, df_ratings, on='PLAYER_ID', how='left')
     
     # Calc Deflections/75 (Approx)
     final_df['MIN_HUSTLE'] = final_df['MIN_HUSTLE'].replace(0, np.nan)
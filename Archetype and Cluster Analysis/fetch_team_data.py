@@ -1,8 +1,12 @@
 
 import pandas as pd
-import time
+import os
+import sys
 from nba_api.stats.endpoints import leaguedashteamstats
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from nba_fetch import fetch_frames
+
 # --- Configuration ---
 SEASON = '2024-25'
 OUTPUT_FILE = 'nba_team_archetypes_2025.csv'
@@ -12,26 +16,27 @@ def fetch_data():
     
     # 1. Advanced Stats
     print("  Fetching Advanced...")
-    adv = leaguedashteamstats.LeagueDashTeamStats(
+    adv = fetch_frames(
+        leaguedashteamstats.LeagueDashTeamStats,
         season=SEASON, 
         measure_type_detailed_defense='Advanced'
-    ).get_data_frames()[0]
-    time.sleep(0.6)
+    )[0]
     
     # 2. Base Stats (for 3PAr)
     print("  Fetching Base...")
-    base = leaguedashteamstats.LeagueDashTeamStats(
+    base = fetch_frames(
+        leaguedashteamstats.LeagueDashTeamStats,
         season=SEASON, 
         measure_type_detailed_defense='Base'
-    ).get_data_frames()[0]
-    time.sleep(0.6)
+    )[0]
     
     # 3. Misc Stats (for Paint/FB points)
     print("  Fetching Misc...")
-    misc = leaguedashteamstats.LeagueDashTeamStats(
+    misc = fetch_frames(
+        leaguedashteamstats.LeagueDashTeamStats,
         season=SEASON, 
         measure_type_detailed_defense='Misc'
-    ).get_data_frames()[0]
+    )[0]
     
     return adv, base, misc
 
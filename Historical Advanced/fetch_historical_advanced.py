@@ -1,11 +1,18 @@
 
-import pandas as pd
-import time
+import os
+import sys
 from nba_api.stats.endpoints import leaguedashplayerstats
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from nba_fetch import fetch_frames
+from backfill import run_backfill
+from data_lake import write_dataset
+from comparables import build_comparables_index
+
 # --- Configuration ---
 START_YEAR = 1996
 END_YEAR = 2024 # Starts 2024-25 season
+OUTPUT_DIR = os.path.dirname(os.path.abspath(__file__))
 OUTPUT_FILE = 'nba_historical_advanced_stats_1997_2025.csv'
 
 # Column Mapping (API -> Output)
@@ -41,30 +48,23 @@ def get_season_string(start_year):
     end_part = (start_year + 1) % 100
     return f"{start_year}-{end_part:02d}"
 
+def fetch_season(season_str):
+    df = fetch_frames(
+        leaguedashplayerstats.LeagueDashPlayerStats,
+        season=season_str,
+        measure_type_detailed_defense='Advanced',
+        timeout=120
+    )[0]
+    df['SEASON'] = season_str
+    return df
+
 def fetch_all_seasons():
-    all_data = []
-    
-    for year in range(START_YEAR, END_YEAR + 1):
-        season_str = get_season_string(year)
-        print(f"Fetching {season_str}...")
-        
-        try:
-            df = leaguedashplayerstats.LeagueDashPlayerStats(
-                season=season_str,
-                measure_type_detailed_defense='Advanced',
-                timeout=120
-            ).get_data_frames()[0]
-            
-            df['SEASON'] = season_str
-            all_data.append(df)
-            
-            # Respect rate limits
-            time.sleep(0.6)
-            
-        except Exception as e:
-            print(f"  Error fetching {season_str}: {e}")
-            
-    return pd.concat(all_data, ignore_index=True) if all_data else pd.DataFrame()
+    # One checkpointed partition per season; a re-run only fetches missing/failed seasons
+    seasons = [get_season_string(year) for year in range(START_YEAR, END_YEAR + 1)]
+    df, failed = run_backfill('advanced', seasons, fetch_season, OUTPUT_DIR)
+    if failed:
+        print(f"Warning: {len(failed)} seasons missing from output: {', '.join(failed)}")
+    return df
 
 def process_and_save(df):
     print("Processing Data...")
@@ -103,13 +103,15 @@ def process_and_save(df):
     final_df = final_df.fillna('n/a')
     
     print(f"Saving {len(final_df)} rows to {OUTPUT_FILE}...")
-    final_df.to_csv(OUTPUT_FILE, index=False)
+    write_dataset(final_df, 'historical_advanced', csv_path=OUTPUT_FILE)
     print("Done.")
 
 def main():
     df = fetch_all_seasons()
     if not df.empty:
         process_and_save(df)
+        # Refresh the comparables index (only new or changed seasons are re-encoded)
+        build_comparables_index()
     else:
         print("No data fetched.")
 
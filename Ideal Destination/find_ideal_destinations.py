@@ -2,6 +2,13 @@
 import pandas as pd
 import numpy as np
 import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fa_parsing import load_cap_space, parse_money
+from player_index import attach_player_ids
+from fa_allocation import allocate_market
+from lineup_encoding import split_archetypes, normalize_archetype_lists
 
 # --- Configuration ---
 # Paths relative to the script location (inside 'Ideal Destination')
@@ -15,152 +22,187 @@ FILE_DEF_CLUSTERS = os.path.join(BASE_DIR, 'Archetype Analysis/nba_defensive_clu
 
 OUTPUT_FILE = 'ideal_destinations.csv'
 
+# Fit score points (per free agent and team)
+NEED_POINTS = 3          # per side (offense / defense) whose archetype the team needs
+CAP_SPACE_POINTS = 2     # can sign outright with cap space
+INCUMBENT_POINTS = 1     # Bird rights - can always re-sign
+TAXPAYER_MLE = 5200000   # Taxpayer MLE approx: any team can pay this much
+UNAFFORDABLE_SCORE = -99
+TOP_K = 3                # destinations kept per player (best + alternatives)
+
+# Reason text for every combination of (offensive need, defensive need, incumbent, cap space fit)
+REASONS = np.array([
+    ", ".join(text for flag, text in zip(bits, ["Offensive Need", "Defensive Need", "Incumbent", "Cap Space Fit"]) if flag)
+    for bits in np.ndindex(2, 2, 2, 2)
+], dtype=object)
+
 def load_data():
     print("Loading datasets...")
     needs_df = pd.read_csv(FILE_NEEDS)
     
-    cap_df = pd.read_csv(FILE_CAP)
-    def clean_money(x):
-        if not isinstance(x, str): return 0
-        clean = x.replace('$', '').replace(',', '')
-        try: return float(clean)
-        except: return 0
-    cap_df['Cap_Space_Clean'] = cap_df['Cap SpaceAll'].apply(clean_money)
+    cap_df = load_cap_space(FILE_CAP)
     cap_map = cap_df.set_index('Team')['Cap_Space_Clean'].to_dict()
     
     fa_df = pd.read_csv(FILE_FA)
     # Cleaning Columns from previous experience
     # Header format assumed consistent with previous step
     fa_df.columns = ['From', 'Player', 'Pos', 'Yrs', 'Value', 'AAV', 'Status']
-    fa_df['AAV_Clean'] = fa_df['AAV'].apply(clean_money)
+    fa_df['AAV_Clean'] = parse_money(fa_df['AAV'])
+    attach_player_ids(fa_df, 'Player', season='2024-25', team_col='From')
     
     off_clus = pd.read_csv(FILE_OFF_CLUSTERS)
     def_clus = pd.read_csv(FILE_DEF_CLUSTERS)
-    off_map = off_clus.set_index('PLAYER_NAME')['Archetype_Name'].to_dict()
-    def_map = def_clus.set_index('PLAYER_NAME')['Archetype_Name'].to_dict()
+    off_map = off_clus.drop_duplicates('PLAYER_ID', keep='last').set_index('PLAYER_ID')['Archetype_Name']
+    def_map = def_clus.drop_duplicates('PLAYER_ID', keep='last').set_index('PLAYER_ID')['Archetype_Name']
     
-    # Map Archetypes to FA
-    fa_df['OFF_Arch'] = fa_df['Player'].map(off_map).fillna('Unknown')
-    fa_df['DEF_Arch'] = fa_df['Player'].map(def_map).fillna('Unknown')
+    # Rec_Add_* lists: older files joined comma-containing archetype names with ', '
+    for col, clus in [('Rec_Add_OFF', off_clus), ('Rec_Add_DEF', def_clus)]:
+        needs_df[col] = normalize_archetype_lists(needs_df[col], clus['Archetype_Name'].dropna().unique()).to_numpy()
+    
+    # Map Archetypes to FA (on PLAYER_ID, so accents/suffixes in the FA sheet don't drop players)
+    fa_df['OFF_Arch'] = fa_df['PLAYER_ID'].map(off_map).fillna('Unknown')
+    fa_df['DEF_Arch'] = fa_df['PLAYER_ID'].map(def_map).fillna('Unknown')
     
     return needs_df, cap_map, fa_df
 
-def score_fit(player_row, needs_df, cap_map):
+def needs_matrix(needs_df, teams, col):
     """
-    Evaluate all 30 teams for this player.
+    Teams x archetypes boolean matrix from an ARCHETYPE_SEP-joined recommendation column
+    (e.g. Rec_Add_OFF), compiled once. The last column is all False, so archetypes no
+    team needs (code -1 from archetypes.get_indexer) index it.
     """
-    player_o = player_row['OFF_Arch']
-    player_d = player_row['DEF_Arch']
-    player_aav = player_row['AAV_Clean']
-    current_team = player_row['From']
-    
-    # Needs Cache: Team -> Set of Needed Archetypes
-    # Needs DF has 'Rec_Add_OFF' and 'Rec_Add_DEF' columns
-    # We aggregate ALL recommendations for a team.
-    
-    scores = []
-    
-    all_teams = cap_map.keys()
-    
-    for team in all_teams:
-        score = 0
-        reasons = []
-        
-        # 1. Need Check
-        # Filter needs for this team
-        team_needs = needs_df[needs_df['Team'] == team]
-        
-        needed_o = []
-        needed_d = []
-        for _, r in team_needs.iterrows():
-            needed_o.extend([x.strip() for x in str(r['Rec_Add_OFF']).split(',')])
-            needed_d.extend([x.strip() for x in str(r['Rec_Add_DEF']).split(',')])
-            
-        fit_o = player_o in needed_o
-        fit_d = player_d in needed_d
-        
-        if fit_o: 
-            score += 3
-            reasons.append("Offensive Need")
-        if fit_d: 
-            score += 3
-            reasons.append("Defensive Need")
-            
-        # 2. Budget Check
-        cap_space = cap_map.get(team, 0)
-        is_incumbent = (team == current_team)
-        
-        if is_incumbent:
-            # Bird Rights - Can always sign
-            score += 1
-            reasons.append("Incumbent")
-            can_afford = True
-        elif cap_space >= player_aav:
-             # Can afford outright
-            score += 2 # Cap space is valuable
-            reasons.append("Cap Space Fit")
-            can_afford = True
-            
-        elif player_aav <= 5200000: # Taxpayer MLE approx
-            # Accessible to anyone
-            can_afford = True
-        else:
-            can_afford = False
-            
-        if not can_afford:
-            score = -99 # Disqualify high cost players from broke teams
-            reasons = ["Cannot Afford"]
-            
-        # 3. Winning Match?
-        # Maybe preference for better teams? 
-        # Using Cap Space as proxy (Low cap often = good team lol, not always)
-        # For this exercise, simple 'Fit + Money' is enough.
-        
-        scores.append({
-            'Team': team,
-            'Score': score,
-            'Reason': ", ".join(reasons)
-        })
-        
-    # Sort and return best
-    scores.sort(key=lambda x: x['Score'], reverse=True)
-    best = scores[0]
-    
-    # If score is garbage, return "Unsigned" logic or Current Team fallback
-    if best['Score'] < 0:
-        return current_team, 0, "Retention (No Market Fit)"
-        
-    return best['Team'], best['Score'], best['Reason']
+    needs = needs_df.reset_index(drop=True)
+    arch = needs[col].map(split_archetypes).explode()
+    team_idx = pd.Index(teams).get_indexer(needs['Team'].to_numpy()[arch.index])
+    codes, archetypes = pd.factorize(arch)
+    keep = (team_idx >= 0) & (codes >= 0)
+    matrix = np.zeros((len(teams), len(archetypes) + 1), dtype=bool)
+    matrix[team_idx[keep], codes[keep]] = True
+    return matrix, pd.Index(archetypes)
+
+
+def fit_flags(fa_df, needs_df, teams):
+    """Offensive need, defensive need and incumbent flags, each free agents x teams."""
+    need_off, off_names = needs_matrix(needs_df, teams, 'Rec_Add_OFF')
+    need_def, def_names = needs_matrix(needs_df, teams, 'Rec_Add_DEF')
+    fit_o = need_off[:, off_names.get_indexer(fa_df['OFF_Arch'])].T
+    fit_d = need_def[:, def_names.get_indexer(fa_df['DEF_Arch'])].T
+    incumbent = pd.Index(teams).get_indexer(fa_df['From'])[:, None] == np.arange(len(teams))
+    return fit_o, fit_d, incumbent
+
+
+def fit_scores(fa_df, needs_df, cap_map):
+    """
+    Scores every free agent against every team in one broadcast.
+    Returns (teams, scores, reason codes), both arrays free agents x teams; a reason code
+    indexes REASONS.
+    """
+    teams = list(cap_map)
+    fit_o, fit_d, incumbent = fit_flags(fa_df, needs_df, teams)
+    cap = np.array([cap_map[t] for t in teams], dtype=np.float64)
+    aav = fa_df['AAV_Clean'].to_numpy(dtype=np.float64)[:, None]
+    cap_fit = ~incumbent & (cap >= aav)
+    affordable = incumbent | cap_fit | (aav <= TAXPAYER_MLE)
+
+    scores = NEED_POINTS * (fit_o.astype(np.int64) + fit_d) + INCUMBENT_POINTS * incumbent + CAP_SPACE_POINTS * cap_fit
+    scores = np.where(affordable, scores, UNAFFORDABLE_SCORE)
+    reasons = 8 * fit_o + 4 * fit_d + 2 * incumbent + cap_fit
+    return teams, scores, reasons
+
+
+def market_allocation(fa_df, needs_df, cap_map):
+    """
+    League-wide assignment (see fa_allocation.py): each free agent to at most one team,
+    with every team's cap space and exceptions consumed as it signs players. Values are the
+    need + incumbent points (affordability is the allocator's job). Returns Allocated_Team
+    and Allocation (mechanism, or 'Unsigned') per row of fa_df.
+    """
+    teams = list(cap_map)
+    fit_o, fit_d, incumbent = fit_flags(fa_df, needs_df, teams)
+    values = NEED_POINTS * (fit_o.astype(np.int64) + fit_d) + INCUMBENT_POINTS * incumbent
+    cap = np.array([cap_map[t] for t in teams], dtype=np.float64)
+    # The FA sheet has no rights column: every incumbent is treated as holding Bird rights
+    signed = allocate_market(values, fa_df['AAV_Clean'].to_numpy(dtype=np.float64), cap, incumbent)
+
+    result = pd.DataFrame({'Allocated_Team': '', 'Allocation': 'Unsigned'}, index=range(len(fa_df)))
+    result.loc[signed['FA_ROW'], 'Allocated_Team'] = np.asarray(teams, dtype=object)[signed['TEAM_IDX']]
+    result.loc[signed['FA_ROW'], 'Allocation'] = signed['Mechanism'].to_numpy()
+    return result
+
+
+def top_destinations(fa_df, needs_df, cap_map, k=TOP_K):
+    """
+    Best k teams per free agent as a long frame (FA_ROW = position in fa_df, Rank, Team,
+    Score, Reason). Ties keep the cap sheet's team order.
+    """
+    teams, scores, reasons = fit_scores(fa_df, needs_df, cap_map)
+    k = min(k, len(teams))
+    order = np.argsort(-scores, axis=1, kind='stable')[:, :k]
+    rows = np.arange(len(scores))[:, None]
+    best_scores = scores[rows, order]
+    reason_text = np.where(best_scores == UNAFFORDABLE_SCORE, "Cannot Afford", REASONS[reasons[rows, order]])
+    return pd.DataFrame({
+        'FA_ROW': np.repeat(np.arange(len(scores)), k),
+        'Rank': np.tile(np.arange(1, k + 1), len(scores)),
+        'Team': np.asarray(teams, dtype=object)[order].ravel(),
+        'Score': best_scores.ravel(),
+        'Reason': reason_text.ravel(),
+    })
+
+
+def destinations_frame(fa_df, needs_df, cap_map, k=TOP_K):
+    """
+    One row per free agent: Ideal_Destination, Fit_Score, Reasoning and Other_Destinations
+    (the next best affordable teams). Players no team can afford stay with their team.
+    """
+    ranked = top_destinations(fa_df, needs_df, cap_map, k)
+    k = int(ranked['Rank'].max()) if len(ranked) else 1
+    team = ranked['Team'].to_numpy().reshape(-1, k)
+    score = ranked['Score'].to_numpy().reshape(-1, k)
+    reason = ranked['Reason'].to_numpy().reshape(-1, k)
+    no_market = score[:, 0] < 0
+
+    # 'BOS (5), NYK (4)': built column by column (k is small); scores are sorted, so the
+    # unaffordable alternatives are always at the end
+    labels = (pd.Series(team[:, 1:].ravel()) + ' (' + pd.Series(score[:, 1:].ravel()).astype(str) + ')').to_numpy()
+    labels = np.where(score[:, 1:].ravel() >= 0, labels, '').reshape(-1, k - 1)
+    others = np.full(len(team), '', dtype=object)
+    for col in labels.T:
+        others = np.where(col == '', others, np.where(others == '', col, others + ', ' + col))
+
+    return pd.DataFrame({
+        'Ideal_Destination': np.where(no_market, fa_df['From'].to_numpy(), team[:, 0]),
+        'Fit_Score': np.where(no_market, 0, score[:, 0]),
+        'Reasoning': np.where(no_market, "Retention (No Market Fit)", reason[:, 0]),
+        'Other_Destinations': np.where(no_market, '', others),
+    })
+
 
 def main():
     needs, caps, fas = load_data()
     
-    results = []
     print("Finding Ideal Destinations...")
+    # Skip if unknown archetype (minor leaguers etc)
+    fas = fas[fas['OFF_Arch'] != "Unknown"].reset_index(drop=True)
+    best = destinations_frame(fas, needs, caps)
+    # Same market solved jointly: no player goes to two teams, cap space is used up
+    allocation = market_allocation(fas, needs, caps)
     
-    for _, fa in fas.iterrows():
-        # Skip if unknown archetype (minor leaguers etc)
-        if fa['OFF_Arch'] == "Unknown": continue
-        
-        dest_team, score, reason = score_fit(fa, needs, caps)
-        
-        results.append({
-            'Player': fa['Player'],
-            'Free_Agent_Class_Rank': "N/A", # Could infer from AAV
-            'Current_Team': fa['From'],
-            'AAV': f"${fa['AAV_Clean']:,.0f}",
-            'Ideal_Destination': dest_team,
-            'Fit_Score': score,
-            'Reasoning': reason,
-            'Archetypes': f"{fa['OFF_Arch']} | {fa['DEF_Arch']}"
-        })
-        
-    df = pd.DataFrame(results)
-    
-    # Sort by Player Value (AAV) desc
-    # Need to convert string back to float for sorting or reuse clean
-    # Sort by the input order (Rank) is probably best as input was ranked.
+    df = pd.DataFrame({
+        'Player': fas['Player'],
+        'Free_Agent_Class_Rank': "N/A", # Could infer from AAV
+        'Current_Team': fas['From'],
+        'AAV': fas['AAV_Clean'].map('${:,.0f}'.format),
+        'Ideal_Destination': best['Ideal_Destination'],
+        'Fit_Score': best['Fit_Score'],
+        'Reasoning': best['Reasoning'],
+        'Archetypes': fas['OFF_Arch'] + ' | ' + fas['DEF_Arch'],
+        'Other_Destinations': best['Other_Destinations'],
+        'Allocated_Team': allocation['Allocated_Team'],
+        'Allocation': allocation['Allocation'],
+    })
     
+    # Kept in the input order (the FA sheet is ranked)
     print(f"Saving {len(df)} recommendations to {OUTPUT_FILE}...")
     df.to_csv(OUTPUT_FILE, index=False)
     print("Done.")
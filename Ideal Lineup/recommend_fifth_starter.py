@@ -1,8 +1,14 @@
 
 import pandas as pd
-import time
+import numpy as np
+import os
+import sys
 from nba_api.stats.endpoints import leaguedashlineups
-from collections import Counter
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from nba_fetch import fetch_frames
+from archetype_models import archetype_memberships
+from lineup_encoding import ARCHETYPE_SEP, parse_group_ids, encode_archetypes, soft_composition, join_names
 
 # --- Configuration ---
 SEASON = '2024-25'
@@ -14,6 +20,13 @@ FILE_PLAYER_DEF = 'nba_defensive_clusters.csv'
 FILE_TEAM = 'nba_team_clusters.csv'
 FILE_IDEAL = 'ideal_lineup_compositions.csv'
 
+# An archetype is recommended when the lineup is short of the ideal by at least this much
+# expected membership (1.0 = one full player of that archetype)
+MIN_MISSING = 0.5
+# Lineups analysed per team (best Plus_Minus first)
+TOP_LINEUPS = 5
+NO_GAP = "None / Fit is Perfect"
+
 def load_reference_data():
     print("Loading reference data...")
     try:
@@ -25,6 +38,9 @@ def load_reference_data():
         # Mappings
         off_map = off_df.set_index('PLAYER_ID')['Archetype_Name'].to_dict()
         def_map = def_df.set_index('PLAYER_ID')['Archetype_Name'].to_dict()
+        # Soft memberships (PLAYER_ID x archetype name) for the composition gaps
+        off_probs = archetype_memberships(off_df)
+        def_probs = archetype_memberships(def_df)
         team_map = team_df.set_index('TEAM_ID')['Playstyle_Name'].to_dict()
         
         # Parse Ideal Compositions into easier structure
@@ -36,21 +52,22 @@ def load_reference_data():
             def_list = [row[f'DEF_Slot_{i+1}'] for i in range(5)]
             ideal_map[style] = {'OFF': off_list, 'DEF': def_list}
             
-        return off_map, def_map, team_map, ideal_map
+        return off_map, def_map, off_probs, def_probs, team_map, ideal_map
         
     except FileNotFoundError as e:
         print(f"Error loading files: {e}")
-        return None, None, None, None
+        return None, None, None, None, None, None
 
 def fetch_4man_lineups():
     print(f"Fetching 4-Man Lineups ({SEASON})...")
     try:
-        lineups = leaguedashlineups.LeagueDashLineups(
+        lineups = fetch_frames(
+            leaguedashlineups.LeagueDashLineups,
             season=SEASON,
             group_quantity=4,
             measure_type_detailed_defense='Base',
             timeout=100
-        ).get_data_frames()[0]
+        )[0]
         
         # Filter for basic relevance (e.g. > 50 mins? or just sort by impact?)
         # Let's verify sample size isn't tiny.
@@ -61,76 +78,66 @@ def fetch_4man_lineups():
         print(f"Error fetching lineups: {e}")
         return pd.DataFrame()
 
-def get_recommendations(current_list, ideal_list):
+def ideal_count_matrix(styles, ideal_map, side):
     """
-    Returns a list of archetypes that are in Ideal but missing from Current.
+    Styles x archetypes ideal counts (from the 5 slots) and each archetype's first slot
+    (the tie-break order), with the archetype names as columns.
     """
-    ideal_counts = Counter(ideal_list)
-    current_counts = Counter(current_list)
-    
-    missing = []
-    # Subtract current from ideal
-    diff = ideal_counts - current_counts
-    
-    for archetype, count in diff.items():
-        missing.extend([archetype] * count)
-        
-    if not missing:
-        return ["None / Fit is Perfect"]
-        
-    return list(set(missing)) # Return unique missing options to keep it clean
+    lists = [ideal_map[style][side] for style in styles]
+    names = pd.unique(pd.Series([name for slots in lists for name in slots], dtype=object))
+    codes = pd.Index(names).get_indexer([name for slots in lists for name in slots]).reshape(len(lists), -1)
+    rows = np.repeat(np.arange(len(lists)), codes.shape[1])
+    counts = np.zeros((len(lists), len(names)))
+    np.add.at(counts, (rows, codes.ravel()), 1)
+    first = np.full(counts.shape, codes.shape[1])
+    np.minimum.at(first, (rows, codes.ravel()), np.tile(np.arange(codes.shape[1]), len(lists)))
+    return counts, first, list(names)
 
-def generate_analysis(lineups_df, off_map, def_map, team_map, ideal_map):
+def missing_archetypes(ids, style_rows, probs, ideal, first, names):
+    """
+    ARCHETYPE_SEP-joined archetypes each lineup is short of (ideal count - summed
+    memberships >= MIN_MISSING), most missing first, as one matrix operation over lineups.
+    """
+    current = soft_composition(ids, probs.reindex(columns=names, fill_value=0.0))
+    diff = ideal[style_rows] - current
+    order = np.lexsort((first[style_rows], -diff), axis=-1)
+    gaps = np.take_along_axis((ideal[style_rows] > 0) & (diff >= MIN_MISSING), order, axis=1)
+    text = join_names(np.where(gaps, order, -1), names, ARCHETYPE_SEP)
+    return np.where(text == '', NO_GAP, text)
+
+def generate_analysis(lineups_df, off_map, def_map, off_probs, def_probs, team_map, ideal_map):
     print("Generating Recommendations...")
     
-    results = []
+    # Teams with an ideal composition for their playstyle; top lineups per team by Plus_Minus
+    playstyle = lineups_df['TEAM_ID'].map(team_map).fillna("Unknown")
+    team_order = pd.factorize(lineups_df['TEAM_ID'])[0]
+    lineups = lineups_df.assign(_TEAM=team_order, _STYLE=playstyle)[playstyle.isin(list(ideal_map)).to_numpy()]
+    lineups = lineups.sort_values(['_TEAM', 'PLUS_MINUS'], ascending=[True, False], kind='stable')
+    top = lineups[lineups.groupby('_TEAM').cumcount() < TOP_LINEUPS]
+    if top.empty:
+        return pd.DataFrame()
     
-    # Process per Team
-    teams = lineups_df['TEAM_ID'].unique()
+    ids, _ = parse_group_ids(top['GROUP_ID'])
+    style_rows, styles = pd.factorize(top['_STYLE'])
+    result = pd.DataFrame({
+        'Team': top['TEAM_ABBREVIATION'].to_numpy(),
+        'Team_Playstyle': top['_STYLE'].to_numpy(),
+        'Lineup_Name': top['GROUP_NAME'].to_numpy(),
+        'Minutes': top['MIN'].to_numpy(),
+        'Plus_Minus': top['PLUS_MINUS'].to_numpy(),
+    })
+    for side, archetype_map, probs in [('OFF', off_map, off_probs), ('DEF', def_map, def_probs)]:
+        codes, names = encode_archetypes(ids, pd.Series(archetype_map, dtype=object), "Unknown")
+        result[f'Current_{side}_Archetypes'] = join_names(codes, names)
+        ideal, first, ideal_names = ideal_count_matrix(styles, ideal_map, side)
+        result[f'Rec_Add_{side}'] = missing_archetypes(ids, style_rows, probs, ideal, first, ideal_names)
     
-    for team_id in teams:
-        team_lineups = lineups_df[lineups_df['TEAM_ID'] == team_id].copy()
-        
-        # Rank by Plus_Minus (Total Impact)
-        team_lineups = team_lineups.sort_values('PLUS_MINUS', ascending=False)
-        
-        # Take Top 5
-        top_5 = team_lineups.head(5)
-        
-        playstyle = team_map.get(team_id, "Unknown")
-        ideal_comp = ideal_map.get(playstyle)
-        
-        if not ideal_comp: continue
-        
-        for _, row in top_5.iterrows():
-            # Parse Players
-            raw_ids = row['GROUP_ID'].strip('-').split('-')
-            pids = [int(p) for p in raw_ids if p]
-            
-            curr_off = [off_map.get(p, "Unknown") for p in pids]
-            curr_def = [def_map.get(p, "Unknown") for p in pids]
-            
-            # Get Recommendations
-            rec_off = get_recommendations(curr_off, ideal_comp['OFF'])
-            rec_def = get_recommendations(curr_def, ideal_comp['DEF'])
-            
-            results.append({
-                'Team': row['TEAM_ABBREVIATION'],
-                'Team_Playstyle': playstyle,
-                'Lineup_Name': row['GROUP_NAME'],
-                'Minutes': row['MIN'],
-                'Plus_Minus': row['PLUS_MINUS'],
-                'Current_OFF_Archetypes': ", ".join(curr_off),
-                'Current_DEF_Archetypes': ", ".join(curr_def),
-                'Rec_Add_OFF': ", ".join(rec_off),
-                'Rec_Add_DEF': ", ".join(rec_def)
-            })
-            
-    return pd.DataFrame(results)
+    return result[['Team', 'Team_Playstyle', 'Lineup_Name', 'Minutes', 'Plus_Minus', 'Current_OFF_Archetypes',
+                   'Current_DEF_Archetypes', 'Rec_Add_OFF', 'Rec_Add_DEF']]
 
 def main():
     # 1. Load Reference
-    off_map, def_map, team_map, ideal_map = load_reference_data()
+    off_map, def_map, off_probs, def_probs, team_map, ideal_map = load_reference_data()
     if not off_map: return
     
     # 2. Fetch Lineups
@@ -138,7 +145,7 @@ def main():
     if lineups_df.empty: return
     
     # 3. Analyze
-    rec_df = generate_analysis(lineups_df, off_map, def_map, team_map, ideal_map)
+    rec_df = generate_analysis(lineups_df, off_map, def_map, off_probs, def_probs, team_map, ideal_map)
     
     # 4. Save
     print(f"Saving {len(rec_df)} recommendations to {OUTPUT_FILE}...")
@@ -2,6 +2,14 @@
 import pandas as pd
 import numpy as np
 import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fa_parsing import load_cap_space, parse_money
+from player_index import attach_player_ids
+from archetype_models import archetype_memberships
+from fa_allocation import allocate_market
+from lineup_encoding import split_archetypes, normalize_archetype_lists
 
 # --- Configuration ---
 # File Paths (Relative to Archetype Analysis folder or Absolute)
@@ -14,6 +22,15 @@ FILE_OFF_CLUSTERS = os.path.join(BASE_DIR, 'Archetype Analysis', 'nba_player_clu
 FILE_DEF_CLUSTERS = os.path.join(BASE_DIR, 'Archetype Analysis', 'nba_defensive_clusters.csv')
 
 OUTPUT_FILE = os.path.join(BASE_DIR, 'Archetype Analysis', 'final_free_agent_targets.csv')
+# Whole-market assignment (each FA to one team, cap space consumed), see fa_allocation.py
+ALLOCATION_FILE = os.path.join(BASE_DIR, 'Archetype Analysis', 'free_agent_allocation.csv')
+
+# A free agent fits a need when their summed membership in the needed archetypes reaches this
+MIN_FIT = 0.25
+# Teams over the cap can only offer the Taxpayer MLE (~5.2M) or a minimum
+TAXPAYER_MLE = 5200000
+# Recommendations kept per need
+TOP_N = 3
 
 def load_data():
     print("Loading datasets...")
@@ -23,14 +40,8 @@ def load_data():
     
     # 2. Cap Space
     # Rank,Team,Record,...,Cap SpaceAll
-    cap_df = pd.read_csv(FILE_CAP)
     # Clean Cap Space: "-$1,220,220" -> -1220220
-    def clean_money(x):
-        if not isinstance(x, str): return 0
-        clean = x.replace('$', '').replace(',', '')
-        return float(clean)
-        
-    cap_df['Cap_Space_Clean'] = cap_df['Cap SpaceAll'].apply(clean_money)
+    cap_df = load_cap_space(FILE_CAP)
     cap_map = cap_df.set_index('Team')['Cap_Space_Clean'].to_dict()
     
     # 3. Apron
@@ -47,22 +58,33 @@ def load_data():
     # Rename cols: 
     # Col 0: From, Col 1: Player, Col 5: AAV
     fa_df.columns = ['From', 'Player', 'Pos', 'Yrs', 'Value', 'AAV', 'Status']
-    fa_df['AAV_Clean'] = fa_df['AAV'].apply(clean_money)
+    fa_df['AAV_Clean'] = parse_money(fa_df['AAV'])
+    # FA list has no IDs; resolve them once from the player index
+    attach_player_ids(fa_df, 'Player', season='2024-25', team_col='From')
     
     # 5. Archetype Maps
     off_clus = pd.read_csv(FILE_OFF_CLUSTERS)
     def_clus = pd.read_csv(FILE_DEF_CLUSTERS)
     
-    # Map Player Name -> Archetype (Assuming unique names roughly)
-    # Using Name to map beacause FA list doesn't have ID.
-    off_map = off_clus.set_index('PLAYER_NAME')['Archetype_Name'].to_dict()
-    def_map = def_clus.set_index('PLAYER_NAME')['Archetype_Name'].to_dict()
+    # Map Player ID -> Archetype
+    off_map = off_clus.drop_duplicates('PLAYER_ID', keep='last').set_index('PLAYER_ID')['Archetype_Name']
+    def_map = def_clus.drop_duplicates('PLAYER_ID', keep='last').set_index('PLAYER_ID')['Archetype_Name']
+    
+    # Rec_Add_* lists: older files joined comma-containing archetype names with ', '
+    for side, col, clus in [('OFF', 'Rec_Add_OFF', off_clus), ('DEF', 'Rec_Add_DEF', def_clus)]:
+        needs_df[col] = normalize_archetype_lists(needs_df[col], clus['Archetype_Name'].dropna().unique()).to_numpy()
     
     # Add Archetypes to FA DF
-    fa_df['OFF_Arch'] = fa_df['Player'].map(off_map).fillna('Unknown')
-    fa_df['DEF_Arch'] = fa_df['Player'].map(def_map).fillna('Unknown')
+    fa_df['OFF_Arch'] = fa_df['PLAYER_ID'].map(off_map).fillna('Unknown')
+    fa_df['DEF_Arch'] = fa_df['PLAYER_ID'].map(def_map).fillna('Unknown')
+    
+    # Soft memberships (one row per FA, one column per archetype name) for weighted fit scores
+    fit_probs = {
+        side: archetype_memberships(clus).reindex(fa_df['PLAYER_ID']).fillna(0.0).set_axis(fa_df.index)
+        for side, clus in [('OFF', off_clus), ('DEF', def_clus)]
+    }
     
-    return needs_df, cap_map, fa_df
+    return needs_df, cap_map, fa_df, fit_probs
 
 def determine_contract_type(aav):
     if aav > 35000000: return "Max"
@@ -70,114 +92,133 @@ def determine_contract_type(aav):
     if aav > 5000000: return "Mid-Level"
     return "Minimum/Low"
 
-def recommend_signings(needs_df, cap_map, fa_df):
+def need_fits(unique_needs, fit_probs):
+    """
+    FAs x needs OFF_Fit and DEF_Fit: each FA's summed membership in the archetypes a need
+    row asks for. The needs are exploded to (need, position, archetype) and looked up in
+    the archetype-indexed membership table, summed position by position in float32 (the
+    order a per-need reindex(...).sum(axis=1) adds them in).
+    """
+    fits = []
+    for side, col in [('OFF', 'Rec_Add_OFF'), ('DEF', 'Rec_Add_DEF')]:
+        probs = fit_probs[side]
+        # Trailing zero column: archetypes the memberships don't have, and padding
+        P = np.column_stack([probs.to_numpy(dtype=np.float32), np.zeros(len(probs), dtype=np.float32)])
+        exploded = unique_needs[col].map(split_archetypes).explode()
+        position = exploded.groupby(level=0).cumcount().to_numpy()
+        targets = np.full((len(unique_needs), position.max() + 1 if len(position) else 0), -1)
+        targets[exploded.index.to_numpy(), position] = probs.columns.get_indexer(exploded)
+        fit = np.zeros((len(probs), len(unique_needs)), dtype=np.float32)
+        for j in range(targets.shape[1]):
+            fit += P[:, targets[:, j]]
+        fits.append(fit)
+    return fits
+
+def recommend_signings(needs_df, cap_map, fa_df, fit_probs, top_n=TOP_N):
     print("Generating Recommendations...")
     
-    targets = []
-    
-    # Group needs by Team to avoid duplicates if multiple lineups match
-    # Or iterate uniquely?
-    # Let's iterate unique (Team, Rec_Add_OFF, Rec_Add_DEF) tuples
-    unique_needs = needs_df[['Team', 'Rec_Add_OFF', 'Rec_Add_DEF']].drop_duplicates()
-    
-    for _, row in unique_needs.iterrows():
-        team = row['Team']
-        needed_off = row['Rec_Add_OFF']
-        needed_def = row['Rec_Add_DEF']
-        
-        # Budget Check
-        space = cap_map.get(team, 0)
-        
-        # Max affordable offer
-        # If space < 0, can only offer Taxpayer MLE (~5.2M) or Min
-        if space < 0:
-            max_offer = 5200000 
-            budget_status = "Over Cap (MLE/Min only)"
-        else:
-            max_offer = space
-            budget_status = f"Cap Space (${space:,.0f})"
-            
-        # Filter FAs
-        # Logic: Must match OFF archetype OR DEF archetype (OR both is bonus)
-        # Note: 'needed_off' might be a comma separated string if multiples were recommended?
-        # The previous script joined lists with ", ".
-        # We need to check if ANY needed archetype matches the FA.
-        
-        target_off_types = [x.strip() for x in needed_off.split(',')]
-        target_def_types = [x.strip() for x in needed_def.split(',')]
-        
-        candidates = fa_df[
-            (fa_df['OFF_Arch'].isin(target_off_types)) | 
-            (fa_df['DEF_Arch'].isin(target_def_types))
-        ].copy()
-        
-        # Further Filter by Budget
-        # FA AAV must be <= max_offer (approx)
-        # Allow some wiggle room? No, let's be strict or users get confused.
-        # Exception: Re-signing own players often allows going over cap (Bird Rights).
-        
-        valid_targets = []
-        
-        for _, fa in candidates.iterrows():
-            is_resign = (fa['From'] == team)
-            
-            # Bird Rights logic: If re-signing, ignore cap space constraint
-            if is_resign:
-                allowed = True
-                action = "Re-sign (Bird Rights)"
-            elif fa['AAV_Clean'] <= max_offer:
-                allowed = True
-                action = "Sign (Cap Space/MLE)"
-            else:
-                allowed = False
-                
-            if allowed:
-                # Score/Rank?
-                # Points for matching Offense + Points for matching Defense
-                score = 0
-                match_desc = []
-                if fa['OFF_Arch'] in target_off_types: 
-                    score += 1
-                    match_desc.append("Offensive Fit")
-                if fa['DEF_Arch'] in target_def_types: 
-                    score += 1
-                    match_desc.append("Defensive Fit")
-                
-                # Bonus for being good (AAV proxy for quality)
-                # But irrelevant if they fit the role.
-                
-                valid_targets.append({
-                    'Team': team,
-                    'Budget_Status': budget_status,
-                    'Player': fa['Player'],
-                    'Action': action,
-                    'Contract_Value': f"${fa['AAV_Clean']:,.0f}",
-                    'Contract_Type': determine_contract_type(fa['AAV_Clean']),
-                    'Fit_Reason': ", ".join(match_desc),
-                    'Archetypes': f"{fa['OFF_Arch']} / {fa['DEF_Arch']}",
-                    'Score': score
-                })
-        
-        # Sort targets for this need
-        # Priority: Score (Dual fit) -> Re-signs -> AAV (High quality first)
-        targets_df = pd.DataFrame(valid_targets)
-        if not targets_df.empty:
-            targets_df = targets_df.sort_values(
-                by=['Score', 'Action', 'Contract_Type'], 
-                ascending=[False, True, False] # Re-sign is alphabetically 'Re' vs 'Si'.. wait. 'Re' < 'Si'. So True puts Re-sign first.
-            )
-            # Take top 3 recommendations per need to avoid spam
-            top_rec = targets_df.head(3)
-            targets.extend(top_rec.to_dict('records'))
-            
-    return pd.DataFrame(targets)
+    # One row per unique (Team, Rec_Add_OFF, Rec_Add_DEF): several lineups can share a need
+    unique_needs = needs_df[['Team', 'Rec_Add_OFF', 'Rec_Add_DEF']].drop_duplicates().reset_index(drop=True)
+    off_fit, def_fit = need_fits(unique_needs, fit_probs)
+    
+    # Budget per need: over the cap -> Taxpayer MLE / minimum only
+    space = unique_needs['Team'].map(cap_map).fillna(0).to_numpy(dtype=np.float64)
+    over_cap = space < 0
+    max_offer = np.where(over_cap, TAXPAYER_MLE, space)
+    budget_status = np.where(over_cap, "Over Cap (MLE/Min only)", pd.Series(space).map('Cap Space (${:,.0f})'.format))
+    
+    # Candidates (needs x FAs): fit the OFF or DEF need, and re-signable (Bird Rights,
+    # ignores the cap) or affordable
+    team_codes, _ = pd.factorize(pd.concat([unique_needs['Team'], fa_df['From']], ignore_index=True))
+    resign = team_codes[:len(unique_needs), None] == team_codes[None, len(unique_needs):]
+    aav = fa_df['AAV_Clean'].to_numpy(dtype=np.float64)
+    fits = (off_fit >= MIN_FIT).T | (def_fit >= MIN_FIT).T
+    need_rows, fa_rows = np.nonzero(fits & (resign | (aav[None, :] <= max_offer[:, None])))
+    if len(need_rows) == 0:
+        return pd.DataFrame()
+    
+    # Score: offensive + defensive membership counted from MIN_FIT (max 2 for a certain dual fit)
+    off = off_fit[fa_rows, need_rows].astype(np.float64)
+    dfn = def_fit[fa_rows, need_rows].astype(np.float64)
+    score = np.where(off >= MIN_FIT, off, 0.0) + np.where(dfn >= MIN_FIT, dfn, 0.0)
+    score = np.round(score, 3)
+    
+    is_resign = resign[need_rows, fa_rows]
+    contract_type = fa_df['AAV_Clean'].map(determine_contract_type).to_numpy()
+    ranked = pd.DataFrame({
+        'NEED_ROW': need_rows, 'FA_ROW': fa_rows, 'Score': score,
+        'Action': np.where(is_resign, "Re-sign (Bird Rights)", "Sign (Cap Space/MLE)"),
+        'Contract_Type': contract_type[fa_rows],
+    })
+    
+    # Priority per need: Score (Dual fit) -> Re-signs -> Contract type; keep the top_n
+    ranked = ranked.sort_values(['NEED_ROW', 'Score', 'Action', 'Contract_Type'], ascending=[True, False, True, False], kind='stable')
+    top = ranked[ranked.groupby('NEED_ROW').cumcount() < top_n]
+    
+    fa = fa_df.iloc[top['FA_ROW'].to_numpy()]
+    off, dfn = off_fit[top['FA_ROW'], top['NEED_ROW']], def_fit[top['FA_ROW'], top['NEED_ROW']]
+    off_text = np.where(off >= MIN_FIT, 'Offensive Fit (' + pd.Series(off.astype(np.float64)).map('{:.0%}'.format) + ')', '')
+    def_text = np.where(dfn >= MIN_FIT, 'Defensive Fit (' + pd.Series(dfn.astype(np.float64)).map('{:.0%}'.format) + ')', '')
+    return pd.DataFrame({
+        'Team': unique_needs['Team'].to_numpy()[top['NEED_ROW']],
+        'Budget_Status': budget_status[top['NEED_ROW']],
+        'Player': fa['Player'].to_numpy(),
+        'Action': top['Action'].to_numpy(),
+        'Contract_Value': fa['AAV_Clean'].map('${:,.0f}'.format).to_numpy(),
+        'Contract_Type': top['Contract_Type'].to_numpy(),
+        'Fit_Reason': np.where((off_text != '') & (def_text != ''), off_text + ', ' + def_text, off_text + def_text),
+        'Archetypes': (fa['OFF_Arch'] + ' / ' + fa['DEF_Arch']).to_numpy(),
+        'Score': top['Score'].to_numpy(),
+    })
+
+def team_fit_values(needs_df, fa_df, fit_probs, teams):
+    """
+    FAs x teams fit value: the best Score (OFF_Fit + DEF_Fit, each counted from MIN_FIT)
+    the FA would get over that team's need rows in recommend_signings.
+    """
+    unique_needs = needs_df[['Team', 'Rec_Add_OFF', 'Rec_Add_DEF']].drop_duplicates().reset_index(drop=True)
+    off_fit, def_fit = need_fits(unique_needs, fit_probs)
+    fits = np.where(off_fit >= MIN_FIT, off_fit, 0.0) + np.where(def_fit >= MIN_FIT, def_fit, 0.0)
+
+    team_idx = pd.Index(teams).get_indexer(unique_needs['Team'])
+    known = team_idx >= 0
+    values = np.zeros((len(teams), len(fa_df)))
+    np.maximum.at(values, team_idx[known], fits.T[known])
+    return values.T
+
+def allocate_free_agents(needs_df, cap_map, fa_df, fit_probs):
+    """
+    Solves the whole market at once instead of per need: each FA goes to at most one team,
+    and each team's cap space and exceptions shrink as it signs players.
+    """
+    print("Allocating free agents league-wide...")
+    teams = list(cap_map)
+    values = team_fit_values(needs_df, fa_df, fit_probs, teams)
+    bird = pd.Index(teams).get_indexer(fa_df['From'])[:, None] == np.arange(len(teams))
+    cap = np.array([cap_map[t] for t in teams], dtype=np.float64)
+    signed = allocate_market(values, fa_df['AAV_Clean'].to_numpy(dtype=np.float64), cap, bird)
+
+    fa = fa_df.iloc[signed['FA_ROW']]
+    return pd.DataFrame({
+        'Team': np.asarray(teams, dtype=object)[signed['TEAM_IDX']],
+        'Player': fa['Player'].to_numpy(),
+        'Mechanism': signed['Mechanism'].to_numpy(),
+        'Contract_Value': fa['AAV_Clean'].map('${:,.0f}'.format).to_numpy(),
+        'Contract_Type': fa['AAV_Clean'].map(determine_contract_type).to_numpy(),
+        'Archetypes': (fa['OFF_Arch'] + ' / ' + fa['DEF_Arch']).to_numpy(),
+        'Score': signed['Value'].round(3).to_numpy(),
+    }).sort_values(['Team', 'Score'], ascending=[True, False])
 
 def main():
-    needs, caps, fas = load_data()
-    results = recommend_signings(needs, caps, fas)
+    needs, caps, fas, fit_probs = load_data()
+    results = recommend_signings(needs, caps, fas, fit_probs)
     
     print(f"Saving {len(results)} targets to {OUTPUT_FILE}...")
     results.drop_duplicates(subset=['Team', 'Player']).to_csv(OUTPUT_FILE, index=False)
+    
+    allocation = allocate_free_agents(needs, caps, fas, fit_probs)
+    print(f"Saving {len(allocation)} league-wide signings to {ALLOCATION_FILE}...")
+    allocation.to_csv(ALLOCATION_FILE, index=False)
     print("Done.")
 
 if __name__ == "__main__":
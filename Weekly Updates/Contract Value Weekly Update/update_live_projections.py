@@ -1,86 +1,48 @@
 import pandas as pd
-import joblib
-import time
 import os
+import sys
 from datetime import datetime
 from nba_api.stats.endpoints import leaguedashplayerstats
 
-CAP_2026_PROJECTED = 155100000
-FEATURES = ['AGE', 'GP', 'MIN', 'PTS', 'REB', 'AST', 'STL', 'BLK', 'PLUS_MINUS', 'TS_PCT', 'USG_PCT', 'PIE']
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from nba_fetch import fetch_frames
+from valuation_ledger import record_valuations, import_legacy_tracker
+from contract_predictor import load_linear_model, predict
 
-def clean_currency(val):
-    if pd.isna(val) or val == '': return 0
-    return float(str(val).replace('$', '').replace(',', '').strip())
+CAP_2026_PROJECTED = 155100000
 
 def update_projections(filename='nba_contract_tracker.csv'):
     today = datetime.today().strftime('%Y-%m-%d')
-    new_col_name = f"Live_AAV_{today}"
     
-    # 1. Load Model Assets
+    # 1. Load the fused linear model (no scikit-learn import or unpickling needed)
     try:
-        # Try loading from parent directory if not in current
-        base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        model_path = os.path.join(base_path, 'contract_model.joblib')
-        scaler_path = os.path.join(base_path, 'data_scaler.joblib')
-        
-        if os.path.exists(model_path):
-             model = joblib.load(model_path)
-             scaler = joblib.load(scaler_path)
-        else:
-             model = joblib.load('contract_model.joblib')
-             scaler = joblib.load('data_scaler.joblib')
+        linear = load_linear_model()
     except FileNotFoundError:
-        print("Model or Scaler files missing. Please check pathing.")
+        print("Linear contract model missing. Run contract_training.py or contract_predictor.py to export it.")
         return
 
-    print(f"Pulling LIVE 2025-26 stats for snapshot: {today}")
+    version = linear['version']
+    print(f"Pulling LIVE 2025-26 stats for snapshot: {today} (model {version})")
     
     # 2. Fetch Stats
     try:
-        trad = leaguedashplayerstats.LeagueDashPlayerStats(season='2025-26', per_mode_detailed='Totals').get_data_frames()[0]
-        time.sleep(1) # Rate limit safety
-        adv = leaguedashplayerstats.LeagueDashPlayerStats(season='2025-26', measure_type_detailed_defense='Advanced').get_data_frames()[0]
+        trad = fetch_frames(leaguedashplayerstats.LeagueDashPlayerStats, season='2025-26', per_mode_detailed='Totals')[0]
+        adv = fetch_frames(leaguedashplayerstats.LeagueDashPlayerStats, season='2025-26', measure_type_detailed_defense='Advanced')[0]
         
         # 3. Merge and Prepare Features
         live_stats = pd.merge(trad, adv[['PLAYER_ID', 'TS_PCT', 'USG_PCT', 'PIE']], on='PLAYER_ID')
         
         # 4. Generate Predictions
-        X_current = scaler.transform(live_stats[FEATURES])
-        live_stats[new_col_name] = model.predict(X_current) * CAP_2026_PROJECTED
-        
-        # Preparing the new data to merge
-        # We match on 'calc_key' -> 'PLAYER_NAME' 
-        # But to be safe against name changes, we ideally use ID, but the existing CSV likely uses Name as key.
-        # We will assume Name for now as it's the common denominator in the CSV.
-        new_data = live_stats[['PLAYER_NAME', new_col_name]].copy()
-        new_data = new_data.rename(columns={'PLAYER_NAME': 'Player'})
+        live_stats['LIVE_AAV'] = predict(live_stats, linear) * CAP_2026_PROJECTED
 
-        # 5. Load and Update CSV
+        # 5. One-off: move any Live_AAV_{date} columns left in the tracker into the ledger
         if os.path.exists(filename):
-            print(f"Updating existing file: {filename}")
-            # on_bad_lines='skip' helps ignore the malformed rows at the bottom if any exist
-            try:
-                current_df = pd.read_csv(filename, on_bad_lines='skip')
-            except Exception as e:
-                print(f"Warning: Could not read existing file normally ({e}). Starting fresh or using backup.")
-                current_df = pd.DataFrame()
-
-            # Clean up: If the file has 'Player' column, we use it.
-            if 'Player' in current_df.columns:
-                # Merge the new column
-                # We use outer join to keep players who might not be in the new feed (rare) or new players
-                updated_df = pd.merge(current_df, new_data, on='Player', how='outer')
-            else:
-                # If structure is totally wrong, we initialize with the new data
-                print("Existing file seems valid but missing 'Player' column. Re-initializing.")
-                updated_df = new_data
-        else:
-            print(f"Creating new file: {filename}")
-            updated_df = new_data
-            
-        # 6. Save back to CSV
-        updated_df.to_csv(filename, index=False)
-        print(f"✅ Success. Added/Updated column '{new_col_name}'. Total records: {len(updated_df)}")
+            name_to_id = live_stats.drop_duplicates('PLAYER_NAME').set_index('PLAYER_NAME')['PLAYER_ID']
+            import_legacy_tracker(filename, name_to_id)
+        
+        # 6. Append this week's rows to the valuation ledger (keyed by PLAYER_ID, date, model)
+        rows = record_valuations(live_stats, today, version)
+        print(f"✅ Success. Recorded {len(rows)} valuations for {today}.")
 
     except Exception as e:
         print(f"Error during update: {e}")
@@ -1,8 +1,13 @@
 import pandas as pd
-import time
 import os
+import sys
 from datetime import datetime
-from nba_api.stats.endpoints import leaguedashplayerstats, synergyplaytypes, leaguehustlestatsplayer
+from nba_api.stats.endpoints import leaguedashplayerstats, leaguehustlestatsplayer
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from nba_fetch import fetch_frames
+from synergy_fetch import fetch_playtype_frames
+from snapshot_store import ensure_store, publish_snapshot, append_csv
 
 def capture_weekly_snapshot(filename="nba_timeseries_stats_2025_26.csv"):
     # 1. Define columns (Base + Advanced + Archetype Features)
@@ -13,75 +18,56 @@ def capture_weekly_snapshot(filename="nba_timeseries_stats_2025_26.csv"):
     try:
         # --- 1. Base Stats ---
         print("Fetching Base Stats...")
-        base_stats = leaguedashplayerstats.LeagueDashPlayerStats(
+        base_stats = fetch_frames(
+            leaguedashplayerstats.LeagueDashPlayerStats,
             season='2025-26', measure_type_detailed_defense='Base', rank='Y', timeout=100
-        ).get_data_frames()[0]
-        time.sleep(0.6)
+        )[0]
         
         # --- 2. Advanced Stats (USG, AST%, DREB%, DEFRTG) ---
         print("Fetching Advanced Stats...")
-        adv_stats = leaguedashplayerstats.LeagueDashPlayerStats(
+        adv_stats = fetch_frames(
+            leaguedashplayerstats.LeagueDashPlayerStats,
             season='2025-26', measure_type_detailed_defense='Advanced', timeout=100
-        ).get_data_frames()[0]
+        )[0]
         
         # Keep relevant Advanced columns
         adv_cols = ['PLAYER_ID', 'TS_PCT', 'USG_PCT', 'PIE', 'AST_PCT', 'DREB_PCT', 'DEF_RATING']
         adv_stats = adv_stats[[c for c in adv_cols if c in adv_stats.columns]]
-        time.sleep(0.6)
 
         # --- 3. Hustle Stats (Contested Shots) ---
         print("Fetching Hustle Stats...")
-        hustle_stats = leaguehustlestatsplayer.LeagueHustleStatsPlayer(
+        hustle_stats = fetch_frames(
+            leaguehustlestatsplayer.LeagueHustleStatsPlayer,
             season='2025-26', per_mode_time='PerGame', timeout=100
-        ).get_data_frames()[0]
+        )[0]
         
         # Rename/Keep Hustle columns
         # We need CONTESTED_SHOTS mostly.
         hustle_cols = ['PLAYER_ID', 'CONTESTED_SHOTS', 'CHARGES_DRAWN', 'DEF_LOOSE_BALLS_RECOVERED']
         hustle_stats = hustle_stats[[c for c in hustle_cols if c in hustle_stats.columns]]
-        time.sleep(0.6)
 
         # --- 4. Synergy Playtypes (Offense) ---
         playtypes = [
             'Isolation', 'Postup', 'Spotup', 'Handoff', 'Cut', 'OffScreen', 'OffRebound', 'Transition',
-            'PRBallHandler', 'PRRollMan' # Will try variations if needed
+            'PRBallHandler', 'PRRollMan' # synergy_fetch tries the P&R spelling variants
         ]
         
+        # All playtypes are requested concurrently under the shared API rate limit
+        print("Fetching Synergy Playtypes...")
+        synergy_wide = fetch_playtype_frames(
+            ['2025-26'], playtypes, type_grouping_nullable='offensive',
+            per_mode_simple='PerGame', timeout=60
+        )['2025-26']
+        
         synergy_data = pd.DataFrame({'PLAYER_ID': base_stats['PLAYER_ID'].unique()}) # Initialize with IDs
+        if not synergy_wide.empty:
+            synergy_cols = [c for c in synergy_wide.columns if c.endswith('_FREQ') or c.endswith('_PPP')]
+            synergy_data = pd.merge(synergy_data, synergy_wide[['PLAYER_ID'] + synergy_cols], on='PLAYER_ID', how='left')
         
         for pt in playtypes:
-            print(f"  Fetching {pt}...")
-            # Handle P&R key variations if needed (fetching 2025 so standard keys should work, 
-            # but using the retry logic is safer if API is flaky)
-            keys_to_try = [pt]
-            if pt == 'PRBallHandler': keys_to_try = ['PRBallHandler', 'P&RBallHandler']
-            if pt == 'PRRollMan': keys_to_try = ['PRRollMan', 'P&RRollMan']
-            
-            df_pt = pd.DataFrame()
-            for key in keys_to_try:
-                try:
-                    df_pt = synergyplaytypes.SynergyPlayTypes(
-                        season='2025-26', play_type_nullable=key, type_grouping_nullable='offensive',
-                        player_or_team_abbreviation='P', per_mode_simple='PerGame', timeout=60
-                    ).get_data_frames()[0]
-                    if not df_pt.empty: break
-                except: pass
-                time.sleep(0.5)
-            
-            if not df_pt.empty:
-                # Rename columns: FREQ and PPP
-                # API cols: POSS_PCT, PPP
-                cols = ['PLAYER_ID', 'POSS_PCT', 'PPP']
-                df_pt = df_pt[[c for c in cols if c in df_pt.columns]]
-                df_pt = df_pt.rename(columns={'POSS_PCT': f'{pt}_FREQ', 'PPP': f'{pt}_PPP'})
-                # Merge into synergy accumulator
-                synergy_data = pd.merge(synergy_data, df_pt, on='PLAYER_ID', how='left')
-            else:
-                print(f"    Warning: No data for {pt}")
+            if f'{pt}_FREQ' not in synergy_data.columns:
                 synergy_data[f'{pt}_FREQ'] = 0
                 synergy_data[f'{pt}_PPP'] = 0
-            
-            time.sleep(0.5)
 
         # --- 5. Merge Everything ---
         print("Merging data...")
@@ -98,36 +84,13 @@ def capture_weekly_snapshot(filename="nba_timeseries_stats_2025_26.csv"):
         fill_0_cols = [c for c in final_df.columns if 'FREQ' in c or 'PPP' in c or 'PCT' in c or 'RATING' in c or c in hustle_cols]
         final_df[fill_0_cols] = final_df[fill_0_cols].fillna(0)
 
-        # Update Master File (Read -> Concat -> Write to handle schema changes safe)
-        if os.path.exists(filename):
-            print(f"Reading existing file: {filename}...")
-            try:
-                # Read existing data
-                existing_df = pd.read_csv(filename)
-                
-                # Check if we already have data for this snapshot (to avoid duplicates if re-run)
-                # Simple check: timestamp match (approximate) or just append. 
-                # Let's just append for now, user can dedupe if needed, or we can check.
-                # Actually, duplicate snapshots are bad. Let's filter if same day? 
-                # User's prompt didn't strictly ask for dedupe, but "update" implies adding new.
-                
-                # Concat (this handles new columns by adding them to the schema and filling NaNs in old rows)
-                master_df = pd.concat([existing_df, final_df], ignore_index=True)
-                
-                # Write back
-                master_df.to_csv(filename, index=False)
-                print(f"Snapshot successful. Appended {len(final_df)} rows. Total rows: {len(master_df)}.")
-                
-            except Exception as e:
-                print(f"Error reading/writing existing file: {e}")
-                # Fallback: append mode if read fails (risky for schema but better than crash)
-                final_df.to_csv(filename, mode='a', index=False, header=False)
-        else:
-            # Create new file
-            # ensure directory exists
+        # Publish this week as its own immutable segment (history is never rewritten),
+        # then append the same rows to the CSV export the app reads
+        ensure_store('timeseries_2025_26', filename)
+        if publish_snapshot(final_df, 'timeseries_2025_26'):
             os.makedirs(os.path.dirname(filename) if os.path.dirname(filename) else '.', exist_ok=True)
-            final_df.to_csv(filename, index=False)
-            print(f"Snapshot successful. Created new file {filename} with {len(final_df)} rows.")
+            append_csv(final_df, 'timeseries_2025_26', filename)
+            print(f"Snapshot successful. Added {len(final_df)} rows to {filename}.")
         
     except Exception as e:
         print(f"Error during snapshot: {e}")
@@ -1,9 +1,15 @@
+import os
 import streamlit as st
 import pandas as pd
 import google.generativeai as genai
 import requests
 from io import StringIO
 
+import data_lake
+import snapshot_store
+import valuation_ledger
+import comparables
+
 # --- 1. CONFIGURATION ---
 # Fetches key from Streamlit's internal secrets manager
 try:
@@ -61,21 +67,80 @@ HISTORICAL_SOURCES = {
 
 LIVING_SOURCES = {
     "Live_Stats_25_26": "https://github.com/ryanstrain13-create/COI-V2/blob/main/Weekly%20Updates/Contract%20Value%20Weekly%20Update/nba_timeseries_stats_2025_26.csv",
-    "Live_Contract_Value": "https://github.com/ryanstrain13-create/COI-V2/blob/main/Weekly%20Updates/Contract%20Value%20Weekly%20Update/nba_contract_tracker.csv"
+    "Live_Contract_Value": "https://github.com/ryanstrain13-create/COI-V2/blob/main/Weekly%20Updates/Contract%20Value%20Weekly%20Update/nba_contract_tracker.csv",
+    "Live_Valuations": "https://github.com/ryanstrain13-create/COI-V2/blob/main/Weekly%20Updates/Contract%20Value%20Weekly%20Update/nba_contract_valuations.csv"
+}
+
+# Sources that also live in the local Parquet data lake (read locally when present)
+LAKE_DATASETS = {
+    "Hist_Archetypes": "master_archetypes",
+    "Hist_Stats": "historical_advanced",
+}
+
+# Weekly timeseries read from the local snapshot store when present
+SNAPSHOT_DATASETS = {
+    "Live_Stats_25_26": "timeseries_2025_26",
 }
 
 # --- 3. DATA LOADING ENGINE ---
+def load_source(name, url):
+    dataset = LAKE_DATASETS.get(name)
+    if dataset and data_lake.has_dataset(dataset):
+        return data_lake.load_dataset(dataset)
+    snapshots = SNAPSHOT_DATASETS.get(name)
+    if snapshots and snapshot_store.has_snapshots(snapshots):
+        return snapshot_store.load_snapshots(snapshots)
+    return pd.read_csv(to_raw(url))
+
 @st.cache_data(show_spinner="Loading Historical Databases...")
 def load_historical():
-    return {name: pd.read_csv(to_raw(url)) for name, url in HISTORICAL_SOURCES.items()}
+    return {name: load_source(name, url) for name, url in HISTORICAL_SOURCES.items()}
+
+def attach_valuations(tracker, url):
+    """Pivots the long valuation ledger into Live_AAV_{date} columns on the baseline tracker."""
+    try:
+        # The committed CSV is the full history; the local lake is rebuilt from it when behind
+        if os.path.exists(data_lake.legacy_csv_path(valuation_ledger.LEDGER_NAME)):
+            ledger = valuation_ledger.load_valuations()
+        else:
+            ledger = load_source("Live_Valuations", url)
+    except Exception:
+        return tracker  # Ledger not published yet; older trackers still carry the wide columns
+    # Values the ledger couldn't take (players without a PLAYER_ID) stay in the tracker's wide columns
+    legacy = [c for c in tracker.columns if c.startswith(valuation_ledger.LEGACY_PREFIX)]
+    tracker = tracker.rename(columns={c: f"{c}_tracker" for c in legacy})
+    wide = valuation_ledger.pivot_valuations(ledger)
+    if 'PLAYER_ID' not in tracker.columns:
+        merged = pd.merge(tracker, wide.drop(columns='PLAYER_ID'), on='Player', how='outer')
+    else:
+        # Baselines written since the player index carry PLAYER_ID; keep the tracker's spelling of the name
+        merged = pd.merge(tracker, wide, on='PLAYER_ID', how='outer', suffixes=('', '_ledger'))
+        merged['Player'] = merged['Player'].fillna(merged.pop('Player_ledger'))
+    for c in legacy:
+        kept = merged.pop(f"{c}_tracker")
+        merged[c] = merged[c].fillna(kept) if c in merged.columns else kept
+    values = sorted(c for c in merged.columns if c.startswith(valuation_ledger.LEGACY_PREFIX))
+    return merged[[c for c in merged.columns if c not in values] + values]
 
 @st.cache_data(ttl=3600, show_spinner="Fetching Weekly Updates...")
 def load_living():
-    return {name: pd.read_csv(to_raw(url)) for name, url in LIVING_SOURCES.items()}
+    dfs = {name: load_source(name, url) for name, url in LIVING_SOURCES.items() if name != "Live_Valuations"}
+    dfs["Live_Contract_Value"] = attach_valuations(dfs["Live_Contract_Value"], LIVING_SOURCES["Live_Valuations"])
+    return dfs
 
 hist_dfs = load_historical()
 live_dfs = load_living()
 
+@st.cache_resource(show_spinner="Loading Comparables Index...")
+def load_comparables():
+    try:
+        return comparables.load_comparables_index()
+    except Exception:
+        # No local data lake (e.g. the hosted app): build the index in memory from the loaded tables
+        return comparables.index_from_frames(hist_dfs['Hist_Stats'], hist_dfs['Hist_Archetypes'])
+
+COMPARABLE_COLS = ['RANK', 'DISTANCE', 'PLAYER_NAME', 'SEASON', 'TEAM', 'Offensive Archetype', 'Defensive Archetype', 'USG%', 'TS%', 'NETRTG', 'PIE']
+
 # Creation of a global map for Team Abbreviation -> Team ID
 team_id_map = live_dfs['Live_Stats_25_26'][['TEAM_ABBREVIATION', 'TEAM_ID']].drop_duplicates().set_index('TEAM_ABBREVIATION')['TEAM_ID'].to_dict()
 
@@ -139,8 +204,11 @@ def get_filtered_context(player, team):
         p_arch = hist_dfs['Hist_Archetypes'][hist_dfs['Hist_Archetypes']['PLAYER_NAME'] == player]
         p_hist = hist_dfs['Hist_Stats'][hist_dfs['Hist_Stats']['PLAYER_NAME'] == player].tail(3)
         p_contract = live_dfs['Live_Contract_Value'][live_dfs['Live_Contract_Value']['Player'] == player]
+        # Most similar historical player-seasons to the player's latest season (other players only)
+        p_comps = comparables.comparables_for_player(player, index=load_comparables())
+        p_comps = p_comps[[c for c in COMPARABLE_COLS if c in p_comps.columns]]
         
-        context += f"\n--- Player: {player} ---\nStats: {p_live.to_string()}\nContracts: {p_contract.to_string()}\nArchetype: {p_arch.to_string()}\nHistory: {p_hist.to_string()}\n"
+        context += f"\n--- Player: {player} ---\nStats: {p_live.to_string()}\nContracts: {p_contract.to_string()}\nArchetype: {p_arch.to_string()}\nHistory: {p_hist.to_string()}\nComparables: {p_comps.to_string(index=False)}\n"
 
     if team != "None":
         tid = team_id_map.get(team)
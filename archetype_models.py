@@ -0,0 +1,498 @@
+import os
+import json
+import time
+import hashlib
+import numpy as np
+import pandas as pd
+
+# --- Configuration ---
+# The 2025 "golden" archetype models are fitted once (by create_master_archetypes.py) and
+# saved as small versioned JSON artifacts: scaler, centroids, label map and feature list.
+# Historical and weekly labels are then assigned from the exact same centroids.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.path.join(BASE_DIR, 'archetype_models')
+MANIFEST_FILE = os.path.join(MODEL_DIR, 'manifest.json')
+
+OFF_FEATURES = [
+    'Isolation_FREQ', 'Isolation_PPP',
+    'PRBallHandler_FREQ', 'PRBallHandler_PPP',
+    'PRRollMan_FREQ', 'PRRollMan_PPP',
+    'Postup_FREQ', 'Postup_PPP',
+    'Spotup_FREQ', 'Spotup_PPP',
+    'Handoff_FREQ', 'Handoff_PPP',
+    'Cut_FREQ', 'Cut_PPP',
+    'OffScreen_FREQ', 'OffScreen_PPP',
+    'OffRebound_FREQ', 'OffRebound_PPP',  # 2025 file calls this Putback
+    'Transition_FREQ', 'Transition_PPP',
+    'USG_PCT', 'AST_PCT'
+]
+
+DEF_FEATURES = [
+    'STL', 'BLK', 'DREB_PCT', 'DEF_RATING',
+    'CONTESTED_SHOTS'
+]
+
+# 2025 golden offensive columns -> standard (Synergy) names used everywhere else
+GOLDEN_OFF_RENAME = {
+    'PICK__ROLL_BALL_HANDLER_FREQ': 'PRBallHandler_FREQ',
+    'PICK__ROLL_BALL_HANDLER_PPP': 'PRBallHandler_PPP',
+    'PICK__ROLL_ROLL_MAN_FREQ': 'PRRollMan_FREQ',
+    'PICK__ROLL_ROLL_MAN_PPP': 'PRRollMan_PPP',
+    'ISOLATION_FREQ': 'Isolation_FREQ',
+    'ISOLATION_PPP': 'Isolation_PPP',
+    'HANDOFF_FREQ': 'Handoff_FREQ',
+    'HANDOFF_PPP': 'Handoff_PPP',
+    'OFF_SCREEN_FREQ': 'OffScreen_FREQ',
+    'OFF_SCREEN_PPP': 'OffScreen_PPP',
+    'CUT_FREQ': 'Cut_FREQ',
+    'CUT_PPP': 'Cut_PPP',
+    'PUTBACK_FREQ': 'OffRebound_FREQ',
+    'PUTBACK_PPP': 'OffRebound_PPP',
+    'POST_UP_FREQ': 'Postup_FREQ',
+    'POST_UP_PPP': 'Postup_PPP',
+    'SPOT_UP_FREQ': 'Spotup_FREQ',
+    'SPOT_UP_PPP': 'Spotup_PPP',
+    'TRANSITION_FREQ': 'Transition_FREQ',
+    'TRANSITION_PPP': 'Transition_PPP'
+}
+
+# Refits are matched to the previous version's centroids (optimal assignment on RMS
+# per-feature distance, in the previous model's standard deviations). A new centroid farther
+# than this from its match is a new ("born") cluster rather than a moved one.
+ALIGN_MAX_DISTANCE = 0.5
+
+# Soft memberships: softmax over -(mean squared per-feature distance) / SOFT_TEMPERATURE.
+# Lower is sharper; at 0.2 about half of the 2025 players have a top archetype below 0.9.
+SOFT_TEMPERATURE = 0.2
+SOFT_BATCH_SIZE = 65536
+
+# Multi-season (streaming) fits read one season chunk at a time, in batches of this many rows
+STREAMING_BATCH_SIZE = 1024
+STREAMING_PASSES = 3
+
+MODEL_SPECS = {
+    'offense': {'features': OFF_FEATURES, 'k': 8, 'prefix': 'Off_Cluster',
+                'label_cols': ['Offensive Archetype', 'Archetype', 'Aggr_Archetype', 'Cluster Name']},
+    'defense': {'features': DEF_FEATURES, 'k': 5, 'prefix': 'Def_Cluster',
+                'label_cols': ['Defensive Archetype', 'Archetype', 'Cluster Name']},
+}
+
+
+def load_golden_off(file_path):
+    return pd.read_csv(file_path).rename(columns=GOLDEN_OFF_RENAME)
+
+
+def load_golden_def(file_path):
+    return pd.read_csv(file_path)
+
+
+def _scaled(df, model):
+    X = df[model['features']].fillna(0).to_numpy(dtype=np.float64)
+    return (X - model['mean']) / model['scale']
+
+
+def nearest_centroid(X, centroids):
+    """Index of the closest centroid for every row of X (squared Euclidean, one matrix product)."""
+    dists = (X * X).sum(axis=1)[:, None] - 2.0 * (X @ centroids.T) + (centroids * centroids).sum(axis=1)[None, :]
+    return dists.argmin(axis=1)
+
+
+def cluster_ids(model):
+    """Stable id of each centroid row (row order for models saved before alignment existed)."""
+    return np.asarray(model.get('cluster_ids', range(len(model['centroids']))), dtype=np.int64)
+
+
+def assign_clusters(df, model):
+    """Returns (cluster ids, archetype labels) for every row of df."""
+    rows = nearest_centroid(_scaled(df, model), model['centroids'])
+    return cluster_ids(model)[rows], np.asarray(model['labels'], dtype=object)[rows]
+
+
+def soft_memberships(X, centroids, temperature=SOFT_TEMPERATURE, batch_size=SOFT_BATCH_SIZE):
+    """
+    Membership probability of every row of X (already scaled) in every centroid, as float32.
+    Rows are processed in batches so the distance matrix stays small on long histories.
+    """
+    centroids = np.asarray(centroids, dtype=np.float64)
+    c2 = (centroids * centroids).sum(axis=1)
+    out = np.empty((len(X), len(centroids)), dtype=np.float32)
+    for start in range(0, len(X), batch_size):
+        xb = X[start:start + batch_size]
+        d2 = np.maximum((xb * xb).sum(axis=1)[:, None] - 2.0 * (xb @ centroids.T) + c2[None, :], 0.0)
+        logits = -d2 / (X.shape[1] * temperature)
+        logits -= logits.max(axis=1, keepdims=True)
+        probs = np.exp(logits)
+        out[start:start + len(xb)] = probs / probs.sum(axis=1, keepdims=True)
+    return out
+
+
+def membership_columns(model, prefix=None):
+    """'P_Off_Cluster_3'-style column names, one per centroid row, keyed on the stable cluster id."""
+    prefix = prefix or MODEL_SPECS[model['name'].replace('_all_seasons', '')]['prefix']
+    return [f"P_{prefix}_{i}" for i in cluster_ids(model)]
+
+
+def assign_memberships(df, model, temperature=SOFT_TEMPERATURE):
+    """Soft counterpart of assign_clusters: one float32 probability column per archetype."""
+    probs = soft_memberships(_scaled(df, model), model['centroids'], temperature)
+    return pd.DataFrame(probs, columns=membership_columns(model), index=df.index)
+
+
+def archetype_memberships(cluster_df, name_col='Archetype_Name', cluster_col='Cluster', prefix='P_Cluster_'):
+    """
+    PLAYER_ID x archetype name membership table (float32) from a cluster script's output.
+    Personas that share a name are summed. Files written before soft memberships existed
+    fall back to a one-hot table of the hard label, so old outputs still work.
+    """
+    cluster_df = cluster_df.drop_duplicates('PLAYER_ID', keep='last').set_index('PLAYER_ID')
+    prob_cols = [c for c in cluster_df.columns if c.startswith(prefix)]
+    if not prob_cols:
+        return pd.get_dummies(cluster_df[name_col]).astype(np.float32)
+    names = cluster_df.drop_duplicates(cluster_col).set_index(cluster_col)[name_col]
+    col_names = [names.get(int(c[len(prefix):]), c) for c in prob_cols]
+    probs = cluster_df[prob_cols].astype(np.float32)
+    return probs.T.groupby(col_names).sum().T.astype(np.float32)
+
+
+def _cluster_labels(clusters, df, spec):
+    """Most common existing archetype label per cluster, or '{prefix}_{i}' when the file has no labels."""
+    label_col = next((c for c in spec['label_cols'] if c in df.columns), None)
+    labels = [f"{spec['prefix']}_{i}" for i in range(spec['k'])]
+    if label_col:
+        modes = df.assign(_cluster=clusters).groupby('_cluster')[label_col].agg(lambda s: s.mode().iloc[0] if not s.mode().empty else None)
+        for cluster_id, label in modes.dropna().items():
+            labels[int(cluster_id)] = label
+    return labels
+
+
+def fit_archetype_model(df, name, random_state=42):
+    """Fits scaler + KMeans for one MODEL_SPECS entry and returns it as a plain artifact dict."""
+    from sklearn.cluster import KMeans
+    from sklearn.preprocessing import StandardScaler
+
+    spec = MODEL_SPECS[name]
+    X = df[spec['features']].fillna(0)
+    scaler = StandardScaler().fit(X)
+    kmeans = KMeans(n_clusters=spec['k'], random_state=random_state, n_init=10).fit(scaler.transform(X))
+
+    model = {
+        'name': name,
+        'features': list(spec['features']),
+        'mean': scaler.mean_,
+        'scale': scaler.scale_,
+        'centroids': kmeans.cluster_centers_,
+        'labels': _cluster_labels(kmeans.labels_, df, spec),
+        'training_rows': len(df),
+    }
+    # Weekly assignments must reproduce sklearn's own predictions on the training rows
+    mismatches = int((nearest_centroid(_scaled(df, model), model['centroids']) != kmeans.predict(scaler.transform(X))).sum())
+    if mismatches:
+        raise ValueError(f"Nearest-centroid assignment disagrees with KMeans on {mismatches} rows")
+    return model
+
+
+def align_centroids(new_raw, old_raw, scale, max_distance=ALIGN_MAX_DISTANCE):
+    """
+    Optimal one-to-one matching of new centroids to old ones (both in raw feature units,
+    compared by RMS distance after dividing by `scale`). Returns (matches {new_row: old_row}, born new rows,
+    died old rows); pairs farther apart than max_distance are left unmatched.
+    """
+    from scipy.optimize import linear_sum_assignment
+
+    new_s = np.asarray(new_raw, dtype=np.float64) / scale
+    old_s = np.asarray(old_raw, dtype=np.float64) / scale
+    dists = np.sqrt(((new_s[:, None, :] - old_s[None, :, :]) ** 2).mean(axis=2))
+    rows, cols = linear_sum_assignment(dists)
+    matches = {int(r): int(c) for r, c in zip(rows, cols) if dists[r, c] <= max_distance}
+    born = [r for r in range(len(new_s)) if r not in matches]
+    died = [c for c in range(len(old_s)) if c not in matches.values()]
+    return matches, born, died
+
+
+def stable_cluster_ids(new_raw, old_raw, old_ids, scale, retired_ids=(), max_distance=ALIGN_MAX_DISTANCE):
+    """
+    Ids for the new centroids: a matched centroid keeps its predecessor's id, a born one gets
+    an id never used before (above old_ids and retired_ids). Returns (ids, born ids, died ids).
+    """
+    old_ids = [int(i) for i in old_ids]
+    matches, born, died = align_centroids(new_raw, old_raw, scale, max_distance)
+    next_id = max(old_ids + [int(i) for i in retired_ids], default=-1) + 1
+    ids = np.empty(len(new_raw), dtype=np.int64)
+    for row, old_row in matches.items():
+        ids[row] = old_ids[old_row]
+    for offset, row in enumerate(born):
+        ids[row] = next_id + offset
+    return ids, [int(ids[r]) for r in born], [old_ids[c] for c in died]
+
+
+def align_to_previous_output(new_raw, features, scale, previous_file, cluster_col='Cluster'):
+    """
+    Stable ids for a standalone script's fresh KMeans fit: the new raw-unit centroids are
+    matched to the per-cluster feature means of the script's previous output file.
+    Only features the previous output also has are compared, so adding a feature column
+    doesn't renumber every cluster. Returns one id per centroid row (row order when there
+    is no usable previous output).
+    """
+    if not os.path.exists(previous_file):
+        return np.arange(len(new_raw))
+    prev = pd.read_csv(previous_file)
+    shared = [i for i, f in enumerate(features) if f in prev.columns]
+    if cluster_col not in prev.columns or not shared:
+        return np.arange(len(new_raw))
+    old = prev.groupby(cluster_col)[[features[i] for i in shared]].mean().fillna(0)
+    ids, born, died = stable_cluster_ids(np.asarray(new_raw)[:, shared], old.to_numpy(), old.index, np.asarray(scale)[shared])
+    print(f"Aligned clusters to {os.path.basename(previous_file)}: {len(ids) - len(born)} kept their ids"
+          + (f", born {born}" if born else '') + (f", died {died}" if died else '') + '.')
+    return ids
+
+
+def _raw_centroids(model):
+    return np.asarray(model['centroids']) * np.asarray(model['scale']) + np.asarray(model['mean'])
+
+
+def align_model(model, previous, max_distance=ALIGN_MAX_DISTANCE):
+    """
+    Gives a refitted model the cluster ids (and labels) of the previous version, in place.
+    Matched clusters keep id and label; born clusters get fresh ids; died ids are retired so
+    they are never reused. The outcome is recorded under model['alignment'].
+    """
+    prefix = MODEL_SPECS[model['name'].replace('_all_seasons', '')]['prefix']
+    old_ids = cluster_ids(previous)
+    retired = sorted(set(previous.get('retired_ids', [])))
+    ids, born, died = stable_cluster_ids(_raw_centroids(model), _raw_centroids(previous), old_ids,
+                                         np.asarray(previous['scale']), retired, max_distance)
+
+    old_labels = dict(zip(old_ids.tolist(), previous['labels']))
+    fitted = list(model['labels'])
+    default = [f"{prefix}_{row}" for row in range(len(ids))]
+    # Fitted labels that came from the data win; placeholder labels follow the id
+    model['labels'] = [fitted[row] if fitted[row] != default[row] else old_labels.get(i, f"{prefix}_{i}")
+                       for row, i in enumerate(ids.tolist())]
+    model['cluster_ids'] = ids.tolist()
+    model['retired_ids'] = sorted(set(retired) | set(died))
+    model['alignment'] = {'previous_version': previous.get('version'), 'born': born, 'died': died}
+
+    print(f"Aligned {model['name']} to {previous.get('version')}: {len(ids) - len(born)} clusters kept their ids"
+          + (f", born {born}" if born else '') + (f", died {died}" if died else '') + '.')
+    if born or died:
+        print(f"Warning: {model['name']} archetypes changed shape; labels for ids {born + died} need review.")
+    return model
+
+
+def model_version(model):
+    keys = ['features', 'mean', 'scale', 'centroids', 'labels']
+    # Only aligned models that actually renumbered carry ids into the hash (older versions keep theirs)
+    if 'cluster_ids' in model and list(model['cluster_ids']) != list(range(len(model['centroids']))):
+        keys.append('cluster_ids')
+    payload = json.dumps({k: np.asarray(model[k]).tolist() for k in keys})
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:12]
+
+
+def load_manifest():
+    if not os.path.exists(MANIFEST_FILE):
+        return {}
+    with open(MANIFEST_FILE) as f:
+        return json.load(f)
+
+
+def _atomic_write_json(path, data):
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def save_archetype_model(model, source=None):
+    """Writes archetype_models/{name}-{version}.json and points the manifest at it. Returns the version."""
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    version = model_version(model)
+    fname = f"{model['name']}-{version}.json"
+    record = {k: (v.tolist() if isinstance(v, np.ndarray) else v) for k, v in model.items()}
+    record.update(version=version, trained_at=time.strftime('%Y-%m-%d %H:%M:%S'), source=source)
+    _atomic_write_json(os.path.join(MODEL_DIR, fname), record)
+
+    manifest = load_manifest()
+    entry = manifest.setdefault(model['name'], {'current': None, 'versions': []})
+    if version not in [v['version'] for v in entry['versions']]:
+        entry['versions'].append({'version': version, 'file': fname, 'trained_at': record['trained_at']})
+    entry['current'] = version
+    _atomic_write_json(MANIFEST_FILE, manifest)
+    print(f"Saved {model['name']} archetype model {version} ({model['training_rows']} rows).")
+    return version
+
+
+def load_archetype_model(name, version=None):
+    """Loads the current (or a specific) version. Raises FileNotFoundError if none was saved."""
+    entry = load_manifest().get(name)
+    if not entry:
+        raise FileNotFoundError(f"No saved '{name}' archetype model in {MODEL_DIR}")
+    version = version or entry['current']
+    fname = next(v['file'] for v in entry['versions'] if v['version'] == version)
+    with open(os.path.join(MODEL_DIR, fname)) as f:
+        model = json.load(f)
+    for key in ['mean', 'scale', 'centroids']:
+        model[key] = np.asarray(model[key], dtype=np.float64)
+    return model
+
+
+def _load_previous(name):
+    try:
+        return load_archetype_model(name)
+    except FileNotFoundError:
+        return None
+
+
+def build_archetype_models(off_file, def_file):
+    """
+    Fits and saves both golden models, aligned to the current saved versions so cluster
+    ids survive the refit. Returns {'offense': model, 'defense': model}.
+    """
+    models = {}
+    for name, df, path in [('offense', load_golden_off(off_file), off_file), ('defense', load_golden_def(def_file), def_file)]:
+        missing = [f for f in MODEL_SPECS[name]['features'] if f not in df.columns]
+        if missing:
+            print(f"Warning: Missing {name} features in {os.path.basename(path)}: {missing}")
+        model = fit_archetype_model(df, name)
+        previous = _load_previous(name)
+        if previous is not None:
+            align_model(model, previous)
+        model['version'] = save_archetype_model(model, source=os.path.basename(path))
+        models[name] = model
+    return models
+
+
+def load_archetype_models():
+    return {name: load_archetype_model(name) for name in MODEL_SPECS}
+
+
+def all_seasons_name(name):
+    return f"{name}_all_seasons"
+
+
+def _batches(X, batch_size):
+    for start in range(0, len(X), batch_size):
+        yield X[start:start + batch_size]
+
+
+def _update_moments(state, X):
+    """Chan et al. running mean / sum of squares, so scaling never needs the whole corpus in memory."""
+    n_b = len(X)
+    mean_b = X.mean(axis=0)
+    m2_b = ((X - mean_b) ** 2).sum(axis=0)
+    n = state['n'] + n_b
+    delta = mean_b - state['mean']
+    state['mean'] = state['mean'] + delta * n_b / n
+    state['m2'] = state['m2'] + m2_b + delta ** 2 * state['n'] * n_b / n
+    state['n'] = n
+
+
+def _update_centroids(centroids, counts, X):
+    """Mini-batch k-means step: each centroid moves to the running mean of every point it has been assigned."""
+    labels = nearest_centroid(X, centroids)
+    sums = np.zeros_like(centroids)
+    np.add.at(sums, labels, X)
+    n = np.bincount(labels, minlength=len(centroids)).astype(np.float64)
+    counts += n
+    hit = n > 0
+    centroids[hit] += (sums[hit] - n[hit, None] * centroids[hit]) / counts[hit, None]
+
+
+def fit_streaming_models(seasons, load_chunk, previous=None, batch_size=STREAMING_BATCH_SIZE,
+                         passes=STREAMING_PASSES, random_state=42):
+    """
+    Fits every MODEL_SPECS model on a multi-season corpus, one season at a time.
+    load_chunk(season) returns that season's merged feature frame, so memory is bounded
+    by a single season. With `previous` ({name: earlier all-seasons model}), only seasons
+    those models haven't seen are read: their scaler moments, centroids and per-cluster
+    counts are the starting point, so adding a season updates the model instead of refitting.
+    Returns {name: model} (unchanged models are returned as they were).
+    """
+    previous = previous or {}
+    known = set.intersection(*(set(m['seasons']) for m in previous.values())) if len(previous) == len(MODEL_SPECS) else set()
+    new_seasons = [s for s in seasons if s not in known]
+    if not new_seasons:
+        print("All-seasons archetype models already cover every season; nothing to fit.")
+        return previous
+    warm = bool(known)
+    print(f"Streaming archetype fit over {len(new_seasons)} season(s) ({'warm start' if warm else 'cold start'})...")
+
+    states = {}
+    for name, spec in MODEL_SPECS.items():
+        prev = previous.get(name) if warm else None
+        width = len(spec['features'])
+        states[name] = {
+            'n': prev['n_samples_seen'] if prev else 0,
+            'mean': np.asarray(prev['mean'], dtype=np.float64) if prev else np.zeros(width),
+            'm2': np.asarray(prev['var'], dtype=np.float64) * prev['n_samples_seen'] if prev else np.zeros(width),
+        }
+
+    def chunks():
+        for season in new_seasons:
+            df = load_chunk(season)
+            yield season, {name: df[spec['features']].fillna(0).to_numpy(dtype=np.float64) for name, spec in MODEL_SPECS.items()}
+
+    # Pass 1: scaler statistics
+    rows = {name: 0 for name in MODEL_SPECS}
+    for _, X_by_name in chunks():
+        for name, X in X_by_name.items():
+            if len(X):
+                _update_moments(states[name], X)
+                rows[name] += len(X)
+
+    models = {}
+    for name, spec in MODEL_SPECS.items():
+        st = states[name]
+        var = st['m2'] / st['n']
+        scale = np.sqrt(var)
+        scale[scale == 0] = 1.0  # same convention as StandardScaler
+        models[name] = {
+            'name': all_seasons_name(name), 'features': list(spec['features']),
+            'mean': st['mean'], 'scale': scale, 'var': var,
+            'n_samples_seen': int(st['n']), 'training_rows': int(st['n']),
+        }
+        prev = previous.get(name) if warm else None
+        if prev:
+            # Previous centroids back to raw units, then into the updated scaling
+            raw = np.asarray(prev['centroids']) * np.asarray(prev['scale']) + np.asarray(prev['mean'])
+            models[name].update(centroids=(raw - st['mean']) / scale, counts=np.asarray(prev['counts'], dtype=np.float64),
+                                labels=list(prev['labels']), cluster_ids=cluster_ids(prev).tolist(),
+                                retired_ids=list(prev.get('retired_ids', [])))
+        else:
+            models[name].update(centroids=None, counts=np.zeros(spec['k']),
+                                labels=[f"{spec['prefix']}_{i}" for i in range(spec['k'])])
+
+    # Pass 2+: mini-batch centroid updates (counts carry over, so later batches move centroids less)
+    for p in range(passes):
+        for _, X_by_name in chunks():
+            for name, X in X_by_name.items():
+                model = models[name]
+                Xs = (X - model['mean']) / model['scale']
+                if model['centroids'] is None:
+                    from sklearn.cluster import kmeans_plusplus
+                    model['centroids'], _ = kmeans_plusplus(Xs, MODEL_SPECS[name]['k'], random_state=random_state)
+                for batch in _batches(Xs, batch_size):
+                    _update_centroids(model['centroids'], model['counts'], batch)
+
+    for name, model in models.items():
+        prev = previous.get(name) if warm else None
+        model['seasons'] = sorted(set(prev['seasons'] if prev else []) | set(new_seasons))
+        print(f"  {name}: {rows[name]} new rows, {model['n_samples_seen']} seen over {len(model['seasons'])} seasons.")
+    return models
+
+
+def build_all_seasons_models(seasons, load_chunk, warm_start=True, source=None):
+    """
+    Fits (or warm-starts) and saves the all-seasons models. Cold fits are aligned to the
+    saved versions so their cluster ids carry over. Returns {name: model}.
+    """
+    saved = {name: _load_previous(all_seasons_name(name)) for name in MODEL_SPECS}
+    saved = {name: model for name, model in saved.items() if model is not None}
+    previous = saved if warm_start else {}
+    models = fit_streaming_models(seasons, load_chunk, previous=previous)
+    for name, model in models.items():
+        if model is previous.get(name):
+            continue
+        if 'cluster_ids' not in model and name in saved:
+            align_model(model, saved[name])
+        model['version'] = save_archetype_model(model, source=source)
+    return models
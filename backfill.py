@@ -0,0 +1,105 @@
+import os
+import json
+import time
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# --- Configuration ---
+# Seasons are fetched in parallel; nba_fetch.RATE_LIMITER keeps the combined
+# request rate under the API limit no matter how many workers run.
+MAX_WORKERS = 4
+PARTITIONS_DIR = '_partitions'
+MANIFEST_FILE = 'manifest.json'
+
+
+def partition_dir(output_dir, name):
+    return os.path.join(output_dir, PARTITIONS_DIR, name)
+
+
+def partition_path(output_dir, name, season):
+    return os.path.join(partition_dir(output_dir, name), f"season={season}.csv")
+
+
+def load_manifest(output_dir, name):
+    path = os.path.join(partition_dir(output_dir, name), MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {'completed': {}, 'failed': {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_manifest(output_dir, name, manifest):
+    path = os.path.join(partition_dir(output_dir, name), MANIFEST_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _write_partition(df, path):
+    tmp_path = f"{path}.tmp"
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def pending_seasons(output_dir, name, seasons):
+    """Seasons without a completed partition on disk (failed seasons are retried)."""
+    manifest = load_manifest(output_dir, name)
+    return [
+        s for s in seasons
+        if s not in manifest['completed'] or not os.path.exists(partition_path(output_dir, name, s))
+    ]
+
+
+def run_backfill(name, seasons, fetch_season, output_dir, max_workers=MAX_WORKERS):
+    """
+    Runs fetch_season(season) -> DataFrame for every season that isn't already
+    checkpointed, writing one partition per season and recording the outcome in
+    a manifest. Re-running resumes from the missing/failed seasons only, so
+    fetch_season must raise when any part of a season is missing (a partial
+    frame would be checkpointed as completed and never fetched again).
+    Returns (combined DataFrame of all completed seasons, list of failed seasons).
+    """
+    os.makedirs(partition_dir(output_dir, name), exist_ok=True)
+    manifest = load_manifest(output_dir, name)
+
+    todo = pending_seasons(output_dir, name, seasons)
+    print(f"[{name}] {len(seasons) - len(todo)} seasons checkpointed, {len(todo)} to fetch.")
+
+    def run_one(season):
+        df = fetch_season(season)
+        if df is None or df.empty:
+            raise ValueError("no rows returned")
+        _write_partition(df, partition_path(output_dir, name, season))
+        return len(df)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(run_one, season): season for season in todo}
+        for future in as_completed(futures):
+            season = futures[future]
+            # Manifest is only touched from this thread, after each partition is on disk
+            try:
+                rows = future.result()
+                manifest['completed'][season] = {'rows': rows, 'finished_at': time.time()}
+                manifest['failed'].pop(season, None)
+                print(f"[{name}] {season}: saved {rows} rows.")
+            except Exception as e:
+                manifest['failed'][season] = str(e)
+                print(f"[{name}] {season}: FAILED ({e})")
+            _save_manifest(output_dir, name, manifest)
+
+    failed = [s for s in seasons if s in manifest['failed']]
+    if failed:
+        print(f"[{name}] {len(failed)} seasons failed: {', '.join(failed)}. Re-run to resume.")
+
+    return load_partitions(output_dir, name, seasons), failed
+
+
+def load_partitions(output_dir, name, seasons):
+    """Concatenates the completed partitions for the requested seasons, in season order."""
+    frames = []
+    for season in seasons:
+        path = partition_path(output_dir, name, season)
+        if os.path.exists(path):
+            frames.append(pd.read_csv(path))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
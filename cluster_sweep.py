@@ -0,0 +1,146 @@
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+from data_lake import LAKE_DIR
+
+# --- Configuration ---
+# k-selection for the archetype models: every (group, k, seed) fit is scored once and
+# cached under a fingerprint of that group's feature matrix. Groups are usually seasons,
+# so when one season changes only its fits are recomputed.
+SWEEP_DIR = os.path.join(LAKE_DIR, 'cluster_sweeps')
+K_VALUES = list(range(3, 13))
+SEEDS = [0, 1, 2, 3, 4]
+BOOTSTRAP_ROUNDS = 10
+SILHOUETTE_SAMPLE = 2000
+# Smallest mean bootstrap ARI for a k to be recommended
+STABILITY_FLOOR = 0.75
+# Bump when the scoring changes so old cached scores are not reused
+SCORING_VERSION = 1
+
+
+def _scaled_matrix(df, features):
+    X = df[features].fillna(0).to_numpy(dtype=np.float64)
+    scale = X.std(axis=0)
+    scale[scale == 0] = 1.0
+    return (X - X.mean(axis=0)) / scale
+
+
+def group_fingerprint(X, features):
+    digest = hashlib.sha256()
+    digest.update(json.dumps({'features': list(features), 'bootstrap': BOOTSTRAP_ROUNDS,
+                              'silhouette_sample': SILHOUETTE_SAMPLE, 'scoring': SCORING_VERSION}).encode('utf-8'))
+    digest.update(np.ascontiguousarray(X).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def _score_fit(task):
+    """One KMeans fit scored on silhouette, Davies-Bouldin, inertia and bootstrap stability (runs in a worker)."""
+    from sklearn.cluster import KMeans
+    from sklearn.metrics import silhouette_score, davies_bouldin_score, adjusted_rand_score
+
+    X, k, seed = task
+    kmeans = KMeans(n_clusters=k, random_state=seed, n_init=4).fit(X)
+    labels = kmeans.labels_
+    sample = min(len(X), SILHOUETTE_SAMPLE)
+
+    # Stability: refit on bootstrap resamples, compare their labelling of every row with the full fit
+    rng = np.random.default_rng(seed)
+    aris = []
+    for _ in range(BOOTSTRAP_ROUNDS):
+        idx = rng.integers(0, len(X), len(X))
+        boot = KMeans(n_clusters=k, random_state=seed, n_init=1).fit(X[idx])
+        aris.append(adjusted_rand_score(labels, boot.predict(X)))
+
+    return {
+        'k': k, 'seed': seed,
+        'inertia': float(kmeans.inertia_),
+        'silhouette': float(silhouette_score(X, labels, sample_size=sample, random_state=seed)),
+        'davies_bouldin': float(davies_bouldin_score(X, labels)),
+        'stability': float(np.mean(aris)),
+    }
+
+
+def _cache_path(name, fingerprint):
+    return os.path.join(SWEEP_DIR, name, f"{fingerprint}.json")
+
+
+def _load_cached(name, fingerprint):
+    path = _cache_path(name, fingerprint)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_cached(name, fingerprint, scores):
+    path = _cache_path(name, fingerprint)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, 'w') as f:
+        json.dump(scores, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def recommend_k(report):
+    """Best mean silhouette among the k values whose bootstrap stability clears STABILITY_FLOOR."""
+    stable = report[report['stability'] >= STABILITY_FLOOR]
+    pool = stable if not stable.empty else report
+    return int(pool['silhouette'].idxmax())
+
+
+def sweep_k(df, features, name, group_col=None, k_values=K_VALUES, seeds=SEEDS, max_workers=None):
+    """
+    Scores every k in k_values (over every seed) for each group of df (e.g. per SEASON),
+    using all cores. Only (group, k, seed) fits missing from the cache are run.
+    Returns (report, recommended_k); report has one row per k, averaged over seeds and
+    weighted by group size, and is also written to SWEEP_DIR/{name}_report.csv.
+    """
+    groups = df.groupby(group_col, sort=True) if group_col else [('all', df)]
+    tasks, cached, sizes = [], {}, {}
+    for group, gdf in groups:
+        X = _scaled_matrix(gdf, features)
+        fp = group_fingerprint(X, features)
+        cached[group] = (fp, _load_cached(name, fp))
+        sizes[group] = len(X)
+        for k in k_values:
+            if k >= len(X):
+                continue
+            for seed in seeds:
+                if f"{k}:{seed}" not in cached[group][1]:
+                    tasks.append((group, (X, k, seed)))
+
+    print(f"[{name}] {len(tasks)} fits to run, "
+          f"{sum(len(s) for _, s in cached.values())} reused from cache ({len(sizes)} group(s)).")
+    if tasks:
+        with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as pool:
+            results = pool.map(_score_fit, [task for _, task in tasks], chunksize=max(1, len(tasks) // (4 * (os.cpu_count() or 1))))
+            for (group, _), result in zip(tasks, results):
+                cached[group][1][f"{result['k']}:{result['seed']}"] = result
+        for group, (fp, scores) in cached.items():
+            _save_cached(name, fp, scores)
+
+    rows = [dict(score, group=str(group), rows=sizes[group])
+            for group, (_, scores) in cached.items() for score in scores.values()
+            if score['k'] in k_values and score['seed'] in seeds]
+    scores = pd.DataFrame(rows)
+    per_group = scores.groupby(['group', 'k']).agg(
+        rows=('rows', 'first'), inertia=('inertia', 'mean'), silhouette=('silhouette', 'mean'),
+        davies_bouldin=('davies_bouldin', 'mean'), stability=('stability', 'mean')).reset_index()
+
+    metrics = ['inertia', 'silhouette', 'davies_bouldin', 'stability']
+    weighted = per_group[metrics].mul(per_group['rows'], axis=0).assign(k=per_group['k'], rows=per_group['rows'])
+    totals = weighted.groupby('k').sum()
+    report = totals[metrics].div(totals['rows'], axis=0)
+    report['groups'] = per_group.groupby('k').size()
+
+    best_k = recommend_k(report)
+    os.makedirs(SWEEP_DIR, exist_ok=True)
+    report.to_csv(os.path.join(SWEEP_DIR, f"{name}_report.csv"))
+    print(f"\n--- {name}: k sweep ({len(seeds)} seeds, {BOOTSTRAP_ROUNDS} bootstrap rounds) ---")
+    print(report.round(3).to_string())
+    print(f"Recommended k for {name}: {best_k}")
+    return report, best_k
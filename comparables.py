@@ -0,0 +1,307 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import numpy as np
+import pandas as pd
+
+from data_lake import LAKE_DIR, load_dataset
+from player_index import attach_player_ids
+
+# --- Configuration ---
+# Player-season comparables: every 1997-2025 player-season is one float32 vector of
+# standardized advanced stats plus (2015+) archetype memberships, and a query is a
+# brute-force nearest-neighbour search over the whole matrix. The per-season rows are
+# kept on disk, so a new season partition only encodes that season.
+INDEX_DIR = os.path.join(LAKE_DIR, 'comparables')
+INDEX_MANIFEST = os.path.join(INDEX_DIR, 'manifest.json')
+# Bump when the encoding changes so every season is re-encoded
+INDEX_VERSION = 1
+
+STAT_FEATURES = [
+    'MIN', 'OFFRTG', 'DEFRTG', 'NETRTG', 'AST%', 'AST/TO', 'AST RATIO',
+    'OREB%', 'DREB%', 'REB%', 'TO RATIO', 'EFG%', 'TS%', 'USG%', 'PACE', 'PIE'
+]
+META_COLS = ['PLAYER_ID', 'PLAYER_NAME', 'TEAM', 'SEASON', 'GP',
+             'Offensive Archetype', 'Defensive Archetype', 'Off_Cluster', 'Def_Cluster']
+ARCHETYPE_PREFIX = 'P_'
+# Membership vectors sum to 1 per side, so they are up-weighted to matter next to ~16 z-scores
+ARCHETYPE_WEIGHT = 2.0
+MIN_GP = 10
+
+DEFAULT_K = 5
+QUERY_BATCH_SIZE = 512
+
+# Neighbour stats summarised into contract model columns
+COMP_STATS = ['PIE', 'NETRTG', 'USG%', 'TS%']
+
+
+def _season_path(season):
+    return os.path.join(INDEX_DIR, 'seasons', f"{season}.parquet")
+
+
+def _frame_hash(df):
+    return hashlib.sha256(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes()).hexdigest()[:16]
+
+
+def _load_archetypes():
+    try:
+        return prepare_archetypes(load_dataset('master_archetypes'))
+    except FileNotFoundError:
+        return pd.DataFrame(columns=['PLAYER_ID', 'SEASON'])
+
+
+def prepare_archetypes(arch):
+    """Labels + memberships per player-season (memberships rebuilt one-hot from the ids on older exports)."""
+    arch = arch.drop_duplicates(['PLAYER_ID', 'SEASON'], keep='last')
+    if not any(c.startswith(ARCHETYPE_PREFIX) for c in arch.columns):
+        for col, prefix in [('Off_Cluster', 'P_Off_Cluster'), ('Def_Cluster', 'P_Def_Cluster')]:
+            if col in arch.columns:
+                arch = arch.join(pd.get_dummies(arch[col], prefix=prefix, dtype=np.float32))
+    keep = ['PLAYER_ID', 'SEASON'] + [c for c in META_COLS if c.endswith('Archetype') or c.endswith('_Cluster')]
+    keep += [c for c in arch.columns if c.startswith(ARCHETYPE_PREFIX)]
+    return arch[[c for c in keep if c in arch.columns]].assign(SEASON=arch['SEASON'].astype(str))
+
+
+def encode_season(adv, arch):
+    """One season's index rows: meta columns, raw float32 stats and archetype memberships."""
+    season = str(adv['SEASON'].iloc[0])
+    rows = adv[adv['GP'] >= MIN_GP].drop_duplicates(['PLAYER_NAME', 'SEASON'], keep='last').copy()
+    rows['SEASON'] = rows['SEASON'].astype(str)
+    attach_player_ids(rows, 'PLAYER_NAME', season=season, team_col='TEAM')
+    rows = rows.merge(arch, on=['PLAYER_ID', 'SEASON'], how='left')
+    rows[STAT_FEATURES] = rows[STAT_FEATURES].astype(np.float32)
+    prob_cols = [c for c in rows.columns if c.startswith(ARCHETYPE_PREFIX)]
+    rows[prob_cols] = rows[prob_cols].astype(np.float32)
+    cols = [c for c in META_COLS if c in rows.columns] + STAT_FEATURES + prob_cols
+    return rows[cols].reset_index(drop=True)
+
+
+def index_from_rows(rows):
+    """
+    Standardizes the stat block over all rows and packs everything into one float32 matrix.
+    Missing stats sit at the mean; missing memberships (pre-2015) at the league-average mix.
+    """
+    rows = rows.reset_index(drop=True)
+    prob_cols = sorted(c for c in rows.columns if c.startswith(ARCHETYPE_PREFIX))
+    stats = rows[STAT_FEATURES].to_numpy(dtype=np.float64)
+    mean = np.nanmean(stats, axis=0)
+    scale = np.nanstd(stats, axis=0)
+    scale[~(scale > 0)] = 1.0
+    prior = rows[prob_cols].mean().fillna(0.0).to_numpy(dtype=np.float64) if prob_cols else np.zeros(0)
+    index = {'meta': rows.drop(columns=STAT_FEATURES + prob_cols), 'raw': rows[STAT_FEATURES + prob_cols],
+             'mean': mean, 'scale': scale, 'prob_cols': prob_cols, 'prior': prior}
+    # Integer player codes, so same-player exclusion is an integer comparison
+    index['player_codes'], index['player_keys'] = pd.factorize(rows['PLAYER_NAME'])
+    index['X'] = encode(rows, index)
+    index['norms'] = (index['X'] * index['X']).sum(axis=1)
+    return index
+
+
+def index_from_frames(adv, arch=None):
+    """In-memory index straight from loaded tables (for callers without the on-disk index)."""
+    arch = prepare_archetypes(arch) if arch is not None else pd.DataFrame(columns=['PLAYER_ID', 'SEASON'])
+    adv = adv.assign(SEASON=adv['SEASON'].astype(str))
+    rows = [encode_season(season_adv, arch[arch['SEASON'] == season]) for season, season_adv in adv.groupby('SEASON', sort=True)]
+    return index_from_rows(pd.concat(rows, ignore_index=True))
+
+
+def encode(df, index):
+    """Query vectors (float32) for any frame with STAT_FEATURES (+ optional P_ membership columns)."""
+    stats = df[STAT_FEATURES].to_numpy(dtype=np.float64)
+    z = np.nan_to_num((stats - index['mean']) / index['scale'])
+    probs = df.reindex(columns=index['prob_cols']).to_numpy(dtype=np.float64)
+    probs = np.where(np.isnan(probs), index['prior'], probs) * ARCHETYPE_WEIGHT
+    return np.hstack([z, probs]).astype(np.float32)
+
+
+def load_manifest():
+    if not os.path.exists(INDEX_MANIFEST):
+        return {}
+    with open(INDEX_MANIFEST) as f:
+        return json.load(f)
+
+
+def _save_manifest(manifest):
+    tmp_path = f"{INDEX_MANIFEST}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, INDEX_MANIFEST)
+
+
+def build_comparables_index(force=False):
+    """
+    Brings the on-disk index up to date with historical_advanced and master_archetypes.
+    Each season is fingerprinted by the content of its rows in both; only new or changed
+    seasons are re-encoded. Returns the loaded index.
+    """
+    manifest = load_manifest()
+    if force or manifest.get('version') != INDEX_VERSION:
+        manifest = {'version': INDEX_VERSION, 'seasons': {}}
+
+    adv = load_dataset('historical_advanced', columns=['PLAYER_NAME', 'TEAM', 'SEASON', 'GP'] + STAT_FEATURES)
+    adv['SEASON'] = adv['SEASON'].astype(str)
+    arch = _load_archetypes()
+
+    seasons = sorted(adv['SEASON'].unique())
+    encoded = 0
+    os.makedirs(os.path.dirname(_season_path('x')), exist_ok=True)
+    for season, season_adv in adv.groupby('SEASON', sort=True):
+        season_arch = arch[arch['SEASON'] == season]
+        fp = _frame_hash(season_adv) + _frame_hash(season_arch)
+        if manifest['seasons'].get(season) == fp and os.path.exists(_season_path(season)):
+            continue
+        encode_season(season_adv, season_arch).to_parquet(_season_path(season), index=False)
+        manifest['seasons'][season] = fp
+        encoded += 1
+
+    # Seasons that disappeared from the source drop out of the index
+    for season in set(manifest['seasons']) - set(seasons):
+        del manifest['seasons'][season]
+        if os.path.exists(_season_path(season)):
+            os.remove(_season_path(season))
+    manifest['built_at'] = time.strftime('%Y-%m-%d %H:%M:%S')
+    _save_manifest(manifest)
+    print(f"Comparables index: {encoded} season(s) encoded, {len(seasons) - encoded} reused.")
+    return load_comparables_index(reload=True)
+
+
+_INDEX = None
+
+
+def load_comparables_index(reload=False):
+    """The whole index in memory (built on first use). Cached per process."""
+    global _INDEX
+    if _INDEX is not None and not reload:
+        return _INDEX
+    manifest = load_manifest()
+    if not manifest.get('seasons'):
+        return build_comparables_index()
+    rows = pd.concat([pd.read_parquet(_season_path(s)) for s in sorted(manifest['seasons'])], ignore_index=True)
+    _INDEX = index_from_rows(rows)
+    return _INDEX
+
+
+def _candidate_mask(meta, seasons=None, off_archetype=None, def_archetype=None):
+    """Boolean mask over index rows for a (first, last) SEASON range and/or archetype (label or cluster id)."""
+    mask = np.ones(len(meta), dtype=bool)
+    if seasons is not None:
+        first, last = seasons
+        if first is not None:
+            mask &= (meta['SEASON'] >= first).to_numpy()
+        if last is not None:
+            mask &= (meta['SEASON'] <= last).to_numpy()
+    for value, label_col, id_col in [(off_archetype, 'Offensive Archetype', 'Off_Cluster'),
+                                     (def_archetype, 'Defensive Archetype', 'Def_Cluster')]:
+        if value is None:
+            continue
+        col = id_col if isinstance(value, (int, np.integer)) else label_col
+        mask &= (meta[col] == value).fillna(False).to_numpy() if col in meta.columns else False
+    return mask
+
+
+def find_comparables(queries, k=DEFAULT_K, seasons=None, off_archetype=None, def_archetype=None,
+                     exclude_same_player=True, index=None):
+    """
+    Top-k most similar indexed player-seasons for every row of queries (a frame with
+    STAT_FEATURES, optional P_ memberships and PLAYER_NAME). Squared distances for a batch
+    of queries come from one matrix product. Returns a long frame: QUERY_ROW (queries'
+    index label), RANK, DISTANCE and the neighbour's meta and stat columns.
+    """
+    index = index or load_comparables_index()
+    meta = index['meta']
+    candidates = np.flatnonzero(_candidate_mask(meta, seasons, off_archetype, def_archetype))
+    if len(queries) == 0 or len(candidates) == 0:
+        return pd.DataFrame(columns=['QUERY_ROW', 'RANK', 'DISTANCE'] + list(meta.columns))
+
+    X = index['X'][candidates]
+    norms = index['norms'][candidates]
+    codes = index['player_codes'][candidates]
+    Q = encode(queries, index)
+    q_codes = index['player_keys'].get_indexer(queries['PLAYER_NAME']) if 'PLAYER_NAME' in queries.columns else None
+    k = min(k, len(candidates))
+
+    out_rows, out_q, out_d = [], [], []
+    for start in range(0, len(Q), QUERY_BATCH_SIZE):
+        qb = Q[start:start + QUERY_BATCH_SIZE]
+        d2 = (qb * qb).sum(axis=1)[:, None] - 2.0 * (qb @ X.T) + norms[None, :]
+        if exclude_same_player and q_codes is not None:
+            d2[q_codes[start:start + len(qb), None] == codes[None, :]] = np.inf
+        top = np.argpartition(d2, k - 1, axis=1)[:, :k]
+        top_d = np.take_along_axis(d2, top, axis=1)
+        order = np.argsort(top_d, axis=1)
+        top, top_d = np.take_along_axis(top, order, axis=1), np.take_along_axis(top_d, order, axis=1)
+        out_rows.append(candidates[top].ravel())
+        out_d.append(np.sqrt(np.maximum(top_d, 0)).ravel())
+        out_q.append(np.repeat(np.arange(start, start + len(qb)), k))
+
+    rows, dist, q = np.concatenate(out_rows), np.concatenate(out_d), np.concatenate(out_q)
+    keep = np.isfinite(dist)
+    result = pd.concat([meta.iloc[rows[keep]].reset_index(drop=True),
+                        index['raw'][STAT_FEATURES].iloc[rows[keep]].reset_index(drop=True)], axis=1)
+    result.insert(0, 'DISTANCE', dist[keep].astype(np.float32))
+    result.insert(0, 'RANK', np.tile(np.arange(1, k + 1), len(Q))[keep])
+    result.insert(0, 'QUERY_ROW', queries.index.to_numpy()[q[keep]])
+    return result
+
+
+def player_rows(player, season=None, index=None):
+    """A player's indexed season rows (latest season when season is None), ready to use as queries."""
+    index = index or load_comparables_index()
+    meta = index['meta']
+    mask = (meta['PLAYER_NAME'] == player) if isinstance(player, str) else (meta['PLAYER_ID'] == player).fillna(False)
+    hits = meta.index[mask.to_numpy()]
+    if season is not None:
+        hits = hits[meta.loc[hits, 'SEASON'].to_numpy() == season]
+    elif len(hits):
+        hits = hits[meta.loc[hits, 'SEASON'].to_numpy() == meta.loc[hits, 'SEASON'].max()]
+    return pd.concat([meta.loc[hits], index['raw'].loc[hits]], axis=1)
+
+
+def comparables_for_player(player, season=None, k=DEFAULT_K, index=None, **filters):
+    """Top-k comparables for one player (name or PLAYER_ID) in one season (default: their latest)."""
+    index = index or load_comparables_index()
+    queries = player_rows(player, season, index)
+    if queries.empty:
+        return queries
+    return find_comparables(queries, k=k, index=index, **filters)
+
+
+def comparable_features(player_ids, seasons, k=DEFAULT_K, index=None):
+    """
+    COMP_* columns for (PLAYER_ID, SEASON) pairs: mean COMP_STATS of the k nearest
+    player-seasons from strictly earlier seasons, plus their mean distance. Pairs missing
+    from the index get NaN.
+    """
+    index = index or load_comparables_index()
+    meta = index['meta']
+    keys = pd.DataFrame({'PLAYER_ID': pd.array(player_ids, dtype='Int64'), 'SEASON': pd.Series(seasons, dtype=str).to_numpy()})
+    lookup = meta.reset_index().dropna(subset=['PLAYER_ID']).drop_duplicates(['PLAYER_ID', 'SEASON'], keep='last')
+    lookup['PLAYER_ID'] = lookup['PLAYER_ID'].astype('Int64')
+    rows = keys.merge(lookup[['PLAYER_ID', 'SEASON', 'index']], on=['PLAYER_ID', 'SEASON'], how='left')['index']
+
+    cols = [f"COMP_{s.replace('%', '_PCT')}" for s in COMP_STATS] + ['COMP_DISTANCE']
+    features = pd.DataFrame(np.nan, index=keys.index, columns=cols, dtype=np.float32)
+    for season, group in rows.dropna().groupby(keys['SEASON']):
+        queries = pd.concat([meta.loc[group.astype(int)], index['raw'].loc[group.astype(int)]], axis=1).set_axis(group.index)
+        comps = find_comparables(queries, k=k, seasons=(None, _previous_season(season)), index=index)
+        agg = comps.groupby('QUERY_ROW')[COMP_STATS + ['DISTANCE']].mean()
+        features.loc[agg.index, cols] = agg.to_numpy(dtype=np.float32)
+    return features
+
+
+def _previous_season(season):
+    start = int(season[:4]) - 1
+    return f"{start}-{str(start + 1)[-2:]}"
+
+
+if __name__ == "__main__":
+    # python comparables.py [--rebuild] ["Player Name" [SEASON]]
+    args = [a for a in sys.argv[1:] if a != '--rebuild']
+    build_comparables_index(force='--rebuild' in sys.argv)
+    if args:
+        start = time.perf_counter()
+        comps = comparables_for_player(args[0], season=args[1] if len(args) > 1 else None)
+        print(comps[['RANK', 'DISTANCE', 'PLAYER_NAME', 'SEASON', 'TEAM'] + STAT_FEATURES[-3:]].to_string(index=False))
+        print(f"Query took {(time.perf_counter() - start) * 1000:.1f} ms")
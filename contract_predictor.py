@@ -0,0 +1,88 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+
+# --- Configuration ---
+# The contract model is StandardScaler + Lasso, i.e. one affine map over FEATURES.
+# Exporting the fused weights lets consumers score without importing scikit-learn.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LINEAR_MODEL_FILE = os.path.join(BASE_DIR, 'contract_model_linear.json')
+
+# Max allowed |sklearn - numpy| prediction gap (predictions are shares of the cap)
+PARITY_TOLERANCE = 1e-9
+
+
+def fuse_linear_model(model, scaler):
+    """
+    Folds the scaler into the coefficients:
+    coef . ((x - mean) / scale) + b  ==  (coef / scale) . x + (b - coef . mean / scale)
+    """
+    coef = np.asarray(model.coef_, dtype=np.float64).ravel()
+    mean = scaler.mean_ if getattr(scaler, 'mean_', None) is not None and scaler.with_mean else np.zeros_like(coef)
+    scale = scaler.scale_ if getattr(scaler, 'scale_', None) is not None and scaler.with_std else np.ones_like(coef)
+    weights = coef / scale
+    intercept = float(model.intercept_) - float(np.dot(weights, mean))
+    return weights, intercept
+
+
+def check_parity(model, scaler, linear, X):
+    """Raises if the fused predictor disagrees with the sklearn pipeline on X (a DataFrame)."""
+    expected = model.predict(scaler.transform(X[linear['features']]))
+    actual = predict(X, linear)
+    gap = float(np.max(np.abs(expected - actual))) if len(X) else 0.0
+    if gap > PARITY_TOLERANCE:
+        raise ValueError(f"Linear export disagrees with sklearn pipeline (max gap {gap:.3g})")
+    return gap
+
+
+def export_linear_model(model, scaler, features, version, X_check=None, path=LINEAR_MODEL_FILE):
+    """
+    Writes weights, intercept, feature order and model version to a small JSON file.
+    Parity against the sklearn pipeline is checked on X_check (or on points spread
+    around the scaler's mean) before anything is written.
+    """
+    weights, intercept = fuse_linear_model(model, scaler)
+    linear = {'weights': weights, 'intercept': intercept, 'features': list(features), 'version': version}
+
+    if X_check is None:
+        rng = np.random.default_rng(0)
+        points = scaler.mean_ + rng.standard_normal((256, len(features))) * scaler.scale_
+        X_check = pd.DataFrame(points, columns=list(features))
+    gap = check_parity(model, scaler, linear, X_check)
+
+    record = dict(linear, weights=weights.tolist())
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(record, f, indent=2)
+    os.replace(tmp_path, path)
+    print(f"Exported linear contract model {version} to {path} (parity gap {gap:.1e}).")
+    return linear
+
+
+def load_linear_model(path=LINEAR_MODEL_FILE):
+    with open(path) as f:
+        record = json.load(f)
+    record['weights'] = np.asarray(record['weights'], dtype=np.float64)
+    return record
+
+
+def predict(df, linear):
+    """Scores every row of df in one matrix-vector product (columns taken in the exported order)."""
+    X = df[linear['features']].to_numpy(dtype=np.float64)
+    return X @ linear['weights'] + linear['intercept']
+
+
+def export_saved_model():
+    """Re-exports the linear artifact from the saved joblib model (checked on the training set)."""
+    import joblib
+    from contract_training import FEATURES, MODEL_FILE, SCALER_FILE, TRAINING_SET_FILE
+    from valuation_ledger import model_version
+
+    X_train = pd.read_csv(TRAINING_SET_FILE)[FEATURES] if os.path.exists(TRAINING_SET_FILE) else None
+    return export_linear_model(joblib.load(MODEL_FILE), joblib.load(SCALER_FILE), FEATURES,
+                               model_version(MODEL_FILE, SCALER_FILE), X_check=X_train)
+
+
+if __name__ == "__main__":
+    export_saved_model()
@@ -0,0 +1,201 @@
+import os
+import json
+import time
+import hashlib
+import joblib
+import pandas as pd
+from nba_api.stats.endpoints import leaguedashplayerstats
+from sklearn.linear_model import LassoCV
+from sklearn.preprocessing import StandardScaler
+
+from nba_fetch import fetch_frames, response_hash
+from fa_parsing import parse_money
+from player_index import ALIASES_FILE, attach_player_ids
+from contract_predictor import LINEAR_MODEL_FILE, export_linear_model
+from valuation_ledger import model_version
+from comparables import comparable_features
+
+# --- Configuration ---
+# The training inputs (closed seasons + signed FA contracts) almost never change, so the
+# merged training set and the fitted model are reused until their fingerprint changes.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FA_DIR = os.path.join(BASE_DIR, 'Contract Training')
+
+CAPS = {2023: 136021000, 2024: 140588000, 2025: 155100000}
+SEASON_MAP = {2023: '2022-23', 2024: '2023-24', 2025: '2024-25'}
+FA_FILES = {
+    2023: '2023 NBA Free Agents.csv',
+    2024: '2024 NBA Free Agents.csv',
+    2025: '2025 NBA Free Agents (1).csv',
+}
+FEATURES = ['AGE', 'GP', 'MIN', 'PTS', 'REB', 'AST', 'STL', 'BLK', 'PLUS_MINUS', 'TS_PCT', 'USG_PCT', 'PIE']
+# Historical-comparables summary (see comparables.py) stored alongside FEATURES in the
+# training set; add them to FEATURES to train on them (scorers must then attach them too)
+COMPARABLE_FEATURES = ['COMP_PIE', 'COMP_NETRTG', 'COMP_USG_PCT', 'COMP_TS_PCT', 'COMP_DISTANCE']
+
+TRAINING_SET_FILE = os.path.join(BASE_DIR, 'master_training_set.csv')
+MODEL_FILE = os.path.join(BASE_DIR, 'contract_model.joblib')
+SCALER_FILE = os.path.join(BASE_DIR, 'data_scaler.joblib')
+FINGERPRINT_FILE = os.path.join(BASE_DIR, 'contract_model_fingerprint.json')
+
+# Query parameters of the two stat pulls merged for every season
+TRAD_PARAMS = {'per_mode_detailed': 'Totals'}
+ADV_PARAMS = {'measure_type_detailed_defense': 'Advanced'}
+
+
+def _file_sha(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def stat_hashes(saved=None):
+    """
+    Content hashes of the season stat responses, per season [traditional, advanced].
+    A response in the local nba_fetch cache is hashed as is; otherwise the hash saved with
+    the model is reused (closed seasons don't change), so a cold cache (e.g. CI) doesn't
+    re-download every season just to find the model is current. Fetches only when neither exists.
+    """
+    saved_stats = (saved or {}).get('stats', {})
+    stats = {}
+    for season in SEASON_MAP.values():
+        previous = saved_stats.get(season, [None, None])
+        stats[season] = [
+            response_hash(leaguedashplayerstats.LeagueDashPlayerStats, fetch=False, season=season, **params)
+            or previous[i]
+            or response_hash(leaguedashplayerstats.LeagueDashPlayerStats, season=season, **params)
+            for i, params in enumerate((TRAD_PARAMS, ADV_PARAMS))
+        ]
+    return stats
+
+
+def artifact_paths(features=FEATURES):
+    """
+    (model, scaler, fingerprint) files for a feature set. FEATURES keeps the original names;
+    other sets (e.g. contract_engine's full box score model) get a feature-list hash suffix.
+    """
+    if list(features) == FEATURES:
+        return MODEL_FILE, SCALER_FILE, FINGERPRINT_FILE
+    tag = hashlib.sha256(json.dumps(list(features)).encode('utf-8')).hexdigest()[:8]
+    return tuple(f"{root}_{tag}{ext}" for root, ext in map(os.path.splitext, (MODEL_FILE, SCALER_FILE, FINGERPRINT_FILE)))
+
+
+def compute_fingerprint(stats, features=FEATURES):
+    """
+    Hash of everything the model is trained on: FA contract files, the player aliases used
+    to join them, the season stat response hashes (see stat_hashes), feature list and cap table.
+    """
+    parts = {
+        'features': list(features),
+        'caps': {str(y): cap for y, cap in CAPS.items()},
+        'seasons': {str(y): s for y, s in SEASON_MAP.items()},
+        'fa_files': {str(y): _file_sha(os.path.join(FA_DIR, f)) for y, f in FA_FILES.items()},
+        'aliases': _file_sha(ALIASES_FILE) if os.path.exists(ALIASES_FILE) else None,
+        'stats': stats,
+    }
+    payload = json.dumps(parts, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def load_fingerprint(path=FINGERPRINT_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_fingerprint(record, path=FINGERPRINT_FILE):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(record, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def build_training_set():
+    """Merges each season's stats with that summer's signed FA contracts (target: share of cap)."""
+    all_training_data = []
+    for year, season in SEASON_MAP.items():
+        print(f"Building training data for {season}...")
+        trad = fetch_frames(leaguedashplayerstats.LeagueDashPlayerStats, season=season, **TRAD_PARAMS)[0]
+        adv = fetch_frames(leaguedashplayerstats.LeagueDashPlayerStats, season=season, **ADV_PARAMS)[0]
+        stats = pd.merge(trad, adv[['PLAYER_ID', 'TS_PCT', 'USG_PCT', 'PIE']], on='PLAYER_ID')
+
+        fa_df = pd.read_csv(os.path.join(FA_DIR, FA_FILES[year]))
+        p_col = [c for c in fa_df.columns if 'Player' in c][0]
+        a_col = [c for c in fa_df.columns if 'AAV' in c][0]
+        fa_df = fa_df[[p_col, a_col]].rename(columns={p_col: 'Player', a_col: 'Actual_AAV'})
+        fa_df['Actual_AAV'] = parse_money(fa_df['Actual_AAV'])
+        # Joined on PLAYER_ID so spelling differences ('Nicolas'/'Nic Claxton') don't drop signings
+        attach_player_ids(fa_df, 'Player', season=season)
+
+        merged = pd.merge(stats, fa_df, on='PLAYER_ID')
+        merged['Cap_Pct'] = merged['Actual_AAV'] / CAPS[year]
+        merged['SEASON'] = season
+        all_training_data.append(merged)
+
+    df = pd.concat(all_training_data).dropna().reset_index(drop=True)
+    return attach_comparable_features(df)
+
+
+def attach_comparable_features(df):
+    """Adds COMPARABLE_FEATURES (from earlier seasons only) per PLAYER_ID + SEASON; NaN where unavailable."""
+    try:
+        comps = comparable_features(df['PLAYER_ID'], df['SEASON'])
+    except FileNotFoundError as e:
+        print(f"Comparables index unavailable ({e}); leaving comparable features empty.")
+        comps = pd.DataFrame(index=df.index, columns=COMPARABLE_FEATURES, dtype='float32')
+    return pd.concat([df, comps[COMPARABLE_FEATURES]], axis=1)
+
+
+def fit_model(df_train, features=FEATURES):
+    X, y = df_train[features], df_train['Cap_Pct']
+    scaler = StandardScaler().fit(X)
+    model = LassoCV(cv=5, random_state=42).fit(scaler.transform(X), y)
+    return model, scaler
+
+
+def ensure_model(force=False, features=FEATURES):
+    """
+    Returns (model, scaler) for a feature set. Loads the saved artifacts when the input
+    fingerprint is unchanged; otherwise rebuilds master_training_set.csv, refits and
+    re-saves them (plus, for FEATURES, the fused linear export used by contract_predictor).
+    """
+    features = list(features)
+    model_file, scaler_file, fingerprint_file = artifact_paths(features)
+    saved = load_fingerprint(fingerprint_file)
+    fingerprint = compute_fingerprint(stat_hashes(saved), features)
+    artifacts_exist = all(os.path.exists(p) for p in (model_file, scaler_file, TRAINING_SET_FILE))
+    exports_linear = features == FEATURES
+
+    if not force and artifacts_exist and saved.get('fingerprint') == fingerprint:
+        print(f"Contract model is up to date (fingerprint {fingerprint[:12]}); skipping retrain.")
+        model, scaler = joblib.load(model_file), joblib.load(scaler_file)
+        if exports_linear and not os.path.exists(LINEAR_MODEL_FILE):
+            X_train = pd.read_csv(TRAINING_SET_FILE)[FEATURES]
+            export_linear_model(model, scaler, FEATURES, model_version(MODEL_FILE, SCALER_FILE), X_check=X_train)
+        return model, scaler
+
+    reason = "forced" if force else ("inputs changed" if saved else "no saved fingerprint")
+    print(f"Retraining contract model ({reason})...")
+    df_train = build_training_set()
+    df_train.to_csv(TRAINING_SET_FILE, index=False)
+
+    model, scaler = fit_model(df_train, features)
+    joblib.dump(model, model_file)
+    joblib.dump(scaler, scaler_file)
+    if exports_linear:
+        # Fused NumPy-only copy for consumers that only need to score
+        export_linear_model(model, scaler, FEATURES, model_version(MODEL_FILE, SCALER_FILE), X_check=df_train[FEATURES])
+    # The stats were just fetched for the training set, so these hashes match what was trained on
+    stats = stat_hashes()
+    _save_fingerprint({
+        'fingerprint': compute_fingerprint(stats, features),
+        'stats': stats,
+        'training_rows': len(df_train),
+        'trained_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+    }, fingerprint_file)
+    print(f"✅ Model trained on {len(df_train)} rows and saved.")
+    return model, scaler
+
+
+if __name__ == "__main__":
+    ensure_model()
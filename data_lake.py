@@ -0,0 +1,178 @@
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+# --- Configuration ---
+# Typed, partitioned Parquet copies of the hand-off files. Consumers read only the
+# columns (and partitions) they need instead of re-parsing the whole CSV.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LAKE_DIR = os.environ.get('NBA_LAKE_DIR', os.path.join(BASE_DIR, 'data_lake'))
+
+# Weekly timeseries live in snapshot_store instead (one segment per SNAPSHOT_TIME)
+# Dataset -> partition columns + the legacy CSV it mirrors (relative to BASE_DIR)
+DATASETS = {
+    'historical_advanced': {
+        'partition_cols': ['SEASON'],
+        'csv': 'Historical Advanced/nba_historical_advanced_stats_1997_2025.csv',
+    },
+    'master_archetypes': {
+        'partition_cols': ['SEASON'],
+        'csv': 'Archetype and Cluster Analysis/Historical Player Clusters/General/Master_Archetype_CSV.csv',
+    },
+    'historical_general': {
+        'partition_cols': ['SEASON'],
+        'csv': 'Archetype and Cluster Analysis/Historical Player Clusters/General/nba_historical_general_stats_2015_2025.csv',
+    },
+    'historical_offensive_playtypes': {
+        'partition_cols': ['SEASON'],
+        'csv': 'Archetype and Cluster Analysis/Historical Player Clusters/Offensive/nba_historical_offensive_playtypes_2015_2025.csv',
+    },
+    'historical_pnr': {
+        'partition_cols': ['SEASON'],
+        'csv': 'Archetype and Cluster Analysis/Historical Player Clusters/Offensive/nba_historical_pnr_2015_2025.csv',
+    },
+    'historical_defensive': {
+        'partition_cols': ['SEASON'],
+        'csv': 'Archetype and Cluster Analysis/Historical Player Clusters/Defensive/nba_historical_defensive_stats_2015_2025.csv',
+    },
+    # Long-format valuation ledger (see valuation_ledger.py)
+    'contract_valuations': {
+        'partition_cols': ['SNAPSHOT_DATE', 'MODEL_VERSION'],
+        'csv': 'Weekly Updates/Contract Value Weekly Update/nba_contract_valuations.csv',
+    },
+}
+
+# Placeholder strings older exports used for missing numbers
+NULL_TOKENS = ['n/a', '']
+
+
+def dataset_path(name):
+    return os.path.join(LAKE_DIR, name)
+
+
+def has_dataset(name):
+    return os.path.isdir(dataset_path(name))
+
+
+def coerce_types(df, partition_cols):
+    """
+    Numeric text (e.g. 'n/a'-padded stat columns) -> numbers, partition keys -> str.
+    Repetitive strings (names, teams) are dictionary-encoded by Parquet itself.
+    """
+    df = df.copy()
+    for col in df.columns:
+        if col in partition_cols:
+            df[col] = df[col].astype(str)
+            continue
+        if df[col].dtype != object and not pd.api.types.is_string_dtype(df[col]):
+            continue
+        values = df[col].replace(NULL_TOKENS, None)
+        numeric = pd.to_numeric(values, errors='coerce')
+        if values.notna().any() and numeric.notna().sum() == values.notna().sum():
+            df[col] = numeric
+    return df
+
+
+def write_dataset(df, name, csv_path=None):
+    """
+    Writes df as hive-partitioned Parquet. Only the partitions present in df are
+    replaced, so writing one season leaves the others untouched.
+    Pass csv_path to also export the legacy CSV.
+    """
+    if csv_path:
+        df.to_csv(csv_path, index=False)
+
+    partition_cols = DATASETS[name]['partition_cols']
+    typed = coerce_types(df, partition_cols)
+
+    table = pa.Table.from_pandas(typed, preserve_index=False)
+    ds.write_dataset(
+        table,
+        dataset_path(name),
+        format='parquet',
+        partitioning=partition_cols,
+        partitioning_flavor='hive',
+        existing_data_behavior='delete_matching',
+        basename_template='part-{i}.parquet',
+    )
+    print(f"Wrote {len(df)} rows to data lake dataset '{name}'.")
+
+
+def legacy_csv_path(name):
+    return os.path.join(BASE_DIR, DATASETS[name]['csv'])
+
+
+def _partitioning(name):
+    # Partition keys are always strings (a date or all-digit version would otherwise be inferred)
+    schema = pa.schema([(col, pa.string()) for col in DATASETS[name]['partition_cols']])
+    return ds.partitioning(schema, flavor='hive')
+
+
+def dataset_columns(name, csv_path=None):
+    if has_dataset(name):
+        return ds.dataset(dataset_path(name), format='parquet', partitioning=_partitioning(name)).schema.names
+    return pd.read_csv(csv_path or legacy_csv_path(name), nrows=0).columns.tolist()
+
+
+def partition_values(name, csv_path=None):
+    """Sorted values of the dataset's first partition column (e.g. every SEASON), without reading rows."""
+    col = DATASETS[name]['partition_cols'][0]
+    if has_dataset(name):
+        prefix = f"{col}="
+        return sorted(d[len(prefix):] for d in os.listdir(dataset_path(name)) if d.startswith(prefix))
+    values = pd.read_csv(csv_path or legacy_csv_path(name), usecols=[col])[col]
+    return sorted(values.dropna().astype(str).unique())
+
+
+def _apply_filters(df, filters):
+    ops = {
+        '==': lambda s, v: s == v, '!=': lambda s, v: s != v,
+        '<': lambda s, v: s < v, '<=': lambda s, v: s <= v,
+        '>': lambda s, v: s > v, '>=': lambda s, v: s >= v,
+        'in': lambda s, v: s.isin(v), 'not in': lambda s, v: ~s.isin(v),
+    }
+    mask = pd.Series(True, index=df.index)
+    for col, op, val in filters:
+        mask &= ops[op](df[col], val)
+    return df[mask]
+
+
+def load_dataset(name, columns=None, filters=None, csv_path=None):
+    """
+    Loads a dataset with column projection and predicate pushdown.
+    filters uses the pandas/pyarrow tuple form, e.g. [('SEASON', '>=', '2015-16')].
+    Requested columns the dataset doesn't have are skipped. Falls back to the
+    legacy CSV (csv_path or the registered one, reading only the requested columns)
+    if the dataset isn't in the lake.
+    """
+    available = dataset_columns(name, csv_path)
+    if columns is not None:
+        filter_cols = [f[0] for f in filters or []]
+        columns = [c for c in dict.fromkeys(list(columns) + filter_cols) if c in available]
+
+    if has_dataset(name):
+        return pd.read_parquet(dataset_path(name), columns=columns, filters=filters,
+                               partitioning=_partitioning(name))
+
+    df = pd.read_csv(csv_path or legacy_csv_path(name), usecols=columns)
+    return _apply_filters(df, filters) if filters else df
+
+
+def export_csv(name, path, columns=None, filters=None):
+    load_dataset(name, columns=columns, filters=filters).to_csv(path, index=False)
+    print(f"Exported '{name}' to {path}")
+
+
+def import_legacy_csvs():
+    """One-off migration: loads every registered CSV that exists into the lake."""
+    for name, spec in DATASETS.items():
+        path = legacy_csv_path(name)
+        if not os.path.exists(path):
+            print(f"Skipping {name}: {spec['csv']} not found.")
+            continue
+        write_dataset(pd.read_csv(path), name)
+
+
+if __name__ == "__main__":
+    import_legacy_csvs()
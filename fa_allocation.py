@@ -0,0 +1,227 @@
+import sys
+import time
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.optimize import milp, LinearConstraint, Bounds
+
+# --- Configuration ---
+# League-wide free-agent allocation: every FA goes to at most one team and every team's
+# cap space and exceptions are consumed as it signs players, maximising total fit.
+# Signing mechanisms (2024-25 amounts, approximate):
+#   Bird Rights - re-signing an incumbent (From == team), no salary limit
+#   Cap Space   - sum of these salaries <= the team's cap space
+#   Exception   - room exception (under the cap) or taxpayer MLE (over it); can be split
+#   Minimum     - minimum contracts, any team
+MECHANISMS = np.array(['Bird Rights', 'Cap Space', 'Exception', 'Minimum'], dtype=object)
+BIRD, CAP, EXCEPTION, MINIMUM = range(4)
+# Greedy tie-break between mechanisms for the same signing: spend scarce cap space last
+MECHANISM_PREFERENCE = np.array([0, 3, 2, 1])
+MLE_AMOUNT = 5200000        # Taxpayer MLE approx (same figure the destination / lineup scripts use)
+ROOM_EXCEPTION = 7983000
+MIN_SALARY = 2087519        # 2-year veteran minimum
+MAX_SIGNINGS_PER_TEAM = 4   # open roster spots assumed per team
+
+# Exact ILP (HiGHS via scipy.optimize.milp) up to this many candidate signings, else greedy
+ILP_MAX_CANDIDATES = 200000
+ILP_TIME_LIMIT = 30.0
+LOCAL_SEARCH_PASSES = 5
+
+
+def signing_candidates(values, aav, cap_space, bird):
+    """
+    Every allowed (FA, team, mechanism) with a positive value, as arrays (fa, team, mech,
+    value). A Bird-eligible pair only gets the Bird option and a minimum-salary player only
+    the Minimum one (they dominate); other players can use cap space and/or the exception.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    aav = np.asarray(aav, dtype=np.float64)[:, None]
+    cap_space = np.asarray(cap_space, dtype=np.float64)
+    exception = np.where(cap_space >= 0, ROOM_EXCEPTION, MLE_AMOUNT)
+    positive = values > 0
+    minimum = ~bird & (aav <= MIN_SALARY)
+    rest = ~bird & ~minimum
+
+    options = [
+        (BIRD, positive & bird),
+        (CAP, positive & rest & (aav <= np.maximum(cap_space, 0))),
+        (EXCEPTION, positive & rest & (aav <= exception)),
+        (MINIMUM, positive & minimum),
+    ]
+    fa, team, mech = [], [], []
+    for code, mask in options:
+        i, t = np.nonzero(mask)
+        fa.append(i)
+        team.append(t)
+        mech.append(np.full(len(i), code))
+    fa, team, mech = np.concatenate(fa), np.concatenate(team), np.concatenate(mech)
+    return fa, team, mech, values[fa, team]
+
+
+def _budgets(cap_space):
+    cap_space = np.asarray(cap_space, dtype=np.float64)
+    return np.maximum(cap_space, 0), np.where(cap_space >= 0, ROOM_EXCEPTION, MLE_AMOUNT)
+
+
+def solve_ilp(fa, team, mech, value, aav, cap_space, n_fas, roster_spots=MAX_SIGNINGS_PER_TEAM, time_limit=ILP_TIME_LIMIT):
+    """Exact allocation as a 0/1 program. Returns a boolean mask over the candidates, or None."""
+    n, n_teams = len(fa), len(cap_space)
+    cap_budget, exc_budget = _budgets(cap_space)
+    cost = np.asarray(aav, dtype=np.float64)[fa]
+    cols = np.arange(n)
+    on_cap, on_exc = mech == CAP, mech == EXCEPTION
+    # Rows: one team per FA | roster spots per team | cap space per team | exception per team
+    A = sparse.vstack([
+        sparse.csr_matrix((np.ones(n), (fa, cols)), shape=(n_fas, n)),
+        sparse.csr_matrix((np.ones(n), (team, cols)), shape=(n_teams, n)),
+        sparse.csr_matrix((cost[on_cap], (team[on_cap], cols[on_cap])), shape=(n_teams, n)),
+        sparse.csr_matrix((cost[on_exc], (team[on_exc], cols[on_exc])), shape=(n_teams, n)),
+    ]).tocsr()
+    ub = np.concatenate([np.ones(n_fas), np.full(n_teams, roster_spots, dtype=np.float64), cap_budget, exc_budget])
+    res = milp(-value, constraints=LinearConstraint(A, -np.inf, ub), integrality=np.ones(n),
+               bounds=Bounds(0, 1), options={'time_limit': time_limit})
+    if res.x is None:
+        return None
+    return res.x > 0.5
+
+
+def solve_greedy(fa, team, mech, value, aav, cap_space, n_fas, roster_spots=MAX_SIGNINGS_PER_TEAM, passes=LOCAL_SEARCH_PASSES):
+    """
+    Highest-value candidates first (cheaper, then cap space last on ties) while the player
+    is free and the team has the spot and budget, then local search: move a signed player
+    to a better feasible team, or let an unsigned player replace a lower-value signing
+    whose salary makes room. Returns a boolean mask over the candidates.
+    """
+    aav = np.asarray(aav, dtype=np.float64)
+    cost = aav[fa]
+    budgets = np.stack(_budgets(cap_space))            # (2, teams): cap space, exception
+    budget_row = np.where(mech == CAP, 0, np.where(mech == EXCEPTION, 1, -1))
+    used = np.zeros_like(budgets)
+    spots = np.zeros(len(cap_space), dtype=np.int64)
+    chosen = np.full(n_fas, -1)                        # candidate index per FA
+
+    def fits(c, freed=None):
+        """Whether candidate c fits, optionally after removing candidate `freed` first."""
+        t, b = team[c], budget_row[c]
+        spot_use = spots[t] - (freed is not None and team[freed] == t)
+        if spot_use >= roster_spots:
+            return False
+        if b < 0:
+            return True
+        room = budgets[b, t] - used[b, t]
+        if freed is not None and team[freed] == t and budget_row[freed] == b:
+            room += cost[freed]
+        return cost[c] <= room + 1e-6
+
+    def apply(c, sign):
+        t, b = team[c], budget_row[c]
+        spots[t] += sign
+        if b >= 0:
+            used[b, t] += sign * cost[c]
+        chosen[fa[c]] = c if sign > 0 else -1
+
+    for c in np.lexsort((MECHANISM_PREFERENCE[mech], cost, -value)):
+        if chosen[fa[c]] < 0 and fits(c):
+            apply(c, 1)
+
+    by_fa = pd.Series(np.arange(len(fa))).groupby(fa).apply(lambda s: s.to_numpy()[np.argsort(-value[s.to_numpy()])]).to_dict()
+    by_team = pd.Series(np.arange(len(fa))).groupby(team).apply(lambda s: s.to_numpy()).to_dict()
+    for _ in range(passes):
+        improved = False
+        # 1. Move a signed player to a higher-value team (their candidates are sorted by value)
+        for i, current in enumerate(chosen):
+            if current < 0:
+                continue
+            for c in by_fa[i]:
+                if value[c] <= value[current] + 1e-9:
+                    break
+                if fits(c, freed=current):
+                    apply(current, -1)
+                    apply(c, 1)
+                    improved = True
+                    break
+        # 2. An unsigned player replaces a lower-value signing on the same team
+        for i, cands in by_fa.items():
+            if chosen[i] >= 0:
+                continue
+            for c in cands:
+                signed = [s for s in by_team[team[c]] if chosen[fa[s]] == s and value[s] < value[c] - 1e-9]
+                for s in sorted(signed, key=lambda s: value[s]):
+                    if fits(c, freed=s):
+                        apply(s, -1)
+                        apply(c, 1)
+                        improved = True
+                        break
+                if chosen[i] >= 0:
+                    break
+        if not improved:
+            break
+
+    mask = np.zeros(len(fa), dtype=bool)
+    mask[chosen[chosen >= 0]] = True
+    return mask
+
+
+def allocate_market(values, aav, cap_space, bird, roster_spots=MAX_SIGNINGS_PER_TEAM, method='auto'):
+    """
+    Assigns free agents to teams to maximise the summed fit values.
+    values: (FAs x teams) fit value, <= 0 means never signed there; aav: salary per FA;
+    cap_space: per team (negative = over the cap); bird: (FAs x teams) Bird rights.
+    method: 'ilp', 'greedy' or 'auto' (ILP, greedy when too large or the solver fails).
+    Returns one row per signed FA: FA_ROW, TEAM_IDX, Mechanism, Value.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    fa, team, mech, value = signing_candidates(values, aav, cap_space, np.asarray(bird, dtype=bool))
+    if len(fa) == 0:
+        # No positive fit anywhere (e.g. every need is already covered): nobody is signed
+        return pd.DataFrame({'FA_ROW': np.zeros(0, dtype=np.int64), 'TEAM_IDX': np.zeros(0, dtype=np.int64),
+                             'Mechanism': np.zeros(0, dtype=object), 'Value': np.zeros(0)})
+    args = (fa, team, mech, value, aav, cap_space, len(values), roster_spots)
+    mask = None
+    if method == 'ilp' or (method == 'auto' and len(fa) <= ILP_MAX_CANDIDATES):
+        try:
+            mask = solve_ilp(*args)
+        except Exception as e:
+            print(f"ILP solver error: {e}")
+        if mask is None:
+            print("ILP allocation failed, falling back to greedy + local search.")
+    if mask is None:
+        mask = solve_greedy(*args)
+    return pd.DataFrame({
+        'FA_ROW': fa[mask], 'TEAM_IDX': team[mask],
+        'Mechanism': MECHANISMS[mech[mask]], 'Value': value[mask],
+    }).sort_values('FA_ROW').reset_index(drop=True)
+
+
+def synthetic_market(n_fas, n_teams=30, fit_rate=0.3, seed=0):
+    """Random market shaped like the real one: sparse fit values, skewed salaries, mixed cap sheets."""
+    rng = np.random.default_rng(seed)
+    values = np.where(rng.random((n_fas, n_teams)) < fit_rate, rng.choice([1, 3, 4, 6, 7], (n_fas, n_teams)), 0)
+    aav = np.clip(rng.lognormal(15.6, 1.0, n_fas), 1.2e6, 55e6).round()
+    cap_space = rng.uniform(-30e6, 40e6, n_teams).round()
+    bird = rng.integers(-1, n_teams, n_fas)[:, None] == np.arange(n_teams)
+    return values, aav, cap_space, bird
+
+
+def benchmark(sizes=(100, 250, 500)):
+    """ILP vs greedy + local search on synthetic markets: runtime, total fit and how often
+    independent per-team picks would 'sign' the same player more than once."""
+    print(f"{'FAs':>6} {'candidates':>11} {'ILP s':>8} {'greedy s':>9} {'greedy/ILP':>11} {'multi-picked':>13}")
+    for n in sizes:
+        values, aav, cap_space, bird = synthetic_market(n)
+        start = time.perf_counter()
+        ilp = allocate_market(values, aav, cap_space, bird, method='ilp')
+        ilp_secs = time.perf_counter() - start
+        start = time.perf_counter()
+        greedy = allocate_market(values, aav, cap_space, bird, method='greedy')
+        greedy_secs = time.perf_counter() - start
+        n_candidates = len(signing_candidates(values, aav, cap_space, bird)[0])
+        # Each team independently taking its best player: how many players are taken twice or more
+        multi = int((np.bincount(values.argmax(axis=0), minlength=n) > 1).sum())
+        print(f"{n:>6} {n_candidates:>11} {ilp_secs:>8.2f} {greedy_secs:>9.2f} "
+              f"{greedy['Value'].sum() / ilp['Value'].sum():>11.3f} {multi:>13}")
+
+
+if __name__ == "__main__":
+    # python fa_allocation.py [SIZE ...]
+    benchmark(tuple(int(s) for s in sys.argv[1:]) or (100, 250, 500))
@@ -0,0 +1,125 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+
+from player_index import attach_player_ids
+
+# --- Configuration ---
+# Shared parsing for the free-agent and cap-sheet CSVs. Every helper works on a whole
+# column with vectorized string ops instead of applying a Python function per cell.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FA_2026_FILE = os.path.join(BASE_DIR, 'Contract Training', 'NBA Free Agents 2026 - Sheet1.csv')
+
+STATUSES = ['UFA', 'RFA', 'Player Option', 'Club Option']
+RIGHTS = ['Non-Bird', 'Early Bird', 'Full Bird']
+STATUS_DTYPE = pd.CategoricalDtype(STATUSES)
+RIGHTS_DTYPE = pd.CategoricalDtype(RIGHTS)
+
+
+def parse_money(values):
+    """
+    '$50,677,999' / '-$1,220,220' -> float64. Blanks, NaN and unparseable cells become 0.
+    Values that are already numeric are kept as they are.
+    """
+    s = pd.Series(values)
+    if pd.api.types.is_numeric_dtype(s):
+        return s.astype('float64').fillna(0.0)
+    text = s.astype('string').str.replace(r'[$,\s]', '', regex=True)
+    return pd.to_numeric(text, errors='coerce').astype('float64').fillna(0.0)
+
+
+def parse_fa_types(types):
+    """
+    Splits the 2026 sheet's Type column ('UFA / Bird', 'RFA / Early Bird', 'PLAYER / $49.0M')
+    into Status and Rights (categoricals) and Option_Value (float64, dollars).
+    """
+    t = pd.Series(types)
+    # Only a dozen distinct Type strings exist, so parse those once and broadcast by code
+    codes, uniques = pd.factorize(t.astype('string').str.upper().fillna(''))
+    u = pd.Series(uniques, dtype='string')
+
+    status = np.select(
+        [u.str.contains('RFA', regex=False), u.str.contains('PLAYER', regex=False), u.str.contains('CLUB', regex=False)],
+        ['RFA', 'Player Option', 'Club Option'],
+        default='UFA',
+    )
+    # 'NON-BIRD' also contains 'BIRD', so it has to be ruled out before Full Bird
+    rights = np.select(
+        [u.str.contains('NON-BIRD', regex=False), u.str.contains('EARLY BIRD', regex=False), u.str.contains('BIRD', regex=False)],
+        ['Non-Bird', 'Early Bird', 'Full Bird'],
+        default='Non-Bird',
+    )
+    opt_val = pd.to_numeric(u.str.extract(r'\$\s*([\d.]+)', expand=False), errors='coerce').fillna(0.0) * 1_000_000
+
+    return pd.DataFrame({
+        'Status': pd.Categorical(status[codes], dtype=STATUS_DTYPE),
+        'Rights': pd.Categorical(rights[codes], dtype=RIGHTS_DTYPE),
+        'Option_Value': opt_val.to_numpy(dtype='float64')[codes],
+    }, index=t.index)
+
+
+def load_fa_2026(path=FA_2026_FILE):
+    """Upcoming free agents with Status/Rights/Option_Value, Prev_AAV_Num and PLAYER_ID attached."""
+    fa_2026 = pd.read_csv(path, skiprows=1)
+    attach_player_ids(fa_2026, 'Player (248)', team_col='Prev Team')
+    fa_2026[['Status', 'Rights', 'Option_Value']] = parse_fa_types(fa_2026['Type'])
+    fa_2026['Prev_AAV_Num'] = parse_money(fa_2026['Prev AAV'])
+    return fa_2026
+
+
+def load_cap_space(path):
+    """Salary cap tracker with a numeric Cap_Space_Clean column."""
+    cap_df = pd.read_csv(path)
+    cap_df['Cap_Space_Clean'] = parse_money(cap_df['Cap SpaceAll'])
+    return cap_df
+
+
+def benchmark(path=FA_2026_FILE, repeat=200):
+    """Times the old per-row helpers against the vectorized ones on the 2026 sheet tiled `repeat` times."""
+    def clean_currency(val):
+        if pd.isna(val) or val == '': return 0
+        return float(str(val).replace('$', '').replace(',', '').strip())
+
+    def parse_fa_type(type_str):
+        t = str(type_str).upper()
+        status, rights, opt_val = "UFA", "Non-Bird", 0
+        if "RFA" in t: status = "RFA"
+        elif "PLAYER" in t: status = "Player Option"
+        elif "CLUB" in t: status = "Club Option"
+        if "BIRD" in t and "EARLY" not in t: rights = "Full Bird"
+        elif "EARLY BIRD" in t: rights = "Early Bird"
+        if "$" in t:
+            try: opt_val = float(t.split('$')[1].replace('M', '')) * 1_000_000
+            except: pass
+        return status, rights, opt_val
+
+    raw = pd.read_csv(path, skiprows=1)
+    df = pd.concat([raw] * repeat, ignore_index=True)
+    print(f"Benchmarking on {len(df):,} rows...")
+
+    start = time.perf_counter()
+    old_types = df['Type'].apply(lambda x: pd.Series(parse_fa_type(x)))
+    old_money = df['Prev AAV'].apply(clean_currency)
+    old_secs = time.perf_counter() - start
+
+    start = time.perf_counter()
+    new_types = parse_fa_types(df['Type'])
+    new_money = parse_money(df['Prev AAV'])
+    new_secs = time.perf_counter() - start
+
+    assert np.allclose(old_money.to_numpy(dtype=float), new_money.to_numpy())
+    assert (old_types[0] == new_types['Status'].astype(str)).all()
+    assert np.allclose(old_types[2].to_numpy(dtype=float), new_types['Option_Value'].to_numpy())
+    # The old rights check labelled 'Non-Bird' rows as Full Bird; everything else must agree
+    non_bird = df['Type'].str.upper().str.contains('NON-BIRD', regex=False)
+    assert (old_types.loc[~non_bird, 1] == new_types.loc[~non_bird, 'Rights'].astype(str)).all()
+    print(f"  Fixed rights on {int(non_bird.sum()):,} 'Non-Bird' rows (previously read as Full Bird)")
+
+    print(f"  Row-wise apply: {old_secs:.3f}s")
+    print(f"  Vectorized:     {new_secs:.3f}s ({old_secs / new_secs:.0f}x faster)")
+    return old_secs, new_secs
+
+
+if __name__ == "__main__":
+    benchmark()
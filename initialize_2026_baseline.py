@@ -1,38 +1,37 @@
 import pandas as pd
-import joblib
 from nba_api.stats.endpoints import leaguedashplayerstats
+from nba_fetch import fetch_frames
+from contract_predictor import load_linear_model, predict
+from fa_parsing import load_fa_2026
 
 CAP_2026_PROJECTED = 155100000
-FEATURES = ['AGE', 'GP', 'MIN', 'PTS', 'REB', 'AST', 'STL', 'BLK', 'PLUS_MINUS', 'TS_PCT', 'USG_PCT', 'PIE']
 
 def init_baseline():
-    # Load trained model and scaler
-    model = joblib.load('contract_model.joblib')
-    scaler = joblib.load('data_scaler.joblib')
+    # Load the fused linear export of the trained model + scaler
+    linear = load_linear_model()
 
     print("Fetching 2024-25 stats for 2026 baseline...")
-    trad = leaguedashplayerstats.LeagueDashPlayerStats(season='2024-25', per_mode_detailed='Totals').get_data_frames()[0]
-    adv = leaguedashplayerstats.LeagueDashPlayerStats(season='2024-25', measure_type_detailed_defense='Advanced').get_data_frames()[0]
+    trad = fetch_frames(leaguedashplayerstats.LeagueDashPlayerStats, season='2024-25', per_mode_detailed='Totals')[0]
+    adv = fetch_frames(leaguedashplayerstats.LeagueDashPlayerStats, season='2024-25', measure_type_detailed_defense='Advanced')[0]
     live_df = pd.merge(trad, adv[['PLAYER_ID', 'TS_PCT', 'USG_PCT', 'PIE']], on='PLAYER_ID')
 
-    # UPDATED: Correctly handle the header row and column names
-    fa_2026 = pd.read_csv('NBA Free Agents 2026 - Sheet1.csv', skiprows=1)
+    # Parsed FA list with PLAYER_ID attached from the player index
+    fa_2026 = load_fa_2026('NBA Free Agents 2026 - Sheet1.csv')
     
     # Clean column names to remove any leading/trailing spaces
     fa_2026.columns = fa_2026.columns.str.strip()
     
-    # Rename 'Player (248)' to 'Player' for consistent merging
+    # Rename 'Player (248)' to 'Player' for consistent output
     fa_2026 = fa_2026.rename(columns={'Player (248)': 'Player'})
 
-    # Merge stats with the free agent list
-    final = pd.merge(live_df, fa_2026, left_on='PLAYER_NAME', right_on='Player')
+    # Merge stats with the free agent list on the integer ID
+    final = pd.merge(live_df, fa_2026, on='PLAYER_ID')
     
     # Predict contract values
-    X_live = scaler.transform(final[FEATURES])
-    final['Baseline_AAV'] = model.predict(X_live) * CAP_2026_PROJECTED
+    final['Baseline_AAV'] = predict(final, linear) * CAP_2026_PROJECTED
     
     # UPDATED: Use 'Type' instead of 'Status' based on your CSV content
-    output_cols = ['Player', 'Baseline_AAV', 'Type', 'Prev Team']
+    output_cols = ['PLAYER_ID', 'Player', 'Baseline_AAV', 'Type', 'Prev Team']
     output = final[output_cols]
     
     output.to_csv('nba_contract_tracker.csv', index=False)
@@ -0,0 +1,187 @@
+import time
+import numpy as np
+import pandas as pd
+
+# --- Configuration ---
+# Lineup encoding shared by the lineup scripts: LeagueDashLineups GROUP_IDs ('-203999-1628369-...-')
+# become an N x slots PLAYER_ID array in one pass, archetypes become integer codes by array
+# indexing, and compositions are N x K count matrices (K archetypes), so ideal compositions
+# and missing-archetype gaps are matrix operations instead of per-row Python lists.
+EMPTY_SLOT = -1
+# Archetype names contain commas ('High Steals, Versatile, Disruptor'), so lists of them
+# (lineup_recommendations.csv Rec_Add_*) are joined with this instead
+ARCHETYPE_SEP = ' | '
+
+
+def parse_group_ids(group_ids):
+    """
+    GROUP_ID strings -> (ids, sizes): an N x max-size int64 PLAYER_ID array (EMPTY_SLOT
+    padding for smaller groups) and the number of players per row. Works for any mix of
+    2- to 5-man groups.
+    """
+    s = pd.Series(group_ids, dtype='string').str.strip('-').fillna('')
+    sizes = np.where(s.str.len() > 0, s.str.count('-') + 1, 0).astype(np.int64)
+    # One join + split over the whole column instead of a split per row
+    tokens = '-'.join(s[sizes > 0].tolist())
+    flat = np.array(tokens.split('-') if tokens else [], dtype=np.int64)
+    width = int(sizes.max()) if len(sizes) else 0
+    ids = np.full((len(s), width), EMPTY_SLOT, dtype=np.int64)
+    rows = np.repeat(np.arange(len(s)), sizes)
+    slots = np.arange(len(flat)) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    ids[rows, slots] = flat
+    return ids, sizes
+
+
+def player_lookup(ids, player_ids):
+    """Row of each id in player_ids (any order), -1 where the player (or slot) is unknown."""
+    player_ids = np.asarray(player_ids, dtype=np.int64)
+    if len(player_ids) == 0:
+        return np.full(np.shape(ids), -1)
+    order = np.argsort(player_ids, kind='stable')
+    sorted_ids = player_ids[order]
+    pos = np.minimum(np.searchsorted(sorted_ids, ids), len(sorted_ids) - 1)
+    found = (sorted_ids[pos] == ids) & (ids != EMPTY_SLOT)
+    return np.where(found, order[pos], -1)
+
+
+def encode_archetypes(ids, labels, unknown='Unknown'):
+    """
+    PLAYER_ID array -> (codes, names). labels maps PLAYER_ID -> archetype name (the last
+    label wins for repeated ids, like set_index(...).to_dict()). Players without a label get
+    the code of `unknown` (always the last name); empty slots get EMPTY_SLOT.
+    """
+    labels = pd.Series(labels)
+    labels = labels[~labels.index.duplicated(keep='last')]
+    names = sorted(set(labels.dropna()) - {unknown}) + [unknown]
+    label_codes = pd.Index(names).get_indexer(labels)
+    label_codes = np.where(label_codes < 0, len(names) - 1, label_codes)
+    lookup = player_lookup(ids, labels.index.to_numpy())
+    codes = np.where(lookup >= 0, label_codes[np.maximum(lookup, 0)], len(names) - 1)
+    return np.where(ids == EMPTY_SLOT, EMPTY_SLOT, codes), names
+
+
+def composition_counts(codes, n_codes):
+    """N x n_codes matrix: how many players of each archetype every lineup has."""
+    n = len(codes)
+    valid = codes >= 0
+    rows = np.broadcast_to(np.arange(n)[:, None], codes.shape)[valid]
+    return np.bincount(rows * n_codes + codes[valid], minlength=n * n_codes).reshape(n, n_codes)
+
+
+def soft_composition(ids, probs):
+    """
+    N x K expected archetype counts from a PLAYER_ID x archetype membership table: the
+    lineup players' membership rows summed (unknown players and empty slots add nothing).
+    """
+    P = probs.to_numpy(dtype=np.float32)
+    P = np.vstack([P, np.zeros((1, P.shape[1]), dtype=np.float32)])
+    rows = player_lookup(ids, probs.index.to_numpy())
+    return P[rows].sum(axis=1)
+
+
+def first_appearance(codes, groups, n_groups, n_codes):
+    """
+    n_groups x n_codes position of each archetype's first appearance in a group's lineups,
+    reading rows in order and slots left to right (the order a flattened list would have).
+    """
+    n, width = codes.shape
+    position = np.arange(n * width).reshape(n, width)
+    first = np.full((n_groups, n_codes), np.iinfo(np.int64).max)
+    valid = codes >= 0
+    np.minimum.at(first, (np.broadcast_to(groups[:, None], codes.shape)[valid], codes[valid]), position[valid])
+    return first
+
+
+def ideal_compositions(counts, groups, n_groups, first, n_slots=5):
+    """
+    Ideal n_slots composition per group from the lineups' N x K count matrix: the average
+    count per lineup, then n_slots times take the largest average and use one of it up.
+    Ties go to the archetype that appeared first. Returns n_groups x n_slots codes
+    (-1 = no archetype left, i.e. 'Any/Versatile') and the lineups per group.
+    """
+    sums = np.zeros((n_groups, counts.shape[1]))
+    np.add.at(sums, groups, counts)
+    n_lineups = np.bincount(groups, minlength=n_groups)
+    remaining = sums / np.maximum(n_lineups, 1)[:, None]
+
+    # Columns in value_counts order (count desc, first appearance) so argmax breaks ties the same way
+    order = np.lexsort((first, -sums), axis=-1)
+    remaining = np.take_along_axis(remaining, order, axis=1)
+    present = np.take_along_axis(sums, order, axis=1) > 0
+    remaining = np.where(present, remaining, -np.inf)
+
+    slots = np.full((n_groups, n_slots), -1)
+    rows = np.arange(n_groups)
+    for slot in range(n_slots):
+        best = remaining.argmax(axis=1)
+        ok = remaining[rows, best] > 0
+        slots[ok, slot] = order[rows[ok], best[ok]]
+        remaining[rows[ok], best[ok]] -= 1
+    return slots, n_lineups
+
+
+def join_names(codes, names, sep=', ', empty=''):
+    """Row-wise 'name, name, ...' strings for a code array (EMPTY_SLOT cells are skipped)."""
+    labels = np.append(np.asarray(names, dtype=object), empty)
+    text = labels[np.where(codes >= 0, codes, len(names))]
+    out = np.full(len(codes), '', dtype=object)
+    for j in range(codes.shape[1]):
+        col = text[:, j]
+        keep = codes[:, j] >= 0
+        out = np.where(keep, np.where(out == '', col, out + sep + col), out)
+    return out
+
+
+def split_archetypes(text, known=None):
+    """
+    Archetype names in an ARCHETYPE_SEP-joined cell, de-duplicated in order. Older files
+    joined them with ', '; those cells are only split when the `known` names are given, and
+    comma pieces are re-joined into the longest known name they start.
+    """
+    text = str(text).strip()
+    if ARCHETYPE_SEP.strip() in text or known is None or text in known:
+        parts = text.split(ARCHETYPE_SEP.strip())
+    else:
+        pieces = [p.strip() for p in text.split(',')]
+        parts, i = [], 0
+        while i < len(pieces):
+            j = next((j for j in range(len(pieces), i + 1, -1) if ', '.join(pieces[i:j]) in known), i + 1)
+            parts.append(', '.join(pieces[i:j]))
+            i = j
+    return list(dict.fromkeys(p.strip() for p in parts if p.strip()))
+
+
+def normalize_archetype_lists(values, known):
+    """Rewrites a column of archetype lists with ARCHETYPE_SEP joins (see split_archetypes)."""
+    known = set(known)
+    return pd.Series(values).map(lambda text: ARCHETYPE_SEP.join(split_archetypes(text, known)))
+
+
+def synthetic_lineups(n_lineups, n_players=600, group_quantity=5, seed=0):
+    """Random LeagueDashLineups-style GROUP_IDs (distinct players per lineup)."""
+    rng = np.random.default_rng(seed)
+    players = np.arange(1_600_000, 1_600_000 + n_players)
+    ids = np.sort(np.argsort(rng.random((n_lineups, n_players)), axis=1)[:, :group_quantity], axis=1)
+    return ['-' + '-'.join(map(str, row)) + '-' for row in players[ids]], players
+
+
+def benchmark(seasons=10, lineups_per_size=5000):
+    """Parses and encodes 2-, 3-, 4- and 5-man lineups for `seasons` synthetic seasons."""
+    rng = np.random.default_rng(0)
+    group_ids, players = [], None
+    for size in (2, 3, 4, 5):
+        ids, players = synthetic_lineups(lineups_per_size, group_quantity=size, seed=size)
+        group_ids += ids * seasons
+    labels = pd.Series(rng.choice([f"Archetype {i}" for i in range(10)], len(players)), index=players).iloc[:-50]
+    probs = pd.DataFrame(rng.dirichlet(np.ones(10), len(players)).astype(np.float32), index=players)
+
+    start = time.perf_counter()
+    ids, sizes = parse_group_ids(group_ids)
+    parsed = time.perf_counter()
+    codes, names = encode_archetypes(ids, labels)
+    counts = composition_counts(codes, len(names))
+    expected = soft_composition(ids, probs)
+    done = time.perf_counter()
+    print(f"{len(group_ids)} lineups ({seasons} seasons of 2- to 5-man groups): "
+          f"parse {parsed - start:.2f}s, encode + counts {done - parsed:.2f}s")
+    return counts, expected
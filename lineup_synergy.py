@@ -0,0 +1,211 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+from nba_api.stats.endpoints import leaguedashlineups
+
+from data_lake import LAKE_DIR, load_dataset
+from nba_fetch import fetch_frames
+from matchup_store import season_archetypes, archetype_weights
+from lineup_encoding import parse_group_ids, player_lookup
+
+# --- Configuration ---
+# Archetype synergy from LeagueDashLineups: for every pair (and triple) of archetypes, the
+# lineup minutes they shared on the floor and the minutes-weighted net rating of those
+# lineups (centred on the season's average). Sums are persisted per side; ratings are
+# derived on load with shrinkage towards zero, so small samples count for little.
+# Player memberships come from master_archetypes (soft P_* columns when present), and the
+# tensors are keyed on archetype names either way (see matchup_store.archetype_weights).
+SYNERGY_DIR = os.path.join(LAKE_DIR, 'synergy')
+GROUP_QUANTITY = 5
+MIN_LINEUP_MINUTES = 10
+# Prior weight (lineup minutes at net 0): a combination seen for this long is pulled halfway to 0
+SHRINK_MINUTES = 250.0
+INCLUDE_TRIPLES = True
+
+_cache = {}
+
+
+def _synergy_path(side, group_quantity):
+    return os.path.join(SYNERGY_DIR, f"{side}_{group_quantity}man.npz")
+
+
+def fetch_lineups(season, group_quantity=GROUP_QUANTITY):
+    """Advanced LeagueDashLineups rows for one season (cached by nba_fetch)."""
+    return fetch_frames(
+        leaguedashlineups.LeagueDashLineups,
+        season=season,
+        group_quantity=group_quantity,
+        measure_type_detailed_defense='Advanced',
+        timeout=100
+    )[0]
+
+
+def lineup_net(lineups):
+    """Per-lineup net rating: NET_RATING when present, else PLUS_MINUS per 48 minutes."""
+    minutes = lineups['MIN'].to_numpy(dtype=np.float64)
+    if 'NET_RATING' in lineups.columns:
+        return lineups['NET_RATING'].to_numpy(dtype=np.float64)
+    return lineups['PLUS_MINUS'].to_numpy(dtype=np.float64) / np.maximum(minutes, 1e-9) * 48
+
+
+def combination_sums(P, weight, triples=INCLUDE_TRIPLES):
+    """
+    Weighted sums over each lineup's distinct players for membership array P (lineups x
+    slots x K): singles (K), unordered pairs (K x K) and triples (K x K x K), all symmetric.
+    With one-hot memberships, pair[a, b] is weight x the number of (a, b) player pairs.
+    Distinct-player sums come from inclusion-exclusion on the per-lineup totals S.
+    """
+    S = P.sum(axis=1)
+    singles = weight @ S
+    pairs = np.einsum('n,na,nb->ab', weight, S, S) - np.einsum('n,nia,nib->ab', weight, P, P)
+    pairs[np.diag_indices_from(pairs)] /= 2
+    if not triples:
+        return singles, pairs, None
+
+    opt = {'optimize': True}
+    all_triples = np.einsum('n,na,nb,nc->abc', weight, S, S, S, **opt)
+    same_ij = np.einsum('n,nia,nib,nc->abc', weight, P, P, S, **opt)
+    same_ik = np.einsum('n,nia,nb,nic->abc', weight, P, S, P, **opt)
+    same_jk = np.einsum('n,na,nib,nic->abc', weight, S, P, P, **opt)
+    same_all = np.einsum('n,nia,nib,nic->abc', weight, P, P, P, **opt)
+    ordered = all_triples - same_ij - same_ik - same_jk + 2 * same_all
+    # Unordered: divide by the permutations of repeated archetypes (2 for a,a,b; 6 for a,a,a)
+    a, b, c = np.indices(ordered.shape)
+    repeats = np.where((a == b) & (b == c), 6, np.where((a == b) | (b == c) | (a == c), 2, 1))
+    return singles, pairs, ordered / repeats
+
+
+def season_sums(lineups, archetypes, triples=INCLUDE_TRIPLES, **weight_kwargs):
+    """
+    Minutes and minutes x net sums for one season's lineups. archetypes / weight_kwargs are
+    what archetype_weights takes (PLAYER_ID plus label and optional P_* membership columns).
+    Returns (names, {'minutes': (singles, pairs, triples), 'net': (...)}).
+    """
+    lineups = lineups[lineups['MIN'] >= MIN_LINEUP_MINUTES]
+    ids, _ = parse_group_ids(lineups['GROUP_ID'])
+    minutes = lineups['MIN'].to_numpy(dtype=np.float64)
+    net = lineup_net(lineups)
+    # Centre on the season's minutes-weighted average lineup
+    net = net - (minutes @ net) / max(minutes.sum(), 1e-9)
+
+    players = np.unique(ids[ids >= 0])
+    W, names = archetype_weights(archetypes, players, **weight_kwargs)
+    W = np.vstack([W.toarray(), np.zeros((1, len(names)))])
+    P = W[player_lookup(ids, players)]
+    return names, {
+        'minutes': combination_sums(P, minutes, triples),
+        'net': combination_sums(P, minutes * net, triples),
+    }
+
+
+def _scatter(total, part, idx):
+    """Adds a season's tensor (its own archetype order) into the all-seasons tensor."""
+    if part is not None:
+        np.add.at(total, np.ix_(*([idx] * part.ndim)), part)
+
+
+def build_synergy(seasons=None, side='offense', group_quantity=GROUP_QUANTITY, triples=INCLUDE_TRIPLES):
+    """
+    Sums every season's lineups into archetype x archetype (x archetype) tensors and saves
+    them to SYNERGY_DIR. Seasons default to those in master_archetypes.
+    """
+    if seasons is None:
+        seasons = sorted(load_dataset('master_archetypes', columns=['SEASON'])['SEASON'].unique())
+    per_season = []
+    for season in seasons:
+        lineups = fetch_lineups(season, group_quantity)
+        if lineups.empty:
+            print(f"[{season}] No lineups, skipped.")
+            continue
+        archetypes, kwargs = season_archetypes(season, side)
+        names, sums = season_sums(lineups, archetypes, triples, **kwargs)
+        per_season.append((season, names, sums))
+        print(f"[{season}] {len(lineups)} lineups, {len(names)} {side} archetypes.")
+    if not per_season:
+        print("No lineup data, nothing saved.")
+        return None
+
+    names = sorted(set(n for _, season_names, _ in per_season for n in season_names))
+    K = len(names)
+    arrays = {'names': np.array(names), 'seasons': np.array([s for s, _, _ in per_season])}
+    for kind in ['minutes', 'net']:
+        totals = [np.zeros(K), np.zeros((K, K)), np.zeros((K, K, K)) if triples else None]
+        for _, season_names, sums in per_season:
+            idx = pd.Index(names).get_indexer(season_names)
+            for total, part in zip(totals, sums[kind]):
+                if total is not None:
+                    _scatter(total, part, idx)
+        for level, total in zip(['singles', 'pairs', 'triples'], totals):
+            if total is not None:
+                arrays[f"{level}_{kind}"] = total
+
+    os.makedirs(SYNERGY_DIR, exist_ok=True)
+    path = _synergy_path(side, group_quantity)
+    tmp_path = f"{path}.tmp.npz"
+    np.savez_compressed(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+    _cache.pop((side, group_quantity), None)
+    print(f"Saved {side} synergy ({K} archetypes, {len(per_season)} seasons) to {path}")
+    return load_synergy(side, group_quantity)
+
+
+def shrunk(net_sum, minutes, shrink=SHRINK_MINUTES):
+    return net_sum / (minutes + shrink)
+
+
+def load_synergy(side='offense', group_quantity=GROUP_QUANTITY, reload=False):
+    """
+    {'names', 'index' (name -> code), 'seasons', and per level ('singles', 'pairs',
+    'triples') the summed minutes, net sums and the shrunk net rating}. Cached.
+    """
+    key = (side, group_quantity)
+    if reload or key not in _cache:
+        with np.load(_synergy_path(side, group_quantity)) as f:
+            syn = {k: f[k] for k in f.files}
+        syn['names'] = [str(n) for n in syn['names']]
+        syn['index'] = {n: i for i, n in enumerate(syn['names'])}
+        for level in ['singles', 'pairs', 'triples']:
+            if f"{level}_minutes" in syn:
+                syn[level] = shrunk(syn[f"{level}_net"], syn[f"{level}_minutes"])
+        _cache[key] = syn
+    return _cache[key]
+
+
+def pair_synergy(a, b, synergy=None):
+    """Shrunk net rating of lineups with an `a` and a `b` player together."""
+    syn = synergy or load_synergy()
+    return float(syn['pairs'][syn['index'][a], syn['index'][b]])
+
+
+def addition_ratings(unit, synergy=None, use_triples=True):
+    """
+    Net rating of adding each archetype to a unit (list of member archetype names, e.g. a
+    4-man lineup): the candidate's pair (or triple) sums with the unit members pooled, then
+    shrunk. Only len(unit) pair / C(len(unit), 2) triple lookups per candidate, so ranking
+    every archetype never touches lineup rows. Returns a Series over archetypes, best first.
+    """
+    syn = synergy or load_synergy()
+    members = np.array([syn['index'][m] for m in unit if m in syn['index']], dtype=np.int64)
+    if use_triples and 'triples' in syn and len(members) >= 2:
+        i, j = np.triu_indices(len(members), k=1)
+        net = syn['triples_net'][:, members[i], members[j]].sum(axis=1)
+        minutes = syn['triples_minutes'][:, members[i], members[j]].sum(axis=1)
+    else:
+        net = syn['pairs_net'][:, members].sum(axis=1)
+        minutes = syn['pairs_minutes'][:, members].sum(axis=1)
+    return pd.Series(shrunk(net, minutes), index=syn['names']).sort_values(ascending=False)
+
+
+def add_archetype_net(unit, candidate, synergy=None, use_triples=True):
+    """Net rating of adding one archetype to the unit (see addition_ratings)."""
+    return float(addition_ratings(unit, synergy, use_triples)[candidate])
+
+
+if __name__ == "__main__":
+    # python lineup_synergy.py [offense|defense] [SEASON ...]
+    side = sys.argv[1] if len(sys.argv) > 1 else 'offense'
+    syn = build_synergy(sys.argv[2:] or None, side)
+    if syn is not None:
+        pairs = pd.DataFrame(syn['pairs'], index=syn['names'], columns=syn['names'])
+        print(pairs.round(2).to_string())
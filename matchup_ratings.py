@@ -0,0 +1,94 @@
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse.linalg import lsqr
+from concurrent.futures import ProcessPoolExecutor
+
+from matchup_store import load_season, stored_seasons
+
+# --- Configuration ---
+# Opponent-adjusted matchup ratings, solved jointly over a season's matchup graph:
+#   points per possession of (offense o vs defense d) ~ league PPP + OFF_o - DEF_d
+# weighted by the pair's possessions, with a ridge prior pulling low-volume players to 0.
+# A higher DEF rating means fewer points allowed than the opponents faced would predict.
+RATING_PRIOR_POSS = 50.0
+SOLVER_TOL = 1e-8
+SOLVER_MAX_ITER = 2000
+
+
+def _design(data):
+    """Weighted sparse design matrix (pairs x [offense, defense]) and target for one season."""
+    poss = data['POSS'].tocoo()
+    pts = data['PTS'].tocsr()[poss.row, poss.col]
+    keep = poss.data > 0
+    rows, cols, p = poss.row[keep], poss.col[keep], poss.data[keep]
+    ppp = np.asarray(pts).ravel()[keep] / p
+    league_ppp = float(np.asarray(pts).ravel()[keep].sum() / p.sum())
+
+    n_pairs, n_off = len(p), len(data['off_ids'])
+    w = np.sqrt(p)
+    pair = np.arange(n_pairs)
+    A = sparse.csr_matrix(
+        (np.concatenate([w, -w]), (np.concatenate([pair, pair]), np.concatenate([rows, n_off + cols]))),
+        shape=(n_pairs, n_off + len(data['def_ids'])),
+    )
+    return A, w * (ppp - league_ppp), league_ppp
+
+
+def solve_ratings(data):
+    """
+    Offensive and defensive ratings for one season's matchup matrices (see matchup_store).
+    Returns (offense frame, defense frame, league PPP, solver iterations).
+    """
+    A, b, league_ppp = _design(data)
+    x, _, iterations = lsqr(A, b, damp=np.sqrt(RATING_PRIOR_POSS), atol=SOLVER_TOL, btol=SOLVER_TOL,
+                            iter_lim=SOLVER_MAX_ITER)[:3]
+    n_off = len(data['off_ids'])
+    off_rating, def_rating = x[:n_off], x[n_off:]
+
+    # Difficulty: time-weighted opponent rating, i.e. how good the players a defender guarded were
+    secs = data['SECONDS'].tocsr()
+    time_def = np.asarray(secs.sum(axis=0)).ravel()
+    time_off = np.asarray(secs.sum(axis=1)).ravel()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        adj_difficulty = (secs.T @ off_rating) / time_def
+        adj_opp_defense = (secs @ def_rating) / time_off
+
+    defense = pd.DataFrame({'PLAYER_ID': data['def_ids'], 'DEF_MATCHUP_RATING': def_rating,
+                            'ADJ_MATCHUP_DIFFICULTY': adj_difficulty})
+    offense = pd.DataFrame({'PLAYER_ID': data['off_ids'], 'OFF_MATCHUP_RATING': off_rating,
+                            'ADJ_OPP_DEFENSE': adj_opp_defense})
+    return offense, defense, league_ppp, int(iterations)
+
+
+def season_ratings(season):
+    """Solves one stored season. Returns one frame per player (offense and defense ratings joined)."""
+    start = time.perf_counter()
+    offense, defense, league_ppp, iterations = solve_ratings(load_season(season))
+    ratings = pd.merge(defense, offense, on='PLAYER_ID', how='outer')
+    ratings.insert(0, 'SEASON', season)
+    print(f"[{season}] Matchup ratings for {len(ratings)} players: league {league_ppp:.3f} PPP, "
+          f"{iterations} iterations, {time.perf_counter() - start:.2f}s.")
+    return ratings
+
+
+def multi_season_ratings(seasons=None, max_workers=None):
+    """Solves every (or the listed) stored season in a process pool; one row per player-season."""
+    seasons = seasons or stored_seasons()
+    if not seasons:
+        print("No stored matchup seasons; run fetch_defensive_data.py first.")
+        return pd.DataFrame(columns=['SEASON', 'PLAYER_ID', 'DEF_MATCHUP_RATING', 'ADJ_MATCHUP_DIFFICULTY',
+                                     'OFF_MATCHUP_RATING', 'ADJ_OPP_DEFENSE'])
+    if len(seasons) == 1:
+        return season_ratings(seasons[0])
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as pool:
+        frames = list(pool.map(season_ratings, seasons))
+    return pd.concat(frames, ignore_index=True)
+
+
+if __name__ == "__main__":
+    # python matchup_ratings.py [SEASON ...]
+    print(multi_season_ratings(sys.argv[1:] or None).describe().round(3).to_string())
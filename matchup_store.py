@@ -0,0 +1,205 @@
+import os
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from data_lake import LAKE_DIR, load_dataset
+from archetype_models import archetype_memberships
+
+# --- Configuration ---
+# Raw LeagueSeasonMatchups rows kept as one sparse offense x defense matrix per season,
+# with a channel per stat. Archetype questions are sparse products with a player x
+# archetype weight matrix, so nothing is ever densified to players x players.
+MATCHUP_DIR = os.path.join(LAKE_DIR, 'matchups')
+
+# Channel -> source column of the matchup rows
+CHANNELS = {
+    'SECONDS': 'MATCHUP_TIME_SEC',
+    'POSS': 'PARTIAL_POSS',
+    'PTS': 'PLAYER_PTS',
+}
+
+
+def _season_path(season):
+    return os.path.join(MATCHUP_DIR, f"{season}.npz")
+
+
+def stored_seasons():
+    if not os.path.isdir(MATCHUP_DIR):
+        return []
+    return sorted(f[:-4] for f in os.listdir(MATCHUP_DIR) if f.endswith('.npz'))
+
+
+def save_matchups(matchups, season):
+    """
+    Stores one season of matchup rows (OFF_PLAYER_ID, DEF_PLAYER_ID + CHANNELS columns).
+    Repeated pairs (e.g. the per-team pulls overlapping) are summed. Replaces the season.
+    """
+    off_codes, off_ids = pd.factorize(matchups['OFF_PLAYER_ID'], sort=True)
+    def_codes, def_ids = pd.factorize(matchups['DEF_PLAYER_ID'], sort=True)
+    shape = (len(off_ids), len(def_ids))
+    arrays = {'off_ids': np.asarray(off_ids, dtype=np.int64), 'def_ids': np.asarray(def_ids, dtype=np.int64)}
+    for channel, col in CHANNELS.items():
+        values = pd.to_numeric(matchups[col], errors='coerce').fillna(0).to_numpy(dtype=np.float64)
+        m = sparse.coo_matrix((values, (off_codes, def_codes)), shape=shape).tocsr()
+        m.sum_duplicates()
+        arrays[f"{channel}_data"], arrays[f"{channel}_indices"], arrays[f"{channel}_indptr"] = m.data, m.indices, m.indptr
+
+    os.makedirs(MATCHUP_DIR, exist_ok=True)
+    tmp_path = f"{_season_path(season)}.tmp.npz"
+    np.savez_compressed(tmp_path, **arrays)
+    os.replace(tmp_path, _season_path(season))
+    print(f"Stored {season} matchups: {shape[0]} offensive x {shape[1]} defensive players, "
+          f"{len(arrays['SECONDS_data'])} pairs.")
+
+
+def load_season(season):
+    """{'off_ids', 'def_ids', 'SECONDS', 'POSS', 'PTS'} with one CSR matrix (offense x defense) per channel."""
+    with np.load(_season_path(season)) as f:
+        off_ids, def_ids = f['off_ids'], f['def_ids']
+        shape = (len(off_ids), len(def_ids))
+        season_data = {'off_ids': off_ids, 'def_ids': def_ids}
+        for channel in CHANNELS:
+            season_data[channel] = sparse.csr_matrix(
+                (f[f"{channel}_data"], f[f"{channel}_indices"], f[f"{channel}_indptr"]), shape=shape)
+    return season_data
+
+
+def _seasons(seasons):
+    if seasons is None:
+        return stored_seasons()
+    return [seasons] if isinstance(seasons, str) else list(seasons)
+
+
+def _long_frame(matrices, row_ids, col_ids, row_col, col_col):
+    """Nonzero cells of same-shaped sparse matrices (one per channel) as a long frame."""
+    mats = list(matrices.values())
+    pattern = abs(mats[0])
+    for m in mats[1:]:
+        pattern = pattern + abs(m)
+    pattern = pattern.tocoo()
+    df = pd.DataFrame({row_col: row_ids[pattern.row], col_col: col_ids[pattern.col]})
+    for channel, m in matrices.items():
+        df[channel] = np.asarray(m.tocsr()[pattern.row, pattern.col]).ravel()
+    return df
+
+
+def _add_rates(df):
+    poss = df['POSS'].where(df['POSS'] > 0)
+    df['PTS_PER_POSS'] = df['PTS'] / poss
+    return df
+
+
+def who_guards(off_player_id, seasons=None, n=5):
+    """Defenders who spent the most matchup time on one offensive player (summed over seasons)."""
+    frames = []
+    for season in _seasons(seasons):
+        data = load_season(season)
+        row = np.searchsorted(data['off_ids'], off_player_id)
+        if row >= len(data['off_ids']) or data['off_ids'][row] != off_player_id:
+            continue
+        matrices = {channel: data[channel][row] for channel in CHANNELS}
+        frames.append(_long_frame(matrices, np.array([off_player_id]), data['def_ids'], 'OFF_PLAYER_ID', 'DEF_PLAYER_ID'))
+    if not frames:
+        return pd.DataFrame(columns=['DEF_PLAYER_ID'] + list(CHANNELS) + ['TIME_SHARE', 'PTS_PER_POSS'])
+    df = pd.concat(frames).groupby('DEF_PLAYER_ID', as_index=False)[list(CHANNELS)].sum()
+    df['TIME_SHARE'] = df['SECONDS'] / df['SECONDS'].sum()
+    return _add_rates(df).nlargest(n, 'SECONDS').reset_index(drop=True)
+
+
+# Per side: master_archetypes label column, cluster id column and membership column prefix
+ARCHETYPE_COLUMNS = {
+    'offense': ('Offensive Archetype', 'Off_Cluster', 'P_Off_Cluster_'),
+    'defense': ('Defensive Archetype', 'Def_Cluster', 'P_Def_Cluster_'),
+}
+
+
+def archetype_weights(archetypes, player_ids, id_col='PLAYER_ID', label_col=None, prob_prefix=None, cluster_col=None):
+    """
+    Sparse player x archetype weight matrix for player_ids (rows in that order) and the
+    archetype names (columns). Uses membership columns starting with prob_prefix (soft
+    weights) when given, otherwise one-hot rows from label_col. Either way the columns are
+    archetype names: memberships are named through cluster_col -> label_col (clusters that
+    share a name are summed), so queries use one namespace whichever source is present.
+    Unknown players get a zero row.
+    """
+    archetypes = archetypes.drop_duplicates(id_col, keep='last')
+    if prob_prefix:
+        if label_col in archetypes.columns and cluster_col in archetypes.columns:
+            table = archetype_memberships(archetypes.rename(columns={id_col: 'PLAYER_ID'}), name_col=label_col,
+                                          cluster_col=cluster_col, prefix=prob_prefix)
+        else:
+            # No labels to name them by: keep the cluster ids ('Off_Cluster_3')
+            cols = [c for c in archetypes.columns if c.startswith(prob_prefix)]
+            table = archetypes.set_index(id_col)[cols].rename(columns=lambda c: c[len('P_'):])
+        W = table.reindex(player_ids).fillna(0).to_numpy(dtype=np.float64)
+        return sparse.csr_matrix(W), list(table.columns)
+    labels = archetypes.set_index(id_col)[label_col].reindex(player_ids)
+    codes, names = pd.factorize(labels, sort=True)
+    rows = np.flatnonzero(codes >= 0)
+    W = sparse.csr_matrix((np.ones(len(rows)), (rows, codes[rows])), shape=(len(player_ids), len(names)))
+    return W, list(names)
+
+
+def weight_kwargs(archetypes, side='offense'):
+    """archetype_weights arguments for a master_archetypes-style frame: memberships when it has them, else labels."""
+    label_col, cluster_col, prefix = ARCHETYPE_COLUMNS[side]
+    if any(c.startswith(prefix) for c in archetypes.columns):
+        return {'label_col': label_col, 'prob_prefix': prefix, 'cluster_col': cluster_col}
+    return {'label_col': label_col}
+
+
+def season_archetypes(season, side='offense'):
+    """
+    Weights source for one season from master_archetypes: the float32 memberships when the
+    lake has them, else the hard labels. Returns (frame, kwargs for archetype_weights).
+    """
+    df = load_dataset('master_archetypes', filters=[('SEASON', '==', season)])
+    return df, weight_kwargs(df, side)
+
+
+def defender_vs_archetype(seasons=None, archetypes=None):
+    """
+    Per defender and offensive archetype: SECONDS, POSS, PTS and PTS_PER_POSS allowed.
+    Each channel is one sparse product (defense x offense) @ (offense x archetype) per season;
+    seasons are then summed. archetypes overrides the per-season master_archetypes lookup
+    (a frame with PLAYER_ID plus 'Offensive Archetype' and optionally Off_Cluster + P_Off_Cluster_* columns).
+    """
+    frames = []
+    for season in _seasons(seasons):
+        data = load_season(season)
+        if archetypes is None:
+            arch, kwargs = season_archetypes(season, 'offense')
+        else:
+            arch, kwargs = archetypes, weight_kwargs(archetypes, 'offense')
+        W, names = archetype_weights(arch, data['off_ids'], **kwargs)
+        matrices = {channel: data[channel].T.tocsr() @ W for channel in CHANNELS}
+        frames.append(_long_frame(matrices, data['def_ids'], np.array(names, dtype=object), 'DEF_PLAYER_ID', 'OFF_ARCHETYPE'))
+    df = pd.concat(frames).groupby(['DEF_PLAYER_ID', 'OFF_ARCHETYPE'], as_index=False)[list(CHANNELS)].sum()
+    return _add_rates(df)
+
+
+def points_per_possession_vs_archetype(archetype, seasons=None, min_poss=0, archetypes=None):
+    """Defenders ranked by points allowed per possession against one offensive archetype (best first)."""
+    df = defender_vs_archetype(seasons, archetypes)
+    df = df[(df['OFF_ARCHETYPE'] == archetype) & (df['POSS'] >= max(min_poss, 1e-9))]
+    return df.sort_values('PTS_PER_POSS').reset_index(drop=True)
+
+
+def archetype_vs_archetype(seasons=None):
+    """
+    League-wide defensive archetype x offensive archetype table (SECONDS, POSS, PTS,
+    PTS_PER_POSS): W_def.T @ M.T @ W_off per channel and season, all sparse.
+    """
+    frames = []
+    for season in _seasons(seasons):
+        data = load_season(season)
+        off_arch, off_kwargs = season_archetypes(season, 'offense')
+        def_arch, def_kwargs = season_archetypes(season, 'defense')
+        W_off, off_names = archetype_weights(off_arch, data['off_ids'], **off_kwargs)
+        W_def, def_names = archetype_weights(def_arch, data['def_ids'], **def_kwargs)
+        matrices = {channel: (W_def.T @ (data[channel].T.tocsr() @ W_off)).tocsr() for channel in CHANNELS}
+        frames.append(_long_frame(matrices, np.array(def_names, dtype=object), np.array(off_names, dtype=object),
+                                  'DEF_ARCHETYPE', 'OFF_ARCHETYPE'))
+    df = pd.concat(frames).groupby(['DEF_ARCHETYPE', 'OFF_ARCHETYPE'], as_index=False)[list(CHANNELS)].sum()
+    return _add_rates(df)
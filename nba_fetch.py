@@ -0,0 +1,251 @@
+import os
+import json
+import gzip
+import time
+import random
+import atexit
+import hashlib
+import threading
+
+import pandas as pd
+from nba_api.stats.library.http import NBAStatsResponse
+
+# --- Configuration ---
+# Every nba_api call in the pipeline goes through fetch_frames() so identical
+# requests (same endpoint + same parameters) are only downloaded once.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.environ.get('NBA_CACHE_DIR', os.path.join(BASE_DIR, '.nba_cache'))
+OBJECTS_DIR = os.path.join(CACHE_DIR, 'objects')  # Content-addressed response bodies
+KEYS_DIR = os.path.join(CACHE_DIR, 'keys')        # Request key -> object hash + fetch time
+
+LIVE_SEASON = '2025-26'
+
+# TTL (hours) for the live season, per endpoint. Closed seasons never expire.
+DEFAULT_LIVE_TTL_HOURS = 6
+ENDPOINT_TTL_HOURS = {
+    'leaguedashplayerstats': 6,
+    'leaguehustlestatsplayer': 6,
+    'leaguedashteamstats': 6,
+    'synergyplaytypes': 12,
+    'leaguedashlineups': 12,
+    'leagueseasonmatchups': 24,
+    'leaguedashptdefend': 12,
+    'leaguedashplayerbiostats': 24,
+}
+
+# Global rate limit shared by every thread (cache hits never consume a token)
+REQUESTS_PER_SECOND = 1.5
+BURST = 3
+
+# Retry policy for transient API failures (timeouts, 429/5xx)
+MAX_RETRIES = 3
+BACKOFF_BASE = 2.0
+
+CACHE_STATS = {'hits': 0, 'misses': 0, 'retries': 0, 'network_seconds': 0.0}
+_stats_lock = threading.Lock()
+
+
+class TokenBucket:
+    """Thread-safe token bucket: callers block until a request token is available."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+RATE_LIMITER = TokenBucket(REQUESTS_PER_SECOND, BURST)
+
+
+def normalize_params(endpoint):
+    """
+    Keys on the query the endpoint would actually send (defaults filled in), so
+    season= vs season_nullable= or an explicit default value share one cache entry.
+    """
+    return {key: str(val) for key, val in sorted(endpoint.parameters.items())}
+
+
+def request_key(endpoint_name, params):
+    payload = json.dumps({'endpoint': endpoint_name, 'params': params}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def get_ttl_hours(endpoint_name, params):
+    """None means the response never expires (closed season)."""
+    season = params.get('Season') or params.get('SeasonYear')
+    if season and season < LIVE_SEASON:
+        return None
+    return ENDPOINT_TTL_HOURS.get(endpoint_name, DEFAULT_LIVE_TTL_HOURS)
+
+
+def _atomic_write(path, data):
+    tmp_path = f"{path}.tmp.{os.getpid()}.{threading.get_ident()}"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _read_entry(key):
+    path = os.path.join(KEYS_DIR, f"{key}.json")
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _load_object(obj_hash):
+    path = os.path.join(OBJECTS_DIR, obj_hash[:2], f"{obj_hash}.json.gz")
+    if not os.path.exists(path):
+        return None
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return f.read()
+
+
+def _store_response(key, endpoint_name, params, text):
+    obj_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    obj_dir = os.path.join(OBJECTS_DIR, obj_hash[:2])
+    os.makedirs(obj_dir, exist_ok=True)
+    os.makedirs(KEYS_DIR, exist_ok=True)
+
+    obj_path = os.path.join(obj_dir, f"{obj_hash}.json.gz")
+    if not os.path.exists(obj_path):
+        _atomic_write(obj_path, gzip.compress(text.encode('utf-8')))
+
+    entry = {
+        'endpoint': endpoint_name,
+        'params': params,
+        'object': obj_hash,
+        'fetched_at': time.time(),
+    }
+    _atomic_write(os.path.join(KEYS_DIR, f"{key}.json"), json.dumps(entry).encode('utf-8'))
+
+
+def frames_from_text(text):
+    """Rebuilds get_data_frames() output from a raw stats.nba.com response body."""
+    response = NBAStatsResponse(response=text, status_code=200, url=None)
+    data_sets = response.get_data_sets()
+    return [pd.DataFrame(ds['data'], columns=ds['headers']) for ds in data_sets.values()]
+
+
+def _record(stat, amount=1):
+    with _stats_lock:
+        CACHE_STATS[stat] += amount
+
+
+def _request_with_retry(endpoint):
+    """Sends the request under the global rate limit, retrying with jittered exponential backoff."""
+    for attempt in range(MAX_RETRIES + 1):
+        RATE_LIMITER.acquire()
+        start = time.time()
+        try:
+            endpoint.get_request()
+            return
+        except Exception:
+            if attempt == MAX_RETRIES:
+                raise
+            _record('retries')
+            time.sleep(random.uniform(0, BACKOFF_BASE * 2 ** attempt))
+        finally:
+            _record('network_seconds', time.time() - start)
+
+
+def _fresh_entry(key, endpoint_name, params):
+    """Cache entry for key if it is within its TTL, else None."""
+    entry = _read_entry(key)
+    if not entry:
+        return None
+    ttl = get_ttl_hours(endpoint_name, params)
+    age_hours = (time.time() - entry['fetched_at']) / 3600
+    return entry if ttl is None or age_hours < ttl else None
+
+
+def fetch_frames(endpoint_cls, refresh=False, **params):
+    """
+    Cached drop-in for endpoint_cls(**params).get_data_frames().
+    Closed seasons are served from disk forever; the live season honours ENDPOINT_TTL_HOURS.
+    """
+    endpoint = endpoint_cls(get_request=False, **params)
+    endpoint_name = endpoint.endpoint
+    norm = normalize_params(endpoint)
+    key = request_key(endpoint_name, norm)
+
+    if not refresh:
+        entry = _fresh_entry(key, endpoint_name, norm)
+        text = _load_object(entry['object']) if entry else None
+        if text is not None:
+            _record('hits')
+            return frames_from_text(text)
+
+    _request_with_retry(endpoint)
+    _record('misses')
+
+    _store_response(key, endpoint_name, norm, endpoint.nba_response.get_json())
+    return endpoint.get_data_frames()
+
+
+def response_hash(endpoint_cls, fetch=True, **params):
+    """
+    Content hash of the cached response for this request (fetched first if needed, or
+    None when it isn't cached and fetch=False).
+    Lets callers fingerprint API inputs without parsing them.
+    """
+    endpoint = endpoint_cls(get_request=False, **params)
+    norm = normalize_params(endpoint)
+    key = request_key(endpoint.endpoint, norm)
+    entry = _fresh_entry(key, endpoint.endpoint, norm)
+    if not entry or _load_object(entry['object']) is None:
+        if not fetch:
+            return None
+        fetch_frames(endpoint_cls, **params)
+        entry = _read_entry(key)
+    return entry['object']
+
+
+def cache_report():
+    total = CACHE_STATS['hits'] + CACHE_STATS['misses']
+    if total == 0:
+        return "nba_fetch: no requests"
+    return (f"nba_fetch: {total} requests | {CACHE_STATS['hits']} cache hits | "
+            f"{CACHE_STATS['misses']} network calls ({CACHE_STATS['network_seconds']:.1f}s, "
+            f"{CACHE_STATS['retries']} retries)")
+
+
+def clear_expired():
+    """Removes live-season keys whose TTL has passed (objects are left for dedupe)."""
+    if not os.path.exists(KEYS_DIR):
+        return 0
+    removed = 0
+    now = time.time()
+    for fname in os.listdir(KEYS_DIR):
+        entry = _read_entry(fname[:-len('.json')])
+        if not entry:
+            continue
+        ttl = get_ttl_hours(entry['endpoint'], entry['params'])
+        if ttl is not None and (now - entry['fetched_at']) / 3600 >= ttl:
+            os.remove(os.path.join(KEYS_DIR, fname))
+            removed += 1
+    print(f"Removed {removed} expired cache keys.")
+    return removed
+
+
+@atexit.register
+def _print_report():
+    if CACHE_STATS['hits'] or CACHE_STATS['misses']:
+        print(cache_report())
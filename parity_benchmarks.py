@@ -0,0 +1,558 @@
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+from collections import Counter
+
+from lineup_encoding import ARCHETYPE_SEP, split_archetypes
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+for folder in ['Archetype and Cluster Analysis', 'Ideal Destination', 'Ideal Lineup']:
+    sys.path.append(os.path.join(BASE_DIR, folder))
+
+# --- Configuration ---
+# Parity benchmarks for the vectorized rewrites of the pipeline scripts. The per-row
+# implementations they replaced live here (and only here): each benchmark runs the old and
+# new code on synthetic inputs, asserts the outputs match and prints the timings.
+#   python parity_benchmarks.py [NAME ...]     (default: all of BENCHMARKS)
+
+
+# --- Defensive matchups (fetch_defensive_data.aggregate_matchups) ---
+
+def _legacy_aggregate(matchups, usg_map, pos_map):
+    """The previous pivot_table + apply implementation."""
+    from fetch_defensive_data import POSITIONS, PCT_COLS
+    keys = [c for c in ['SEASON', 'DEF_PLAYER_ID'] if c in matchups.columns]
+    df = matchups.copy()
+    df['OPP_USG'] = df['OFF_PLAYER_ID'].map(usg_map)
+    df['USG_TIME'] = df['OPP_USG'] * df['MATCHUP_TIME_SEC']
+    grouped = df.groupby(keys).agg({'MATCHUP_TIME_SEC': 'sum', 'USG_TIME': 'sum'})
+    grouped['MATCHUP_DIFFICULTY'] = grouped['USG_TIME'] / grouped['MATCHUP_TIME_SEC']
+
+    df['OPP_POS'] = df['OFF_PLAYER_ID'].map(pos_map).fillna('Unknown')
+    pos_dist = df.pivot_table(index=keys, columns='OPP_POS', values='MATCHUP_TIME_SEC', aggfunc='sum', fill_value=0)
+    total_time = pos_dist.sum(axis=1)
+    for pos, col_name in zip(POSITIONS, PCT_COLS):
+        pos_dist[col_name] = pos_dist[pos] / total_time if pos in pos_dist.columns else 0.0
+
+    def calc_entropy(row):
+        vals = row[PCT_COLS].values
+        vals = vals[vals > 0]
+        if len(vals) == 0: return 0
+        return -np.sum(vals * np.log(vals))
+
+    pos_dist['VERSATILITY_RATING'] = pos_dist.apply(calc_entropy, axis=1)
+    return grouped[['MATCHUP_DIFFICULTY']].join(pos_dist[PCT_COLS + ['VERSATILITY_RATING']]).reset_index()
+
+
+def benchmark_defensive_matchups(seasons=10, rows_per_season=300_000, n_players=550, seed=0):
+    """Legacy vs vectorized aggregation on a synthetic multi-season leagueseasonmatchups pull."""
+    from fetch_defensive_data import POSITIONS, PCT_COLS, aggregate_matchups, estimate_positions, parse_heights
+    rng = np.random.default_rng(seed)
+    n = seasons * rows_per_season
+    matchups = pd.DataFrame({
+        'SEASON': np.repeat([f"{2015 + i}-{str(16 + i)[-2:]}" for i in range(seasons)], rows_per_season),
+        'OFF_PLAYER_ID': rng.integers(0, n_players, n),
+        'DEF_PLAYER_ID': rng.integers(0, n_players, n),
+        'MATCHUP_TIME_SEC': rng.gamma(2.0, 30.0, n),
+    })
+    players = np.arange(n_players)
+    usg_map = pd.Series(rng.uniform(0.1, 0.35, n_players), index=players).iloc[:-20].to_dict()  # a few unknowns
+    heights = pd.Series([f"{ft}-{inch}" for ft, inch in zip(rng.integers(6, 8, n_players), rng.integers(0, 12, n_players))])
+    heights.iloc[:10] = None
+    print(f"Defensive matchups: {n:,} synthetic matchup rows ({seasons} seasons)")
+
+    start = time.perf_counter()
+    pos_map = pd.Series(np.array(POSITIONS + ['Unknown'])[estimate_positions(parse_heights(heights))], index=players)
+    new = aggregate_matchups(matchups, usg_map, pos_map)
+    new_secs = time.perf_counter() - start
+
+    start = time.perf_counter()
+    legacy = _legacy_aggregate(matchups, usg_map, pos_map.to_dict())
+    old_secs = time.perf_counter() - start
+
+    merged = legacy.merge(new, on=['SEASON', 'DEF_PLAYER_ID'], suffixes=('_old', ''))
+    assert len(merged) == len(new) == len(legacy)
+    for col in ['MATCHUP_DIFFICULTY', 'VERSATILITY_RATING'] + PCT_COLS:
+        assert np.allclose(merged[f'{col}_old'], merged[col]), col
+    print(f"  pivot_table + apply: {old_secs:.2f}s")
+    print(f"  Sparse / vectorized: {new_secs:.2f}s ({old_secs / new_secs:.0f}x faster)")
+    return old_secs, new_secs
+
+
+# --- Free-agent destinations (find_ideal_destinations.destinations_frame) ---
+
+def _legacy_score_fit(player_row, needs_df, cap_map):
+    """The previous per-team loop of find_ideal_destinations."""
+    player_o = player_row['OFF_Arch']
+    player_d = player_row['DEF_Arch']
+    player_aav = player_row['AAV_Clean']
+    current_team = player_row['From']
+    scores = []
+    for team in cap_map.keys():
+        score = 0
+        reasons = []
+        team_needs = needs_df[needs_df['Team'] == team]
+        needed_o = []
+        needed_d = []
+        for _, r in team_needs.iterrows():
+            needed_o.extend(split_archetypes(r['Rec_Add_OFF']))
+            needed_d.extend(split_archetypes(r['Rec_Add_DEF']))
+        if player_o in needed_o:
+            score += 3
+            reasons.append("Offensive Need")
+        if player_d in needed_d:
+            score += 3
+            reasons.append("Defensive Need")
+        cap_space = cap_map.get(team, 0)
+        if team == current_team:
+            score += 1
+            reasons.append("Incumbent")
+            can_afford = True
+        elif cap_space >= player_aav:
+            score += 2
+            reasons.append("Cap Space Fit")
+            can_afford = True
+        elif player_aav <= 5200000:
+            can_afford = True
+        else:
+            can_afford = False
+        if not can_afford:
+            score = -99
+            reasons = ["Cannot Afford"]
+        scores.append({'Team': team, 'Score': score, 'Reason': ", ".join(reasons)})
+    scores.sort(key=lambda x: x['Score'], reverse=True)
+    best = scores[0]
+    if best['Score'] < 0:
+        return current_team, 0, "Retention (No Market Fit)"
+    return best['Team'], best['Score'], best['Reason']
+
+
+def synthetic_destination_market(n_fas=1000, n_teams=30, n_archetypes=8, n_need_rows=150, seed=0):
+    """Random needs, cap sheet and free-agent pool shaped like the real inputs."""
+    rng = np.random.default_rng(seed)
+    teams = [f"T{i:02d}" for i in range(n_teams)]
+    # Like the real names, some contain commas ('High Steals, Versatile, Disruptor')
+    off = [f"Off {i}" if i % 2 else f"Off {i}, Spot Up, Transition" for i in range(n_archetypes)]
+    dfn = [f"Def {i}" if i % 2 else f"Def {i}, Versatile, Disruptor" for i in range(n_archetypes)]
+    pick = lambda names, size: [ARCHETYPE_SEP.join(rng.choice(names, rng.integers(1, 3), replace=False)) for _ in range(size)]
+    needs_df = pd.DataFrame({'Team': rng.choice(teams, n_need_rows),
+                             'Rec_Add_OFF': pick(off, n_need_rows), 'Rec_Add_DEF': pick(dfn, n_need_rows)})
+    cap_map = dict(zip(teams, rng.uniform(-20e6, 40e6, n_teams).round()))
+    fa_df = pd.DataFrame({
+        'Player': [f"Player {i}" for i in range(n_fas)],
+        'From': rng.choice(teams + ['FA'], n_fas),
+        'AAV_Clean': rng.choice([2e6, 5.2e6, 12e6, 25e6, 45e6], n_fas),
+        'OFF_Arch': rng.choice(off + ['Other'], n_fas),
+        'DEF_Arch': rng.choice(dfn + ['Other'], n_fas),
+    })
+    return needs_df, cap_map, fa_df
+
+
+def benchmark_destinations(n_fas=250, pool_size=5000):
+    """
+    Per-player loop vs the needs-matrix broadcast on one synthetic FA class (with a parity
+    check), then the broadcast alone on a multi-year pool of pool_size players.
+    """
+    from find_ideal_destinations import destinations_frame, fit_flags
+    needs_df, cap_map, fa_df = synthetic_destination_market(n_fas)
+    print(f"Destinations: {n_fas} free agents x {len(cap_map)} teams, {len(needs_df)} need rows")
+    start = time.perf_counter()
+    legacy = [_legacy_score_fit(fa, needs_df, cap_map) for _, fa in fa_df.iterrows()]
+    old_secs = time.perf_counter() - start
+
+    start = time.perf_counter()
+    best = destinations_frame(fa_df, needs_df, cap_map)
+    new_secs = time.perf_counter() - start
+
+    assert list(zip(best['Ideal_Destination'], best['Fit_Score'], best['Reasoning'])) == legacy
+    # A team needing exactly a player's comma-named archetypes scores both needs
+    comma_fa = fa_df[fa_df['OFF_Arch'].str.contains(',') & fa_df['DEF_Arch'].str.contains(',')].head(1)
+    one_need = pd.DataFrame({'Team': ['T00'], 'Rec_Add_OFF': comma_fa['OFF_Arch'].to_numpy(),
+                             'Rec_Add_DEF': comma_fa['DEF_Arch'].to_numpy()})
+    fit_o, fit_d, _ = fit_flags(comma_fa, one_need, list(cap_map))
+    assert fit_o[0, 0] and fit_d[0, 0]
+    print(f"  Per-player loop:  {old_secs:.3f}s")
+    print(f"  Needs matrix:     {new_secs:.3f}s ({old_secs / new_secs:.0f}x faster)")
+
+    needs_df, cap_map, pool = synthetic_destination_market(pool_size, seed=1)
+    start = time.perf_counter()
+    destinations_frame(pool, needs_df, cap_map)
+    print(f"  Needs matrix, {pool_size} player pool: {time.perf_counter() - start:.3f}s")
+    return old_secs, new_secs
+
+
+# --- Free-agent recommendations (recommend_free_agents.recommend_signings) ---
+
+def _legacy_recommend_signings(needs_df, cap_map, fa_df, fit_probs):
+    """The previous per-need / per-candidate loop of recommend_free_agents."""
+    from recommend_free_agents import MIN_FIT, determine_contract_type
+    
+    targets = []
+    
+    # Group needs by Team to avoid duplicates if multiple lineups match
+    # Or iterate uniquely?
+    # Let's iterate unique (Team, Rec_Add_OFF, Rec_Add_DEF) tuples
+    unique_needs = needs_df[['Team', 'Rec_Add_OFF', 'Rec_Add_DEF']].drop_duplicates()
+    
+    for _, row in unique_needs.iterrows():
+        team = row['Team']
+        needed_off = row['Rec_Add_OFF']
+        needed_def = row['Rec_Add_DEF']
+        
+        # Budget Check
+        space = cap_map.get(team, 0)
+        
+        # Max affordable offer
+        # If space < 0, can only offer Taxpayer MLE (~5.2M) or Min
+        if space < 0:
+            max_offer = 5200000 
+            budget_status = "Over Cap (MLE/Min only)"
+        else:
+            max_offer = space
+            budget_status = f"Cap Space (${space:,.0f})"
+            
+        # Filter FAs
+        # Logic: Must fit the OFF need OR the DEF need (OR both is bonus)
+        # Fit = the FA's summed membership in ANY of the needed archetypes, so a player on
+        # the border of a needed archetype still counts (weighted) instead of missing it.
+        
+        target_off_types = split_archetypes(needed_off)
+        target_def_types = split_archetypes(needed_def)
+        
+        off_fit = fit_probs['OFF'].reindex(columns=target_off_types, fill_value=0.0).sum(axis=1)
+        def_fit = fit_probs['DEF'].reindex(columns=target_def_types, fill_value=0.0).sum(axis=1)
+        
+        candidates = fa_df[(off_fit >= MIN_FIT) | (def_fit >= MIN_FIT)].assign(OFF_Fit=off_fit, DEF_Fit=def_fit)
+        
+        # Further Filter by Budget
+        # FA AAV must be <= max_offer (approx)
+        # Allow some wiggle room? No, let's be strict or users get confused.
+        # Exception: Re-signing own players often allows going over cap (Bird Rights).
+        
+        valid_targets = []
+        
+        for _, fa in candidates.iterrows():
+            is_resign = (fa['From'] == team)
+            
+            # Bird Rights logic: If re-signing, ignore cap space constraint
+            if is_resign:
+                allowed = True
+                action = "Re-sign (Bird Rights)"
+            elif fa['AAV_Clean'] <= max_offer:
+                allowed = True
+                action = "Sign (Cap Space/MLE)"
+            else:
+                allowed = False
+                
+            if allowed:
+                # Score/Rank?
+                # Offensive membership + Defensive membership (max 2 for a certain dual fit)
+                score = 0
+                match_desc = []
+                if fa['OFF_Fit'] >= MIN_FIT: 
+                    score += fa['OFF_Fit']
+                    match_desc.append(f"Offensive Fit ({fa['OFF_Fit']:.0%})")
+                if fa['DEF_Fit'] >= MIN_FIT: 
+                    score += fa['DEF_Fit']
+                    match_desc.append(f"Defensive Fit ({fa['DEF_Fit']:.0%})")
+                
+                # Bonus for being good (AAV proxy for quality)
+                # But irrelevant if they fit the role.
+                
+                valid_targets.append({
+                    'Team': team,
+                    'Budget_Status': budget_status,
+                    'Player': fa['Player'],
+                    'Action': action,
+                    'Contract_Value': f"${fa['AAV_Clean']:,.0f}",
+                    'Contract_Type': determine_contract_type(fa['AAV_Clean']),
+                    'Fit_Reason': ", ".join(match_desc),
+                    'Archetypes': f"{fa['OFF_Arch']} / {fa['DEF_Arch']}",
+                    'Score': round(float(score), 3)
+                })
+        
+        # Sort targets for this need
+        # Priority: Score (Dual fit) -> Re-signs -> AAV (High quality first)
+        targets_df = pd.DataFrame(valid_targets)
+        if not targets_df.empty:
+            targets_df = targets_df.sort_values(
+                by=['Score', 'Action', 'Contract_Type'], 
+                ascending=[False, True, False] # Re-sign is alphabetically 'Re' vs 'Si'.. wait. 'Re' < 'Si'. So True puts Re-sign first.
+            )
+            # Take top 3 recommendations per need to avoid spam
+            top_rec = targets_df.head(3)
+            targets.extend(top_rec.to_dict('records'))
+            
+    return pd.DataFrame(targets)
+
+
+def synthetic_fa_inputs(n_fas=248, n_need_rows=150, n_teams=30, n_archetypes=8, seed=0):
+    """Random needs, cap sheet, FA list and memberships shaped like the 2026 inputs."""
+    rng = np.random.default_rng(seed)
+    teams = [f"T{i:02d}" for i in range(n_teams)]
+    names = {side: [f"{side} {i}" for i in range(n_archetypes)] for side in ['OFF', 'DEF']}
+    fit_probs = {side: pd.DataFrame(rng.dirichlet(np.full(n_archetypes, 0.3), n_fas).astype(np.float32), columns=cols)
+                 for side, cols in names.items()}
+    fa_df = pd.DataFrame({
+        'Player': [f"Player {i}" for i in range(n_fas)],
+        'From': rng.choice(teams, n_fas),
+        'AAV_Clean': np.clip(rng.lognormal(15.6, 1.0, n_fas), 1.2e6, 55e6).round(),
+        'OFF_Arch': fit_probs['OFF'].idxmax(axis=1), 'DEF_Arch': fit_probs['DEF'].idxmax(axis=1),
+    })
+    pick = lambda side: [ARCHETYPE_SEP.join(rng.choice(names[side] + ['Other'], rng.integers(1, 4), replace=False))
+                         for _ in range(n_need_rows)]
+    needs_df = pd.DataFrame({'Team': rng.choice(teams + ['XXX'], n_need_rows), 'Rec_Add_OFF': pick('OFF'), 'Rec_Add_DEF': pick('DEF')})
+    cap_map = dict(zip(teams, rng.uniform(-30e6, 40e6, n_teams).round()))
+    return needs_df, cap_map, fa_df, fit_probs
+
+
+def benchmark_free_agents(seeds=(0, 1, 2)):
+    """Per-need loop vs the join-based recommender on synthetic 2026-sized inputs (outputs must be identical)."""
+    from recommend_free_agents import recommend_signings
+    print("Free-agent recommendations:")
+    for seed in seeds:
+        needs_df, cap_map, fa_df, fit_probs = synthetic_fa_inputs(seed=seed)
+        start = time.perf_counter()
+        legacy = _legacy_recommend_signings(needs_df, cap_map, fa_df, fit_probs)
+        old_secs = time.perf_counter() - start
+        start = time.perf_counter()
+        new = recommend_signings(needs_df, cap_map, fa_df, fit_probs)
+        new_secs = time.perf_counter() - start
+        pd.testing.assert_frame_equal(legacy, new)
+        print(f"  seed {seed}: {len(new)} targets, per-need loop {old_secs:.2f}s, "
+              f"join-based {new_secs:.3f}s ({old_secs / new_secs:.0f}x faster)")
+
+
+# --- Ideal lineups (analyze_ideal_lineups.analyze_ideal_lineups) ---
+
+def _legacy_ideal_composition_list(series_of_lists, n_slots=5):
+    """
+    Given a series of lists (one list of 5 archetypes per lineup),
+    calculate the aggregate 'Ideal 5'.
+    Method: Calculate mean frequency of each archetype, then fill 5 slots proportionally.
+    """
+    # Flatten to get raw counts across all lineups
+    all_items = []
+    for l in series_of_lists:
+        all_items.extend(l)
+        
+    if not all_items: return ["N/A"] * 5
+    
+    # Calculate average count per lineup
+    n_lineups = len(series_of_lists)
+    counts = pd.Series(all_items).value_counts()
+    avg_per_lineup = counts / n_lineups
+    
+    # We want to construct a list of 5 players that maximizes these averages
+    # Strategy: Round the averages to nearest whole number, then adjust to sum to 5?
+    # Or just iterate: Pick highest average, subtract 1, repeat 5 times?
+    
+    final_list = []
+    remaining_avgs = avg_per_lineup.copy()
+    
+    for _ in range(5):
+        if remaining_avgs.empty or remaining_avgs.max() <= 0:
+            final_list.append("Any/Versatile")
+            continue
+            
+        best = remaining_avgs.idxmax()
+        final_list.append(best)
+        remaining_avgs[best] -= 1 # "Use" one instance of this archetype
+        
+    return final_list
+
+
+def _legacy_analyze_ideal_lineups(lineups_df, off_map, def_map, team_map):
+    """The previous per-row loop of analyze_ideal_lineups."""
+    
+    # Storage
+    # Playstyle -> List of [List of 5 OFF Archetypes]
+    style_off_data = {}
+    style_def_data = {}
+    
+    for _, row in lineups_df.iterrows():
+        team_id = row['TEAM_ID']
+        playstyle = team_map.get(team_id, "Unknown")
+        if playstyle == "Unknown": continue
+        
+        # Parse IDs
+        raw_ids = row['GROUP_ID'].strip('-').split('-')
+        pids = [int(p) for p in raw_ids if p]
+        
+        if len(pids) != 5: continue
+        
+        # Get Archetypes for this lineup
+        lineup_off = [off_map.get(p, "Replacement/Unknown") for p in pids]
+        lineup_def = [def_map.get(p, "Replacement/Unknown") for p in pids]
+        
+        if playstyle not in style_off_data:
+            style_off_data[playstyle] = []
+            style_def_data[playstyle] = []
+            
+        style_off_data[playstyle].append(lineup_off)
+        style_def_data[playstyle].append(lineup_def)
+        
+    # Build Result DataFrame
+    results = []
+    
+    for style in style_off_data.keys():
+        off_lineups = style_off_data[style]
+        def_lineups = style_def_data[style]
+        
+        # Calc Ideal 5
+        ideal_off = _legacy_ideal_composition_list(off_lineups)
+        ideal_def = _legacy_ideal_composition_list(def_lineups)
+        
+        row = {'Playstyle': style, 'Lineups_Analyzed': len(off_lineups)}
+        
+        for i in range(5):
+            row[f'OFF_Slot_{i+1}'] = ideal_off[i]
+            row[f'DEF_Slot_{i+1}'] = ideal_def[i]
+            
+        results.append(row)
+        
+    return pd.DataFrame(results)
+
+
+def benchmark_ideal_lineups(n_lineups=3000, n_teams=30, n_playstyles=6, seed=0):
+    """Per-row loop vs the lineup encoding on synthetic 5-man lineups (outputs must be identical)."""
+    from analyze_ideal_lineups import analyze_ideal_lineups
+    from lineup_encoding import synthetic_lineups, benchmark as encoding_benchmark
+    rng = np.random.default_rng(seed)
+    group_ids, players = synthetic_lineups(n_lineups, seed=seed)
+    lineups_df = pd.DataFrame({'TEAM_ID': rng.integers(0, n_teams + 2, n_lineups), 'GROUP_ID': group_ids})
+    team_map = {t: f"Style {t % n_playstyles}" for t in range(n_teams)}
+    off_map = dict(zip(players[:-40], rng.choice([f"Off {i}" for i in range(8)], len(players) - 40)))
+    def_map = dict(zip(players[40:], rng.choice([f"Def {i}" for i in range(8)], len(players) - 40)))
+    
+    start = time.perf_counter()
+    legacy = _legacy_analyze_ideal_lineups(lineups_df, off_map, def_map, team_map)
+    old_secs = time.perf_counter() - start
+    start = time.perf_counter()
+    new = analyze_ideal_lineups(lineups_df, off_map, def_map, team_map)
+    new_secs = time.perf_counter() - start
+    
+    pd.testing.assert_frame_equal(legacy, new[legacy.columns])
+    print(f"Ideal lineups: {n_lineups} lineups: per-row loop {old_secs:.2f}s, encoded {new_secs:.3f}s ({old_secs / new_secs:.0f}x faster)")
+    encoding_benchmark()
+
+
+# --- Fifth starter (recommend_fifth_starter.generate_analysis) ---
+
+def _legacy_recommendations(current_probs, ideal_list):
+    """
+    Returns the archetypes that are in Ideal but missing from Current, most missing first.
+    current_probs has one membership row per lineup player, so a player on the border of
+    two archetypes counts partly towards both instead of flipping between them.
+    """
+    from recommend_fifth_starter import MIN_MISSING
+    ideal_counts = pd.Series(Counter(ideal_list), dtype='float64')
+    current_counts = current_probs.sum().reindex(ideal_counts.index, fill_value=0.0)
+    
+    # Subtract current from ideal
+    diff = (ideal_counts - current_counts).sort_values(ascending=False)
+    missing = diff[diff >= MIN_MISSING].index.tolist()
+        
+    if not missing:
+        return ["None / Fit is Perfect"]
+        
+    return missing
+
+
+def _legacy_generate_analysis(lineups_df, off_map, def_map, off_probs, def_probs, team_map, ideal_map):
+    """The previous per-team / per-row loop of recommend_fifth_starter."""
+    
+    results = []
+    
+    # Process per Team
+    teams = lineups_df['TEAM_ID'].unique()
+    
+    for team_id in teams:
+        team_lineups = lineups_df[lineups_df['TEAM_ID'] == team_id].copy()
+        
+        # Rank by Plus_Minus (Total Impact)
+        team_lineups = team_lineups.sort_values('PLUS_MINUS', ascending=False)
+        
+        # Take Top 5
+        top_5 = team_lineups.head(5)
+        
+        playstyle = team_map.get(team_id, "Unknown")
+        ideal_comp = ideal_map.get(playstyle)
+        
+        if not ideal_comp: continue
+        
+        for _, row in top_5.iterrows():
+            # Parse Players
+            raw_ids = row['GROUP_ID'].strip('-').split('-')
+            pids = [int(p) for p in raw_ids if p]
+            
+            curr_off = [off_map.get(p, "Unknown") for p in pids]
+            curr_def = [def_map.get(p, "Unknown") for p in pids]
+            
+            # Get Recommendations
+            rec_off = _legacy_recommendations(off_probs.reindex(pids, fill_value=0.0), ideal_comp['OFF'])
+            rec_def = _legacy_recommendations(def_probs.reindex(pids, fill_value=0.0), ideal_comp['DEF'])
+            
+            results.append({
+                'Team': row['TEAM_ABBREVIATION'],
+                'Team_Playstyle': playstyle,
+                'Lineup_Name': row['GROUP_NAME'],
+                'Minutes': row['MIN'],
+                'Plus_Minus': row['PLUS_MINUS'],
+                'Current_OFF_Archetypes': ", ".join(curr_off),
+                'Current_DEF_Archetypes': ", ".join(curr_def),
+                'Rec_Add_OFF': ARCHETYPE_SEP.join(rec_off),
+                'Rec_Add_DEF': ARCHETYPE_SEP.join(rec_def)
+            })
+            
+    return pd.DataFrame(results)
+
+
+def benchmark_fifth_starter(n_lineups=2000, n_teams=30, n_playstyles=6, seed=0):
+    """Per-row loop vs the lineup encoding on synthetic 4-man lineups (outputs must be identical)."""
+    from recommend_fifth_starter import generate_analysis
+    from lineup_encoding import synthetic_lineups
+    rng = np.random.default_rng(seed)
+    group_ids, players = synthetic_lineups(n_lineups, group_quantity=4, seed=seed)
+    teams = rng.integers(0, n_teams + 2, n_lineups)
+    lineups_df = pd.DataFrame({
+        'TEAM_ID': teams, 'TEAM_ABBREVIATION': [f"T{t:02d}" for t in teams], 'GROUP_ID': group_ids,
+        'GROUP_NAME': [f"Lineup {i}" for i in range(n_lineups)],
+        'MIN': rng.uniform(50, 500, n_lineups).round(1), 'PLUS_MINUS': rng.permutation(n_lineups) - n_lineups / 2.0,
+    })
+    team_map = {t: f"Style {t % n_playstyles}" for t in range(n_teams)}
+    maps, probs, ideal_map = {}, {}, {}
+    for side in ['OFF', 'DEF']:
+        names = [f"{side} {i}" for i in range(8)]
+        maps[side] = dict(zip(players[:-40], rng.choice(names, len(players) - 40)))
+        probs[side] = pd.DataFrame(rng.dirichlet(np.full(8, 0.4), len(players) - 40).astype(np.float32),
+                                   index=players[:-40], columns=names)
+    for style in set(team_map.values()) - {"Style 5"}:
+        ideal_map[style] = {side: list(rng.choice([f"{side} {i}" for i in range(8)] + ["Any/Versatile"], 5)) for side in ['OFF', 'DEF']}
+    args = (lineups_df, maps['OFF'], maps['DEF'], probs['OFF'], probs['DEF'], team_map, ideal_map)
+    
+    start = time.perf_counter()
+    legacy = _legacy_generate_analysis(*args)
+    old_secs = time.perf_counter() - start
+    start = time.perf_counter()
+    new = generate_analysis(*args)
+    new_secs = time.perf_counter() - start
+    
+    pd.testing.assert_frame_equal(legacy, new)
+    print(f"Fifth starter: {n_lineups} lineups: per-row loop {old_secs:.2f}s, encoded {new_secs:.3f}s ({old_secs / new_secs:.0f}x faster)")
+
+
+BENCHMARKS = {
+    'defensive_matchups': benchmark_defensive_matchups,
+    'destinations': benchmark_destinations,
+    'free_agents': benchmark_free_agents,
+    'ideal_lineups': benchmark_ideal_lineups,
+    'fifth_starter': benchmark_fifth_starter,
+}
+
+
+if __name__ == "__main__":
+    for name in sys.argv[1:] or list(BENCHMARKS):
+        BENCHMARKS[name]()
@@ -0,0 +1,174 @@
+import os
+import json
+import difflib
+import pandas as pd
+
+from data_lake import LAKE_DIR, BASE_DIR, load_dataset
+from snapshot_store import load_snapshots
+
+# --- Configuration ---
+# One table of (normalized name -> PLAYER_ID) rows, with the season/team each spelling was
+# seen under. Loaders attach integer IDs once and every downstream merge runs on PLAYER_ID.
+INDEX_FILE = os.path.join(LAKE_DIR, 'player_index.parquet')
+FUZZY_CACHE_FILE = os.path.join(LAKE_DIR, 'player_fuzzy_matches.json')
+ALIASES_FILE = os.path.join(BASE_DIR, 'player_aliases.csv')  # ALIAS,PLAYER_ID (hand-maintained)
+
+INDEX_COLS = ['NAME_KEY', 'PLAYER_ID', 'PLAYER_NAME', 'SEASON', 'TEAM_ABBREVIATION', 'SOURCE']
+FUZZY_CUTOFF = 0.9
+SUFFIX_PATTERN = r'\b(?:jr|sr|ii|iii|iv|v)\b'
+
+
+def normalize_names(names):
+    """'Luka Dončić' / 'Jaren Jackson Jr.' / "D'Angelo Russell" -> 'luka doncic' / 'jaren jackson' / 'dangelo russell'."""
+    s = pd.Series(names).astype('string').fillna('')
+    s = s.str.normalize('NFKD').str.encode('ascii', errors='ignore').str.decode('ascii')
+    s = s.str.lower().str.replace(r"[.'’`]", '', regex=True).str.replace('-', ' ', regex=False)
+    s = s.str.replace(SUFFIX_PATTERN, '', regex=True)
+    return s.str.replace(r'\s+', ' ', regex=True).str.strip()
+
+
+def _static_rows():
+    from nba_api.stats.static import players
+    df = pd.DataFrame(players.get_players()).rename(columns={'id': 'PLAYER_ID', 'full_name': 'PLAYER_NAME'})
+    df['SOURCE'] = 'nba_api'
+    return df[['PLAYER_ID', 'PLAYER_NAME', 'SOURCE']]
+
+
+def _context_rows():
+    """Season/team context from the local stat tables (no API calls)."""
+    frames = []
+    cols = ['PLAYER_ID', 'PLAYER_NAME', 'TEAM_ABBREVIATION', 'SEASON']
+    try:
+        frames.append(load_dataset('historical_general', columns=cols).assign(SOURCE='historical_general'))
+    except FileNotFoundError:
+        print("historical_general not available; skipping 2015-2025 context.")
+    try:
+        live = load_snapshots('timeseries_2025_26', columns=cols[:3] + ['NICKNAME'])
+        live = live.drop_duplicates(['PLAYER_ID', 'TEAM_ABBREVIATION']).assign(SEASON='2025-26', SOURCE='timeseries_2025_26')
+        # "Nic Claxton"-style first-name nicknames become aliases of the same ID
+        nick = live.dropna(subset=['NICKNAME']).copy()
+        nick['PLAYER_NAME'] = nick['NICKNAME'] + ' ' + nick['PLAYER_NAME'].str.split(' ', n=1).str[1].fillna('')
+        frames += [live.drop(columns='NICKNAME'), nick.drop(columns='NICKNAME').assign(SOURCE='nickname')]
+    except FileNotFoundError:
+        print("2025-26 timeseries not available; skipping live context.")
+    return frames
+
+
+def _alias_rows():
+    if not os.path.exists(ALIASES_FILE):
+        return []
+    aliases = pd.read_csv(ALIASES_FILE).rename(columns={'ALIAS': 'PLAYER_NAME'})
+    return [aliases.assign(SOURCE='alias')]
+
+
+def build_index():
+    """Rebuilds and saves the index from nba_api's static player list, local stat tables and aliases."""
+    df = pd.concat([_static_rows()] + _context_rows() + _alias_rows(), ignore_index=True)
+    df = df.dropna(subset=['PLAYER_ID', 'PLAYER_NAME'])
+    df['PLAYER_ID'] = df['PLAYER_ID'].astype('int64')
+    df['NAME_KEY'] = normalize_names(df['PLAYER_NAME'])
+    for col in ['SEASON', 'TEAM_ABBREVIATION']:
+        df[col] = df[col].astype('string') if col in df.columns else pd.Series(pd.NA, index=df.index, dtype='string')
+    df = df[INDEX_COLS].drop_duplicates(['NAME_KEY', 'PLAYER_ID', 'SEASON', 'TEAM_ABBREVIATION'], ignore_index=True)
+
+    os.makedirs(LAKE_DIR, exist_ok=True)
+    df.to_parquet(INDEX_FILE, index=False)
+    # Old fuzzy answers may now have exact matches
+    if os.path.exists(FUZZY_CACHE_FILE):
+        os.remove(FUZZY_CACHE_FILE)
+    print(f"Built player index: {df['PLAYER_ID'].nunique()} players, {len(df)} name rows.")
+    return df
+
+
+_INDEX = None
+
+
+def load_index(rebuild=False):
+    global _INDEX
+    if rebuild or (_INDEX is None and not os.path.exists(INDEX_FILE)):
+        _INDEX = build_index()
+    elif _INDEX is None:
+        _INDEX = pd.read_parquet(INDEX_FILE)
+    return _INDEX
+
+
+def _load_fuzzy_cache():
+    if not os.path.exists(FUZZY_CACHE_FILE):
+        return {}
+    with open(FUZZY_CACHE_FILE) as f:
+        return json.load(f)
+
+
+def _save_fuzzy_cache(cache):
+    os.makedirs(LAKE_DIR, exist_ok=True)
+    tmp_path = f"{FUZZY_CACHE_FILE}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(cache, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, FUZZY_CACHE_FILE)
+
+
+def _fuzzy_keys(keys, index):
+    """Closest indexed NAME_KEY for each unmatched key (None if nothing is close). Answers are cached."""
+    cache = _load_fuzzy_cache()
+    missing = [k for k in keys if k and k not in cache]
+    if missing:
+        known = index['NAME_KEY'].unique().tolist()
+        for key in missing:
+            match = difflib.get_close_matches(key, known, n=1, cutoff=FUZZY_CUTOFF)
+            cache[key] = match[0] if match else None
+        _save_fuzzy_cache(cache)
+    return {k: cache.get(k) for k in keys}
+
+
+def _pick_candidate(cands, season, team):
+    """Several players share a spelling: prefer the one seen that season/team, then the newest ID."""
+    for mask in [(cands['SEASON'] == season) & (cands['TEAM_ABBREVIATION'] == team),
+                 cands['SEASON'] == season,
+                 cands['TEAM_ABBREVIATION'] == team]:
+        hit = cands.loc[mask.fillna(False), 'PLAYER_ID']
+        if hit.nunique() == 1:
+            return hit.iloc[0]
+    return cands['PLAYER_ID'].max()
+
+
+def resolve_ids(names, season=None, teams=None):
+    """
+    PLAYER_ID (nullable Int64) for each name. Exact lookup on the normalized name first,
+    then the cached fuzzy fallback; season/team context breaks ties between namesakes.
+    """
+    index = load_index()
+    query = pd.DataFrame({
+        'NAME_KEY': normalize_names(names).to_numpy(),
+        'TEAM_ABBREVIATION': pd.Series(teams, dtype='string').to_numpy() if teams is not None else pd.NA,
+    })
+
+    # Unmatched spellings are mapped to their closest indexed spelling, then looked up as usual
+    unmatched = sorted(set(query['NAME_KEY']) - set(index['NAME_KEY']))
+    fuzzy = {k: v for k, v in _fuzzy_keys(unmatched, index).items() if v}
+    query['LOOKUP_KEY'] = query['NAME_KEY'].replace(fuzzy)
+
+    ids_per_key = index.groupby('NAME_KEY')['PLAYER_ID'].nunique()
+    unique_ids = index[index['NAME_KEY'].isin(ids_per_key[ids_per_key == 1].index)].drop_duplicates('NAME_KEY')
+    result = query['LOOKUP_KEY'].map(unique_ids.set_index('NAME_KEY')['PLAYER_ID'])
+
+    # Only ambiguous spellings need the context lookup
+    ambiguous = query['LOOKUP_KEY'].isin(ids_per_key[ids_per_key > 1].index)
+    for (key, team), rows in query[ambiguous].groupby(['LOOKUP_KEY', 'TEAM_ABBREVIATION'], dropna=False).groups.items():
+        cands = index[index['NAME_KEY'] == key]
+        result[rows] = _pick_candidate(cands, season, None if pd.isna(team) else team)
+
+    return result.astype('Int64')
+
+
+def attach_player_ids(df, name_col, season=None, team_col=None, id_col='PLAYER_ID'):
+    """Adds an integer id_col to df (in place) from its name column, reporting names that could not be resolved."""
+    teams = df[team_col] if team_col else None
+    df[id_col] = resolve_ids(df[name_col], season=season, teams=teams).array
+    missing = df.loc[df[id_col].isna(), name_col].dropna().unique()
+    if len(missing):
+        print(f"Warning: {len(missing)} players in '{name_col}' have no PLAYER_ID (e.g. {', '.join(map(str, missing[:3]))}).")
+    return df
+
+
+if __name__ == "__main__":
+    load_index(rebuild=True)
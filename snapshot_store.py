@@ -0,0 +1,255 @@
+import os
+import sys
+import json
+import time
+import pandas as pd
+
+from data_lake import LAKE_DIR, BASE_DIR, coerce_types
+
+# --- Configuration ---
+# Weekly timeseries are stored as one immutable Parquet segment per SNAPSHOT_TIME.
+# A new week is a single segment write + index update; old segments are never rewritten.
+SNAPSHOT_DIR = os.path.join(LAKE_DIR, 'snapshots')
+INDEX_FILE = 'index.json'
+KEY_COL = 'SNAPSHOT_TIME'
+
+# Store -> legacy CSV it replaces (relative to BASE_DIR), used for migration and fallback
+SNAPSHOT_DATASETS = {
+    'timeseries_2025_26': 'Weekly Updates/Contract Value Weekly Update/nba_timeseries_stats_2025_26.csv',
+    'archetype_timeseries_2025_26': 'Weekly Updates/Contract Value Weekly Update/nba_archetype_timeseries_2025_26.csv',
+}
+
+
+def store_dir(name):
+    return os.path.join(SNAPSHOT_DIR, name)
+
+
+def segment_name(snapshot_time):
+    # '2026-01-04 11:51' -> 'snapshot=2026-01-04T11-51.parquet'
+    return f"snapshot={str(snapshot_time).replace(' ', 'T').replace(':', '-')}.parquet"
+
+
+def load_index(name):
+    """
+    Index of published segments, oldest first. Each distinct column list is stored once
+    under 'schemas' and segments point at it, so the index stays small as weeks accumulate.
+    """
+    path = os.path.join(store_dir(name), INDEX_FILE)
+    if not os.path.exists(path):
+        return {'schemas': [], 'segments': []}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _atomic_write_json(path, data):
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def has_snapshots(name):
+    return bool(load_index(name)['segments'])
+
+
+def snapshot_times(name):
+    return [seg['snapshot_time'] for seg in load_index(name)['segments']]
+
+
+def publish_snapshot(df, name):
+    """
+    Publishes the rows of a single SNAPSHOT_TIME as a new immutable segment.
+    The segment is written to a temp file and renamed into place before the index
+    is updated, so a crash never leaves a half-written or half-indexed snapshot.
+    Returns False (and writes nothing) if that snapshot is already published.
+    """
+    times = df[KEY_COL].astype(str).unique()
+    if len(times) != 1:
+        raise ValueError(f"publish_snapshot expects one {KEY_COL}, got {len(times)}")
+    snapshot_time = times[0]
+
+    index = load_index(name)
+    if any(seg['snapshot_time'] == snapshot_time for seg in index['segments']):
+        print(f"[{name}] Snapshot {snapshot_time} already published; skipping.")
+        return False
+
+    os.makedirs(store_dir(name), exist_ok=True)
+    fname = segment_name(snapshot_time)
+    path = os.path.join(store_dir(name), fname)
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    coerce_types(df, [KEY_COL]).to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+    # New columns just start a new schema entry; earlier segments are left as they are
+    columns = list(df.columns)
+    if columns not in index['schemas']:
+        index['schemas'].append(columns)
+    index['segments'].append({
+        'snapshot_time': snapshot_time,
+        'file': fname,
+        'rows': len(df),
+        'schema': index['schemas'].index(columns),
+        'published_at': time.time(),
+    })
+    index['segments'].sort(key=lambda seg: seg['snapshot_time'])
+    _atomic_write_json(os.path.join(store_dir(name), INDEX_FILE), index)
+
+    print(f"[{name}] Published snapshot {snapshot_time} ({len(df)} rows).")
+    return True
+
+
+def publish_snapshots(df, name):
+    """Publishes one segment per SNAPSHOT_TIME in df. Returns the number of new segments."""
+    return sum(publish_snapshot(group, name) for _, group in df.groupby(KEY_COL, sort=True))
+
+
+def _read_segments(name, segments, columns=None, filters=None):
+    index = load_index(name)
+    frames = []
+    for seg in segments:
+        seg_cols = index['schemas'][seg['schema']]
+        if filters and any(col not in seg_cols for col, _, _ in filters):
+            continue
+        cols = None if columns is None else [c for c in columns if c in seg_cols]
+        path = os.path.join(store_dir(name), seg['file'])
+        frames.append(pd.read_parquet(path, columns=cols, filters=filters))
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame(columns=columns or [])
+    # Columns added mid-season come back as NaN for older snapshots
+    return pd.concat(frames, ignore_index=True)
+
+
+def load_snapshots(name, columns=None, since=None, times=None, csv_path=None):
+    """
+    Reads every snapshot (or those with SNAPSHOT_TIME >= since, or only the listed times),
+    projecting to columns. Falls back to the legacy CSV if the store hasn't been created yet.
+    """
+    if not has_snapshots(name):
+        path = csv_path or os.path.join(BASE_DIR, SNAPSHOT_DATASETS[name])
+        header = pd.read_csv(path, nrows=0).columns
+        filtering = bool(since) or times is not None
+        usecols = None
+        if columns is not None:
+            usecols = [c for c in columns if c in header]
+            # The time filter needs KEY_COL even when the caller didn't ask for it
+            if filtering and KEY_COL not in usecols and KEY_COL in header:
+                usecols.append(KEY_COL)
+        df = pd.read_csv(path, usecols=usecols)
+        if filtering:
+            keys = df[KEY_COL].astype(str)
+            if since:
+                df = df[keys >= since]
+            if times is not None:
+                df = df[keys.isin(times)]
+            if columns is not None and KEY_COL not in columns:
+                df = df.drop(columns=KEY_COL)
+        return df
+
+    segments = load_index(name)['segments']
+    if since:
+        segments = [seg for seg in segments if seg['snapshot_time'] >= since]
+    if times is not None:
+        wanted = set(times)
+        segments = [seg for seg in segments if seg['snapshot_time'] in wanted]
+    return _read_segments(name, segments, columns)
+
+
+def pending_snapshots(source, target):
+    """
+    Snapshot times published in `source` but not yet in `target`, oldest first.
+    Only the two index files are compared, so the cost doesn't grow with the rows stored.
+    """
+    done = set(snapshot_times(target))
+    return [t for t in snapshot_times(source) if t not in done]
+
+
+def load_latest_snapshot(name, columns=None):
+    """Reads only the most recent segment."""
+    segments = load_index(name)['segments']
+    return _read_segments(name, segments[-1:], columns)
+
+
+def load_player_history(name, player_id, columns=None):
+    """One player's rows across every snapshot, oldest first (PLAYER_ID filter is pushed into each segment read)."""
+    segments = load_index(name)['segments']
+    return _read_segments(name, segments, columns, filters=[('PLAYER_ID', '==', player_id)])
+
+
+def export_csv(name, path, columns=None):
+    load_snapshots(name, columns=columns).to_csv(path, index=False)
+    print(f"Exported '{name}' to {path}")
+
+
+def append_csv(df, name, path):
+    """
+    Appends df to the legacy CSV export without re-reading it. If the columns changed,
+    the export is rebuilt once from the store instead (with df's columns, so store-only
+    columns such as archetype memberships stay out of the CSV).
+    """
+    if os.path.exists(path):
+        header = pd.read_csv(path, nrows=0).columns.tolist()
+        if set(header) == set(df.columns):
+            df[header].to_csv(path, mode='a', index=False, header=False)
+            return
+    export_csv(name, path, columns=list(df.columns))
+
+
+def ensure_store(name, csv_path=None):
+    """
+    Seeds an empty store from the legacy CSV (one-off), so the first append-only
+    write doesn't leave the earlier weeks behind in the CSV.
+    """
+    if has_snapshots(name):
+        return
+    path = csv_path or os.path.join(BASE_DIR, SNAPSHOT_DATASETS[name])
+    if not os.path.exists(path):
+        print(f"[{name}] No legacy CSV at {path}; starting an empty store.")
+        return
+    published = publish_snapshots(pd.read_csv(path), name)
+    print(f"[{name}] Imported {published} snapshots from {path}.")
+
+
+def import_legacy_csvs():
+    """One-off migration of every registered timeseries CSV."""
+    for name in SNAPSHOT_DATASETS:
+        ensure_store(name)
+
+
+def check_csv_fallback():
+    """
+    Regression check: a store that only exists as its legacy CSV loads with projections that
+    leave out SNAPSHOT_TIME, with and without a time filter.
+    """
+    import tempfile
+    global SNAPSHOT_DIR
+    df = pd.DataFrame({
+        KEY_COL: ['2026-01-04 11:51', '2026-01-04 11:51', '2026-01-11 09:30'],
+        'PLAYER_ID': [1, 2, 1],
+        'PLAYER_NAME': ['A', 'B', 'A'],
+    })
+    saved_dir = SNAPSHOT_DIR
+    with tempfile.TemporaryDirectory() as tmp:
+        SNAPSHOT_DIR = os.path.join(tmp, 'snapshots')
+        try:
+            path = os.path.join(tmp, 'legacy.csv')
+            df.to_csv(path, index=False)
+            out = load_snapshots('timeseries_2025_26', columns=['PLAYER_ID', 'PLAYER_NAME'], csv_path=path)
+            assert list(out.columns) == ['PLAYER_ID', 'PLAYER_NAME'] and len(out) == 3
+            out = load_snapshots('timeseries_2025_26', columns=['PLAYER_ID'], since='2026-01-10', csv_path=path)
+            assert list(out.columns) == ['PLAYER_ID'] and out['PLAYER_ID'].tolist() == [1]
+            out = load_snapshots('timeseries_2025_26', columns=['PLAYER_ID'], times=['2026-01-04 11:51'], csv_path=path)
+            assert out['PLAYER_ID'].tolist() == [1, 2]
+            out = load_snapshots('timeseries_2025_26', csv_path=path)
+            assert list(out.columns) == list(df.columns)
+        finally:
+            SNAPSHOT_DIR = saved_dir
+    print("CSV fallback check passed.")
+
+
+if __name__ == "__main__":
+    # python snapshot_store.py [--check]
+    if '--check' in sys.argv:
+        check_csv_fallback()
+    else:
+        import_legacy_csvs()
@@ -0,0 +1,104 @@
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from nba_api.stats.endpoints import synergyplaytypes
+
+from nba_fetch import fetch_frames
+
+# --- Configuration ---
+# Requests run concurrently; the real pace is set by nba_fetch.RATE_LIMITER,
+# so extra workers only hide latency, they never exceed the API rate limit.
+MAX_WORKERS = 8
+
+# The API has accepted different spellings of the P&R playtypes across seasons
+PLAYTYPE_KEY_VARIANTS = {
+    'PRBallHandler': ['PRBallHandler', 'P&RBallHandler', 'PickAndRollBallHandler'],
+    'P&RBallHandler': ['P&RBallHandler', 'PRBallHandler', 'PickAndRollBallHandler'],
+    'PRRollMan': ['PRRollMan', 'P&RRollMan', 'PickAndRollRollMan'],
+    'P&RRollMan': ['P&RRollMan', 'PRRollMan', 'PickAndRollRollMan'],
+}
+
+META_COLS = ['PLAYER_ID', 'PLAYER_NAME', 'TEAM_ABBREVIATION']
+
+
+def fetch_playtype(season, play_type, **params):
+    """Fetches one playtype, trying each known API spelling. Empty frame if none return rows."""
+    for key in PLAYTYPE_KEY_VARIANTS.get(play_type, [play_type]):
+        try:
+            df = fetch_frames(
+                synergyplaytypes.SynergyPlayTypes,
+                season=season,
+                play_type_nullable=key,
+                player_or_team_abbreviation='P',
+                **params
+            )[0]
+            if not df.empty:
+                return df
+        except Exception as e:
+            print(f"    Error fetching {play_type} ({key}) for {season}: {e}")
+    return pd.DataFrame()
+
+
+def missing_playtypes(df, play_types, prefixes=None):
+    """Playtypes with no {prefix}_FREQ column in a fetch_playtype_frames season frame."""
+    prefixes = prefixes or {pt: pt for pt in play_types}
+    return [pt for pt in play_types if f'{prefixes[pt]}_FREQ' not in df.columns]
+
+
+def fetch_playtypes(seasons, play_types, max_workers=MAX_WORKERS, **params):
+    """
+    Fetches every (season, playtype) pair concurrently.
+    Yields (season, play_type, DataFrame) in completion order.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(fetch_playtype, season, pt, **params): (season, pt)
+            for season in seasons for pt in play_types
+        }
+        for future in as_completed(futures):
+            season, pt = futures[future]
+            yield season, pt, future.result()
+
+
+def fetch_playtype_frames(seasons, play_types, prefixes=None, max_workers=MAX_WORKERS, **params):
+    """
+    Builds one wide frame per season: PLAYER_ID, PLAYER_NAME, TEAM_ABBREVIATION and
+    {prefix}_FREQ / {prefix}_PPP for every playtype (POSS_PCT and PPP from Synergy).
+    Results are merged in as they arrive; missing playtypes are left as NaN.
+    Returns {season: DataFrame}.
+    """
+    prefixes = prefixes or {pt: pt for pt in play_types}
+    stats = {season: None for season in seasons}
+    meta = {season: [] for season in seasons}
+
+    for season, pt, df in fetch_playtypes(seasons, play_types, max_workers, **params):
+        if df.empty:
+            print(f"    Warning: No data for {pt} ({season})")
+            continue
+        print(f"  Received {pt} ({season}): {len(df)} rows")
+
+        prefix = prefixes[pt]
+        subset = df.drop_duplicates(subset=['PLAYER_ID'])
+        meta[season].append(subset[[c for c in META_COLS if c in subset.columns]])
+
+        subset = subset[['PLAYER_ID', 'POSS_PCT', 'PPP']].rename(
+            columns={'POSS_PCT': f'{prefix}_FREQ', 'PPP': f'{prefix}_PPP'}
+        )
+        if stats[season] is None:
+            stats[season] = subset
+        else:
+            stats[season] = pd.merge(stats[season], subset, on='PLAYER_ID', how='outer')
+
+    frames = {}
+    for season in seasons:
+        if stats[season] is None:
+            frames[season] = pd.DataFrame()
+            continue
+        # Names/teams come from whichever playtype listed the player, not just the first one
+        players = pd.concat(meta[season], ignore_index=True).drop_duplicates(subset=['PLAYER_ID'])
+        wide = pd.merge(players, stats[season], on='PLAYER_ID', how='right')
+
+        # Arrival order is nondeterministic; restore the requested playtype order
+        ordered = [f'{prefixes[pt]}_{m}' for pt in play_types for m in ('FREQ', 'PPP')]
+        ordered = [c for c in ordered if c in wide.columns]
+        frames[season] = wide[[c for c in META_COLS if c in wide.columns] + ordered]
+    return frames
@@ -0,0 +1,163 @@
+import os
+import time
+import hashlib
+import pandas as pd
+
+from data_lake import load_dataset, write_dataset, legacy_csv_path, has_dataset
+
+# --- Configuration ---
+# One row per (player, snapshot date, model version) instead of one Live_AAV_{date}
+# column per run. A weekly update only writes that week's rows.
+LEDGER_NAME = 'contract_valuations'
+KEY_COLS = ['PLAYER_ID', 'SNAPSHOT_DATE', 'MODEL_VERSION']
+LEDGER_COLS = KEY_COLS + ['PLAYER_NAME', 'LIVE_AAV', 'RECORDED_AT']
+LEGACY_PREFIX = 'Live_AAV_'
+LEGACY_MODEL_VERSION = 'legacy'
+# The CSV export is the canonical history (it is committed; data_lake/ is not), so the
+# Parquet ledger is rebuilt from it for any snapshot the lake is missing
+SNAPSHOT_COLS = ['SNAPSHOT_DATE', 'MODEL_VERSION']
+
+
+def model_version(*paths):
+    """Short content hash of the model artifacts, so retrained models get their own rows."""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+def record_valuations(df, snapshot_date, version, csv_path=None):
+    """
+    Appends one snapshot of valuations (PLAYER_ID, PLAYER_NAME, LIVE_AAV).
+    Only the (date, version) partition is written, so re-running a day replaces that
+    day's rows instead of duplicating them. The same rows are appended to the CSV export.
+    """
+    rows = df[['PLAYER_ID', 'PLAYER_NAME', 'LIVE_AAV']].copy()
+    rows['SNAPSHOT_DATE'] = snapshot_date
+    rows['MODEL_VERSION'] = version
+    rows['RECORDED_AT'] = time.time()
+    # Sorted by player so per-player reads can skip row groups
+    rows = rows[LEDGER_COLS].sort_values('PLAYER_ID', ignore_index=True)
+
+    write_dataset(rows, LEDGER_NAME)
+
+    csv_path = csv_path or legacy_csv_path(LEDGER_NAME)
+    rows.to_csv(csv_path, mode='a', index=False, header=not os.path.exists(csv_path))
+    return rows
+
+
+def _latest_per_key(df):
+    # The CSV export is append-only, so a re-run day can appear twice there
+    return df.sort_values('RECORDED_AT').drop_duplicates(subset=KEY_COLS, keep='last')
+
+
+def _snapshot_times(df):
+    """Latest RECORDED_AT per (SNAPSHOT_DATE, MODEL_VERSION)."""
+    return df.astype({c: str for c in SNAPSHOT_COLS}).groupby(SNAPSHOT_COLS)['RECORDED_AT'].max()
+
+
+def sync_from_csv(csv_path=None):
+    """
+    Rewrites the ledger partitions of every snapshot the CSV export has and the lake
+    doesn't (or holds an older recording of), e.g. weeks recorded by CI into a fresh lake.
+    Only the key columns are read unless something needs rebuilding. Returns the rows written.
+    """
+    csv_path = csv_path or legacy_csv_path(LEDGER_NAME)
+    if not os.path.exists(csv_path):
+        return 0
+    dtypes = {c: str for c in SNAPSHOT_COLS}
+    csv_times = _snapshot_times(pd.read_csv(csv_path, usecols=SNAPSHOT_COLS + ['RECORDED_AT'], dtype=dtypes))
+    lake_times = pd.Series(dtype='float64')
+    if has_dataset(LEDGER_NAME):
+        lake_times = _snapshot_times(load_dataset(LEDGER_NAME, columns=SNAPSHOT_COLS + ['RECORDED_AT']))
+    stale = csv_times[~(csv_times <= lake_times.reindex(csv_times.index))]
+    if stale.empty:
+        return 0
+
+    rows = _latest_per_key(pd.read_csv(csv_path, dtype=dtypes))
+    rows = rows.merge(stale.index.to_frame(index=False), on=SNAPSHOT_COLS)
+    write_dataset(rows[LEDGER_COLS].sort_values('PLAYER_ID', ignore_index=True), LEDGER_NAME)
+    print(f"Rebuilt {len(stale)} valuation snapshots in the data lake from {csv_path}.")
+    return len(rows)
+
+
+def load_valuations(columns=None, filters=None):
+    sync_from_csv()
+    df = load_dataset(LEDGER_NAME, columns=columns, filters=filters)
+    if 'RECORDED_AT' in df.columns and all(c in df.columns for c in KEY_COLS):
+        df = _latest_per_key(df)
+    return df
+
+
+def load_player_valuations(player_id, model_version=None):
+    """One player's valuation history, oldest first."""
+    filters = [('PLAYER_ID', '==', player_id)]
+    if model_version:
+        filters.append(('MODEL_VERSION', '==', model_version))
+    return load_valuations(filters=filters).sort_values(['SNAPSHOT_DATE', 'RECORDED_AT'], ignore_index=True)
+
+
+def pivot_valuations(df=None, model_version=None):
+    """
+    Wide view for the app: one row per PLAYER_ID with a Live_AAV_{date} column per snapshot.
+    Without model_version, each date shows the most recently recorded model's value.
+    """
+    if df is None:
+        filters = [('MODEL_VERSION', '==', model_version)] if model_version else None
+        df = load_valuations(filters=filters)
+    elif model_version:
+        df = df[df['MODEL_VERSION'] == model_version]
+
+    if df.empty:
+        return pd.DataFrame(columns=['PLAYER_ID', 'Player'])
+    latest = df.sort_values('RECORDED_AT').drop_duplicates(subset=['PLAYER_ID', 'SNAPSHOT_DATE'], keep='last')
+    # Names can change spelling between weeks; label each player with their latest one
+    names = latest.sort_values('SNAPSHOT_DATE').drop_duplicates('PLAYER_ID', keep='last').set_index('PLAYER_ID')['PLAYER_NAME']
+
+    wide = latest.pivot(index='PLAYER_ID', columns='SNAPSHOT_DATE', values='LIVE_AAV')
+    wide = wide[sorted(wide.columns)]
+    wide.columns = [f"{LEGACY_PREFIX}{d}" for d in wide.columns]
+    wide.insert(0, 'Player', names.reindex(wide.index))
+    return wide.reset_index()
+
+
+def import_legacy_tracker(tracker_path, name_to_id, csv_path=None):
+    """
+    One-off migration of the wide Live_AAV_{date} columns into the ledger.
+    name_to_id maps PLAYER_NAME -> PLAYER_ID (the legacy tracker only has names).
+    Migrated values are removed from the tracker; players without a PLAYER_ID keep their
+    Live_AAV_ values there until a later run can map them. Returns the rows migrated.
+    """
+    tracker = pd.read_csv(tracker_path, on_bad_lines='skip')
+    value_cols = [c for c in tracker.columns if c.startswith(LEGACY_PREFIX)]
+    if not value_cols or 'Player' not in tracker.columns:
+        return 0
+
+    long_df = tracker.melt(id_vars=['Player'], value_vars=value_cols, var_name='SNAPSHOT_DATE', value_name='LIVE_AAV')
+    long_df = long_df.dropna(subset=['LIVE_AAV'])
+    long_df['SNAPSHOT_DATE'] = long_df['SNAPSHOT_DATE'].str[len(LEGACY_PREFIX):]
+    long_df['PLAYER_ID'] = long_df['Player'].map(name_to_id)
+
+    unmatched = long_df.loc[long_df['PLAYER_ID'].isna(), 'Player'].unique()
+    if len(unmatched):
+        print(f"Warning: {len(unmatched)} legacy tracker players have no PLAYER_ID; their values stay in the tracker.")
+    long_df = long_df.dropna(subset=['PLAYER_ID']).rename(columns={'Player': 'PLAYER_NAME'})
+    long_df['PLAYER_ID'] = long_df['PLAYER_ID'].astype('int64')
+
+    for snapshot_date, rows in long_df.groupby('SNAPSHOT_DATE'):
+        record_valuations(rows, snapshot_date, LEGACY_MODEL_VERSION, csv_path=csv_path)
+
+    # Clear only the migrated cells; a column goes once no unmatched player still needs it
+    migrated = tracker['Player'].isin(long_df['PLAYER_NAME'].unique())
+    tracker.loc[migrated, value_cols] = float('nan')
+    empty = [c for c in value_cols if tracker[c].isna().all()]
+    tracker.drop(columns=empty).to_csv(tracker_path, index=False)
+    print(f"Migrated {len(value_cols)} Live_AAV columns ({len(long_df)} rows) into the valuation ledger.")
+    return len(long_df)
+
+
+def export_pivot_csv(path, model_version=None):
+    pivot_valuations(model_version=model_version).to_csv(path, index=False)
+    print(f"Exported wide valuation view to {path}")
+